@@ -0,0 +1,60 @@
+"""Compare two benchmark result files from benchmarks/run.py.
+
+    python benchmarks/compare.py OLD.json NEW.json [--threshold 1.2]
+
+Prints the ratio new/old of the minimum wall time and the peak memory of
+each benchmark present in both files, and exits with status 1 if any of
+them exceeds the threshold.
+"""
+import sys
+import json
+import argparse
+
+
+def _load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data, {(r['name'], r['param']): r for r in data['results']}
+
+
+def compare(old, new, threshold=1.2):
+    """Return the comparison rows and whether a regression was found.
+
+    Args:
+        old (str): Path of the reference results.
+        new (str): Path of the new results.
+        threshold (float): Largest acceptable ratio new/old.
+    """
+    a, ra = _load(old)
+    b, rb = _load(new)
+    rows = []
+    regression = False
+    for key in rb:
+        if key not in ra:
+            continue
+        t = rb[key]['min']/ra[key]['min']
+        m = rb[key]['peak_mb']/max(ra[key]['peak_mb'], 1e-6)
+        bad = t > threshold or m > threshold
+        regression |= bad
+        rows.append((key[0], key[1], ra[key]['min'], rb[key]['min'], t, m,
+                     bad))
+    return rows, regression
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(argv)
+    rows, regression = compare(args.old, args.new, args.threshold)
+    print("{:24s} {:28s} {:>10s} {:>10s} {:>7s} {:>7s}".format(
+        'benchmark', 'parameter', 'old (s)', 'new (s)', 'time', 'memory'))
+    for name, param, t0, t1, t, m, bad in rows:
+        print("{:24s} {:28s} {:10.4f} {:10.4f} {:7.2f} {:7.2f}{}".format(
+            name, param, t0, t1, t, m, '  <--' if bad else ''))
+    return 1 if regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
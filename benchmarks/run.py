@@ -0,0 +1,233 @@
+"""Benchmarks of model construction, Hamiltonian builds and solvers.
+
+Run from the top directory of the repository:
+
+    python benchmarks/run.py [--quick] [--filter NAME] [--output FILE]
+
+Each benchmark is timed with time.perf_counter over several repeats and
+run once more under tracemalloc for the peak memory of the python and
+numpy allocations. The results are written as JSON together with the
+commit, so that runs can be compared with benchmarks/compare.py.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import subprocess
+import tracemalloc
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import numpy  # noqa: E402
+from lattice.hubbard import Hubbard1D, Hubbard2D  # noqa: E402
+from lattice.anderson import Anderson  # noqa: E402
+from lattice.fci import FCISimple  # noqa: E402
+
+# name -> (function, parameters), see `benchmark`
+_benchmarks = {}
+
+
+def benchmark(name, params):
+    """Register a benchmark.
+
+    The decorated function takes one parameter and returns the function
+    to be timed, so that the setup is not part of the measurement.
+    """
+    def register(f):
+        _benchmarks[name] = (f, params)
+        return f
+    return register
+
+
+def _hubbard1d(L):
+    return Hubbard1D(L, 1.0, 4.0, boundary='p')
+
+
+def _hubbard2d(shape):
+    return Hubbard2D(shape[0]*shape[1], 1.0, 4.0, 'rectangular',
+                     shape=shape)
+
+
+def _anderson(N):
+    ll = (N - 1)//2
+    return Anderson(ll, N - 1 - ll, 1.0, 0.5, 2.0, 0.1, -0.2)
+
+
+def _model(spec):
+    kind, size = spec
+    if kind == 'hubbard1d':
+        return _hubbard1d(size)
+    if kind == 'hubbard2d':
+        return _hubbard2d(size)
+    return _anderson(size)
+
+
+@benchmark('model.get_tmat', [('hubbard1d', 16), ('hubbard1d', 64),
+                              ('hubbard2d', (4, 4)), ('hubbard2d', (8, 8)),
+                              ('anderson', 17), ('anderson', 65)])
+def tmat(spec):
+    model = _model(spec)
+    return lambda: model.get_tmat(phase=0.1)
+
+
+@benchmark('model.get_umat', [('hubbard1d', 8), ('hubbard1d', 16),
+                              ('hubbard2d', (4, 4)), ('anderson', 17)])
+def umat(spec):
+    model = _model(spec)
+    return model.get_umat
+
+
+@benchmark('model.get_interaction', [('hubbard1d', 16), ('hubbard1d', 64),
+                                     ('hubbard2d', (8, 8)),
+                                     ('anderson', 65)])
+def interaction(spec):
+    model = _model(spec)
+    return model.get_interaction
+
+
+@benchmark('fci.init', [('hubbard1d', 8, None), ('hubbard1d', 10, None),
+                        ('hubbard1d', 12, 0), ('hubbard1d', 16, 0)])
+def init(spec):
+    kind, L, m_s = spec
+    model = _hubbard1d(L)
+    return lambda: FCISimple(model, L, m_s=m_s)
+
+
+@benchmark('fci.getH', [('hubbard1d', 6), ('hubbard1d', 8),
+                        ('hubbard1d', 10), ('hubbard2d', (2, 4)),
+                        ('anderson', 7), ('anderson', 9)])
+def getH(spec):
+    model = _model(spec)
+    fci = FCISimple(model, model.N, m_s=model.N % 2)
+    return lambda: fci.getH(sparse=True)
+
+
+@benchmark('fci.sigma', [('hubbard1d', 10), ('hubbard1d', 12),
+                         ('hubbard2d', (3, 4)), ('anderson', 11)])
+def sigma(spec):
+    model = _model(spec)
+    fci = FCISimple(model, model.N, m_s=model.N % 2)
+    fci._get_links()
+    c = numpy.random.RandomState(7).rand(fci.k)
+    return lambda: fci.sigma(c)
+
+
+@benchmark('fci.run.dense', [('hubbard1d', 6), ('hubbard2d', (2, 3)),
+                             ('anderson', 7)])
+def run_dense(spec):
+    model = _model(spec)
+    fci = FCISimple(model, model.N, m_s=model.N % 2)
+    return lambda: fci.run(nroots=1)
+
+
+@benchmark('fci.run.davidson', [('hubbard1d', 8), ('hubbard1d', 10),
+                                ('hubbard1d', 12), ('hubbard2d', (3, 4)),
+                                ('anderson', 9), ('anderson', 11)])
+def run_davidson(spec):
+    model = _model(spec)
+    return lambda: FCISimple(model, model.N, m_s=model.N % 2).run(
+        nroots=1, method='davidson')
+
+
+def measure(f, repeat, min_time=0.2):
+    """Return the wall times of f() and its peak traced memory in bytes.
+
+    f is called at least `repeat` times, and more often for fast
+    functions until the total time exceeds min_time.
+    """
+    times = []
+    total = 0.0
+    while len(times) < repeat or (total < min_time and len(times) < 1000):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+        total += times[-1]
+    tracemalloc.start()
+    try:
+        f()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def _git(*args):
+    try:
+        out = subprocess.run(
+            ('git',) + args, cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _versions():
+    out = {'python': platform.python_version(), 'numpy': numpy.__version__}
+    try:
+        import scipy
+        out['scipy'] = scipy.__version__
+    except ImportError:
+        out['scipy'] = None
+    return out
+
+
+def run(names=None, quick=False, repeat=3):
+    """Run the benchmarks and return the results as a dict.
+
+    Args:
+        names (list): Substrings of the benchmark names to run, all if
+            None.
+        quick (bool): Only run the first parameter of each benchmark.
+        repeat (int): Minimum number of timed calls.
+    """
+    results = []
+    for name, (setup, params) in _benchmarks.items():
+        if names and not any(n in name for n in names):
+            continue
+        for param in (params[:1] if quick else params):
+            f = setup(param)
+            times, peak = measure(f, repeat)
+            rec = {'name': name, 'param': repr(param),
+                   'min': min(times), 'median': float(numpy.median(times)),
+                   'repeat': len(times), 'peak_mb': peak/1e6}
+            print("{:24s} {:28s} {:10.4f} s {:10.2f} MB".format(
+                name, rec['param'], rec['min'], rec['peak_mb']))
+            sys.stdout.flush()
+            results.append(rec)
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {'commit': _git('rev-parse', 'HEAD'),
+            'dirty': None if status is None else len(status) > 0,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'machine': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'versions': _versions(),
+            'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='only the smallest size of each benchmark')
+    parser.add_argument('--filter', action='append', default=None,
+                        help='run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None,
+                        help='JSON file, bench_<commit>.json by default')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    out = run(names=args.filter, quick=args.quick, repeat=args.repeat)
+    path = args.output
+    if path is None:
+        path = 'bench_{}.json'.format((out['commit'] or 'unknown')[:10])
+    with open(path, 'w') as f:
+        json.dump(out, f, indent=1)
+    print("Results written to {}".format(path))
+
+
+if __name__ == '__main__':
+    main()
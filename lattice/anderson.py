@@ -1,13 +1,28 @@
 import numpy
 from . import utils
+from . import interaction
+from .model import Model
 
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
 
-class Anderson(object):
+
+def _diags(diagonals, offsets, N):
+    """Return a CSR matrix with the given diagonals."""
+    if scipy is None:
+        raise Exception("scipy is required for sparse output")
+    return scipy.sparse.diags(diagonals, offsets, shape=(N, N), format='csr')
+
+
+class Anderson(Model):
     """Single-site Anderson impurity model.
 
     Attribute:
         ll (int): Number of sites in the left lead
         lr (int): Number of sites in the right lead
+        N (int): Number of sites (ll + lr + 1)
         t (float): hopping parameter
         td (float): coupling between dot and leads
         U (float): dot repulsion
@@ -31,6 +46,7 @@ class Anderson(object):
         """
         self.ll = ll
         self.lr = lr
+        self.N = ll + lr + 1
         self.t = t
         self.td = td
         self.tdr = td/t
@@ -41,54 +57,56 @@ class Anderson(object):
         self.vg = Vg/t
         self.u = U/(4.0*t)
 
-    def get_dim(self):
-        return 2*(self.ll + self.lr + 1)
+    def get_tmatS(self, phase=None, sparse=False):
+        """Return the spatial hopping matrix.
 
-    def get_tmatS(self):
-        N = self.ll + self.lr + 1
-        t = numpy.zeros((N, N))
+        Args:
+            phase (float): Peierls phase, t[i, i+1] is multiplied by
+                exp(i phase).
+            sparse (bool): Return a scipy.sparse CSR matrix.
+        """
+        N = self.N
         idot = self.ll
-        for i in range(N):
-            if i < N - 1:
-                dot = (i == idot or i + 1 == idot)
-                t[i, i + 1] = -self.tdr if dot else -1.0
-            if i > 0:
-                dot = (i == idot or i - 1 == idot)
-                t[i, i - 1] = -self.tdr if dot else -1.0
-        return t
+        off = numpy.full(N - 1, -1.0)
+        if idot > 0:
+            off[idot - 1] = -self.tdr
+        if idot < N - 1:
+            off[idot] = -self.tdr
+        if phase is not None:
+            off = off*numpy.exp(1.j*phase)
+        if sparse:
+            return _diags([off, off.conj()], [1, -1], N)
+        return numpy.diag(off, 1) + numpy.diag(off.conj(), -1)
 
-    def get_tmat(self):
-        t = self.get_tmatS()
+    def get_tmat(self, phase=None, sparse=False):
+        t = self.get_tmatS(phase=phase, sparse=sparse)
         return utils.block_diag(t, t)
 
-    def get_vmatS(self):
-        N = self.ll + self.lr + 1
-        v = numpy.zeros((N, N))
-        for i in range(self.ll):
-            v[i, i] = self.v/2
-        off = self.ll + 1
-        v[self.ll, self.ll] = self.vg
-        for i in range(self.lr):
-            v[off + i, off + i] = -self.v/2
-        return v
+    def get_vmatS(self, sparse=False):
+        v = numpy.zeros(self.N)
+        v[:self.ll] = self.v/2
+        v[self.ll] = self.vg
+        v[self.ll + 1:] = -self.v/2
+        if sparse:
+            return _diags([v], [0], self.N)
+        return numpy.diag(v)
 
-    def get_vmat(self):
-        v = self.get_vmatS()
+    def get_vmat(self, sparse=False):
+        v = self.get_vmatS(sparse=sparse)
         return utils.block_diag(v, v)
 
     def get_umatS(self):
-        N = self.ll + self.lr + 1
+        N = self.N
         idot = self.ll
         umat = numpy.zeros((N, N, N, N))
         umat[idot, idot, idot, idot] = 4.0*self.u
         return umat
 
+    def get_interaction(self):
+        N = self.N
+        U = numpy.zeros(N)
+        U[self.ll] = 4.0*self.u
+        return interaction.onsite(N, U)
+
     def get_umat(self):
-        N = self.ll + self.lr + 1
-        idot = self.ll
-        umat = numpy.zeros((2*N, 2*N, 2*N, 2*N))
-        umat[idot, N + idot, idot, N + idot] = 4.0*self.u
-        umat[N + idot, idot, N + idot, idot] = 4.0*self.u
-        umat[idot, idot, idot, idot] = 4.0*self.u
-        umat[N + idot, N + idot, N + idot, N + idot] = 4.0*self.u
-        return umat
+        return self.get_interaction().todense()
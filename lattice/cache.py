@@ -0,0 +1,161 @@
+import os
+import hashlib
+import logging
+import tempfile
+import numpy
+
+# bump when the layout of the cached arrays changes
+_VERSION = 1
+
+
+def make_key(*parts):
+    """Return a content hash of numbers, strings, tuples and arrays.
+
+    Arrays are hashed by dtype, shape and data, so the key changes with
+    the content but not with the object identity.
+    """
+    h = hashlib.sha256(repr(_VERSION).encode())
+    for x in parts:
+        if isinstance(x, numpy.ndarray):
+            h.update(repr((x.dtype.str, x.shape)).encode())
+            h.update(numpy.ascontiguousarray(x).tobytes())
+        else:
+            h.update(repr(x).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+
+def pack_links(links):
+    """Return single-replacement lists as a dict of flat arrays."""
+    pairs = sorted(links)
+    I, J, sign = zip(*[links[pq] for pq in pairs])
+    offsets = numpy.zeros(len(pairs) + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum([len(x) for x in I])
+    return {'pairs': numpy.array(pairs, dtype=numpy.int64).reshape(-1, 2),
+            'offsets': offsets, 'I': numpy.concatenate(I),
+            'J': numpy.concatenate(J), 'sign': numpy.concatenate(sign)}
+
+
+def unpack_links(data):
+    """Return the single-replacement lists from `pack_links` arrays."""
+    o = data['offsets']
+    links = {}
+    for n, (p, q) in enumerate(data['pairs']):
+        s = slice(o[n], o[n + 1])
+        links[int(p), int(q)] = (data['I'][s], data['J'][s],
+                                 data['sign'][s])
+    return links
+
+
+class DiskCache(object):
+    """Content-addressed cache of numpy arrays on disk.
+
+    Each entry is an uncompressed npz file named by its key. Entries are
+    written atomically, so several processes may share a directory. The
+    modification time of a file is its last use, and the least recently
+    used entries are removed when the directory exceeds `max_size`.
+
+    Attributes:
+        path (str): Cache directory.
+        max_size (float): Size limit in MB, or None for no limit.
+    """
+    def __init__(self, path, max_size=None):
+        """Initialize the cache, creating the directory if needed.
+
+        Args:
+            path (str): Cache directory.
+            max_size (float): Size limit in MB.
+        """
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.npz')
+
+    def _entries(self):
+        """Return (mtime, size, file) of all entries."""
+        out = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.npz'):
+                continue
+            f = os.path.join(self.path, name)
+            try:
+                st = os.stat(f)
+            except FileNotFoundError:
+                continue
+            out.append((st.st_mtime, st.st_size, f))
+        return out
+
+    def size(self):
+        """Return the total size of the entries in bytes."""
+        return sum(e[1] for e in self._entries())
+
+    def get(self, key):
+        """Return the dict of arrays stored under key, or None."""
+        f = self._file(key)
+        try:
+            with numpy.load(f, allow_pickle=False) as data:
+                out = {k: data[k] for k in data.files}
+            os.utime(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logging.warning("Ignoring unreadable cache entry %s", f)
+            return None
+        return out
+
+    def put(self, key, arrays):
+        """Store a dict of arrays under key.
+
+        Args:
+            key (str): Key from `make_key`.
+            arrays (dict): Arrays by name.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                numpy.savez(f, **arrays)
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries beyond max_size."""
+        if self.max_size is None:
+            return
+        entries = sorted(self._entries())
+        total = sum(e[1] for e in entries)
+        limit = self.max_size*1e6
+        for mtime, size, f in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(f)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all entries."""
+        for mtime, size, f in self._entries():
+            try:
+                os.remove(f)
+            except FileNotFoundError:
+                pass
+
+    def cached(self, parts, build):
+        """Return build() from the cache, computing and storing it if new.
+
+        Args:
+            parts (tuple): Parts of the key, see `make_key`.
+            build (callable): Return a dict of arrays.
+        """
+        key = make_key(*parts)
+        data = self.get(key)
+        if data is None:
+            data = build()
+            self.put(key, data)
+        return data
@@ -0,0 +1,631 @@
+import numpy
+import logging
+from . import interaction
+from . import solvers
+
+# local basis |0>, |up>, |down>, |up down> = c+_up c+_down |0>, the
+# charges are the (n_alpha, n_beta) of each state
+_CHARGE = ((0, 0), (1, 0), (0, 1), (1, 1))
+
+
+def _add(q, p):
+    return (q[0] + p[0], q[1] + p[1])
+
+
+def _sub(q, p):
+    return (q[0] - p[0], q[1] - p[1])
+
+
+def _local_operators():
+    """Return the on-site c+_up, c+_down and the parity (-1)^n.
+
+    Within a site the up orbital comes first in the Jordan-Wigner order,
+    so c+_down picks up a sign from an occupied up orbital.
+    """
+    cu = numpy.zeros((4, 4))
+    cu[1, 0] = cu[3, 2] = 1.0
+    cd = numpy.zeros((4, 4))
+    cd[2, 0] = 1.0
+    cd[3, 1] = -1.0
+    F = numpy.diag([1.0, -1.0, -1.0, 1.0])
+    return (cu, cd), F
+
+
+def _sparse_op(op, a, b):
+    """Return the nonzero elements of a local operator as MPO entries."""
+    return [(a, b, so, si, op[so, si]) for so, si in zip(*numpy.nonzero(op))]
+
+
+class MPO(object):
+    """Matrix product operator of a one-dimensional fermionic model.
+
+    H = sum_pq h_pq a+_p a_q + sum_i U_i n_i,alpha n_i,beta is written
+    with Jordan-Wigner strings in the site order of the model. Bond
+    channels 0 and 1 mean that no operator, or a complete term, lies to
+    the left. Every other channel carries one creation or annihilation
+    operator from a site i to the sites j that it hops to, so long-range
+    bonds (such as the periodic bond of Hubbard1D) only add channels on
+    the bonds they cross.
+
+    Attributes:
+        N (int): Number of sites.
+        charges (list): Charge (dn_alpha, dn_beta) of each channel of
+            each bond, N + 1 lists.
+        sites (list): Nonzero elements (a, b, s_out, s_in, value) of
+            the tensor of each site.
+    """
+    def __init__(self, model, phase=None):
+        """Build the MPO from the one-body matrix and the on-site U.
+
+        Args:
+            model: Lattice model with an on-site interaction.
+            phase (float): Peierls phase passed to the model.
+        """
+        N = model.N
+        self.N = N
+        h = numpy.asarray(model.get_hmat(phase=phase))
+        if numpy.any(h[:N, N:] != 0) or numpy.any(h[N:, :N] != 0):
+            raise Exception("DMRG requires spin-conserving integrals")
+        U = interaction.get_interaction(model)
+        if U.onsite is None:
+            raise Exception("DMRG requires an on-site (Hubbard) interaction")
+        onsite = numpy.asarray(U.onsite)
+        creators, F = _local_operators()
+        n = [c @ c.T for c in creators]
+
+        # open channels (i, last site, charge, open op, close op, coeffs)
+        channels = []
+        for spin, cdag in enumerate(creators):
+            hs = h[spin*N:(spin + 1)*N, spin*N:(spin + 1)*N]
+            dq = (1, 0) if spin == 0 else (0, 1)
+            for i in range(N):
+                # c+_i c_j, and c+_j c_i = -(c_i F_i) ... c+_j
+                for coef, left, right, q in (
+                        (hs[i], cdag @ F, cdag.T, dq),
+                        (-hs[:, i], cdag.T @ F, cdag, _sub((0, 0), dq))):
+                    js = numpy.nonzero(coef[i + 1:])[0]
+                    if js.shape[0] > 0:
+                        channels.append((i, i + 1 + js[-1], q, left, right,
+                                         coef))
+
+        # channels present on bond k, which lies left of site k
+        bonds = []
+        for k in range(N + 1):
+            bonds.append([c for c in range(len(channels))
+                          if channels[c][0] < k <= channels[c][1]])
+        self.charges = [[(0, 0), (0, 0)] + [channels[c][2] for c in b]
+                        for b in bonds]
+        self.sites = []
+        eye = numpy.eye(4)
+        for k in range(N):
+            left = {c: 2 + x for x, c in enumerate(bonds[k])}
+            right = {c: 2 + x for x, c in enumerate(bonds[k + 1])}
+            local = h[k, k]*n[0] + h[N + k, N + k]*n[1]
+            local = local + onsite[k]*(n[0] @ n[1])
+            W = _sparse_op(eye, 0, 0) + _sparse_op(eye, 1, 1)
+            W += _sparse_op(local, 0, 1)
+            for c, (i, last, q, op_open, op_close, coef) in \
+                    enumerate(channels):
+                if i == k:
+                    W += _sparse_op(op_open, 0, right[c])
+                elif c in left:
+                    if c in right:
+                        W += _sparse_op(F, left[c], right[c])
+                    if coef[k] != 0:
+                        W += _sparse_op(coef[k]*op_close, left[c], 1)
+            self.sites.append(W)
+
+    def bond_dimension(self):
+        """Return the largest number of channels on a bond."""
+        return max(len(q) for q in self.charges)
+
+
+def _random_mps(N, na, nb, rand):
+    """Return a random MPS with one state in every allowed sector.
+
+    The sectors of bond k are the (n_alpha, n_beta) of the first k sites
+    that can still be completed to (na, nb) by the remaining sites.
+    """
+    def allowed(k, q):
+        rest = N - k
+        ok_a = max(0, na - rest) <= q[0] <= min(k, na)
+        ok_b = max(0, nb - rest) <= q[1] <= min(k, nb)
+        return ok_a and ok_b
+    mps = []
+    left = [(0, 0)]
+    for k in range(N):
+        A = {}
+        right = set()
+        for ql in left:
+            for s, dq in enumerate(_CHARGE):
+                qr = _add(ql, dq)
+                if allowed(k + 1, qr):
+                    A[ql, s] = rand.rand(1, 1) - 0.5
+                    right.add(qr)
+        mps.append(A)
+        left = sorted(right)
+    return mps
+
+
+def _lq_site(A):
+    """Return (L, B) per left sector with A = L B and B right-canonical."""
+    rows = {}
+    for (ql, s), X in A.items():
+        rows.setdefault(ql, []).append(s)
+    Ls = {}
+    B = {}
+    for ql, ss in rows.items():
+        ss = sorted(ss)
+        M = numpy.hstack([A[ql, s] for s in ss])
+        Q, R = numpy.linalg.qr(M.conj().T)
+        Ls[ql] = R.conj().T
+        Q = Q.conj().T
+        o = 0
+        for s in ss:
+            d = A[ql, s].shape[1]
+            B[ql, s] = Q[:, o:o + d]
+            o += d
+    return Ls, B
+
+
+def _absorb_right(A, Ls):
+    """Return A with the bond matrices of its right bond multiplied in."""
+    return {(ql, s): X @ Ls[_add(ql, _CHARGE[s])]
+            for (ql, s), X in A.items()}
+
+
+def _update_left(L, A, W, charges):
+    """Return the left environment of the next bond.
+
+    L[a][q] maps the ket sector q of the bond to the bra sector
+    q + charge(a).
+    """
+    out = {}
+    for a, b, so, si, v in W:
+        La = L.get(a)
+        if not La:
+            continue
+        for ql, E in La.items():
+            X = A.get((ql, si))
+            if X is None:
+                continue
+            Y = A.get((_add(ql, charges[a]), so))
+            if Y is None:
+                continue
+            qr = _add(ql, _CHARGE[si])
+            Lb = out.setdefault(b, {})
+            term = v*(Y.conj().T @ E @ X)
+            if qr in Lb:
+                Lb[qr] += term
+            else:
+                Lb[qr] = term
+    return out
+
+
+def _update_right(R, B, W, charges):
+    """Return the right environment of the previous bond."""
+    out = {}
+    for a, b, so, si, v in W:
+        Rb = R.get(b)
+        if not Rb:
+            continue
+        for (ql, s), X in B.items():
+            if s != si:
+                continue
+            qr = _add(ql, _CHARGE[si])
+            E = Rb.get(qr)
+            if E is None:
+                continue
+            Y = B.get((_add(ql, charges[a]), so))
+            if Y is None:
+                continue
+            Ra = out.setdefault(a, {})
+            term = v*(Y.conj() @ E @ X.T)
+            if ql in Ra:
+                Ra[ql] += term
+            else:
+                Ra[ql] = term
+    return out
+
+
+class _TwoSite(object):
+    """Effective Hamiltonian of two neighboring sites.
+
+    The wave function theta is stored as blocks theta[ql, s1, s2] of
+    shape (dim ql, dim qr), and flattened in the order of `keys` for the
+    eigensolver. The block products of a matvec only depend on the
+    charges, so they are listed once here and every product of an
+    environment block with a wave function block is formed once and
+    shared by all MPO elements that need it.
+    """
+    def __init__(self, L, W1, W2, R, lcharges, mcharges, keys, shapes,
+                 dtype):
+        self.L = L
+        self.R = R
+        self.W1 = W1
+        self.W2 = W2
+        self.lcharges = lcharges
+        self.keys = keys
+        self.shapes = shapes
+        self.dtype = dtype
+        self.offsets = numpy.cumsum([0] + [a*b for a, b in shapes])
+        self.size = self.offsets[-1]
+        index = {k: i for i, k in enumerate(keys)}
+
+        # L[a][ql] theta[ql, si, s2] contributes to T[b][ql', so, s2]
+        slots = {}
+        first = {}
+        for a, b, so, si, v in W1:
+            La = L.get(a)
+            if not La:
+                continue
+            for i, (ql, s1, s2) in enumerate(keys):
+                if s1 != si or ql not in La:
+                    continue
+                slot = slots.setdefault((b, _add(ql, lcharges[a]), so, s2),
+                                        len(slots))
+                first.setdefault((a, i), []).append((slot, v))
+        self._first = [(L[a][keys[i][0]], i, targets)
+                       for (a, i), targets in first.items()]
+        self._nslots = len(slots)
+
+        # T[b][ql, s1, si] R[c][qr]^T contributes to out[ql, s1, so]
+        second = {}
+        for b, c, so, si, v in W2:
+            Rc = R.get(c)
+            if not Rc:
+                continue
+            for (b2, ql, s1, s2), slot in slots.items():
+                if b2 != b or s2 != si:
+                    continue
+                j = index.get((ql, s1, so))
+                qm = _sub(_add(ql, _CHARGE[s1]), mcharges[b])
+                qr = _add(qm, _CHARGE[si])
+                if j is None or qr not in Rc:
+                    continue
+                second.setdefault((slot, c, qr), []).append((j, v))
+        self._second = [(slot, R[c][qr].T, targets)
+                        for (slot, c, qr), targets in second.items()]
+
+    def unpack(self, x):
+        return {k: x[self.offsets[i]:self.offsets[i + 1]].reshape(
+            self.shapes[i]) for i, k in enumerate(self.keys)}
+
+    def pack(self, blocks, dtype):
+        x = numpy.zeros(self.size, dtype=dtype)
+        for i, k in enumerate(self.keys):
+            if k in blocks:
+                x[self.offsets[i]:self.offsets[i + 1]] = blocks[k].reshape(-1)
+        return x
+
+    def _views(self, x):
+        o = self.offsets
+        return [x[o[i]:o[i + 1]].reshape(shape)
+                for i, shape in enumerate(self.shapes)]
+
+    def _apply(self, x, out):
+        theta = self._views(x)
+        T = [None]*self._nslots
+        for E, i, targets in self._first:
+            P = E @ theta[i]
+            for slot, v in targets:
+                if T[slot] is None:
+                    T[slot] = v*P
+                else:
+                    T[slot] += v*P
+        blocks = self._views(out)
+        for slot, E, targets in self._second:
+            if T[slot] is None:
+                continue
+            P = T[slot] @ E
+            for j, v in targets:
+                blocks[j] += v*P
+
+    def matvec(self, X):
+        dtype = numpy.result_type(X, self.dtype)
+        out = numpy.zeros(X.shape, dtype=dtype)
+        for i in range(X.shape[1]):
+            y = numpy.zeros(self.size, dtype=dtype)
+            self._apply(numpy.ascontiguousarray(X[:, i]), y)
+            out[:, i] = y
+        return out
+
+    def diagonal(self):
+        d = {}
+        for a, b, so, si, v in self.W1:
+            if so != si or self.lcharges[a] != (0, 0) or a not in self.L:
+                continue
+            for b2, c, so2, si2, v2 in self.W2:
+                if b2 != b or so2 != si2 or c not in self.R:
+                    continue
+                for (ql, s1, s2), shape in zip(self.keys, self.shapes):
+                    if s1 != si or s2 != si2 or ql not in self.L[a]:
+                        continue
+                    qr = _add(_add(ql, _CHARGE[s1]), _CHARGE[s2])
+                    # the channels a, b and c all carry zero charge here
+                    E = self.R[c].get(qr)
+                    if E is None:
+                        continue
+                    term = v*v2*numpy.outer(numpy.diag(self.L[a][ql]),
+                                            numpy.diag(E))
+                    key = (ql, s1, s2)
+                    d[key] = d.get(key, 0) + term
+        return self.pack(d, complex).real
+
+
+class DMRG(object):
+    """Two-site DMRG for one-dimensional chains such as Hubbard1D and
+    Anderson.
+
+    The MPS is block sparse in the (n_alpha, n_beta) charges of its
+    bonds, so the effective Hamiltonian only couples blocks of matching
+    charge and the number of electrons and m_s are fixed exactly. The
+    MPO is built from `get_hmat` and the on-site U of the model.
+
+    Attributes:
+        model: Lattice model.
+        n_alpha (int): Number of alpha electrons.
+        n_beta (int): Number of beta electrons.
+        mpo (MPO): Hamiltonian.
+        mps (list): Site tensors, dicts of blocks A[ql, s].
+        e_tot (float): Energy after `run`.
+        energies (list): Energy after each sweep.
+        truncation (float): Largest discarded weight of the last sweep.
+        entropy (array): Entanglement entropy of each bond after `run`.
+    """
+    def __init__(self, model, nelec, m_s=None, phase=None, seed=7):
+        """Initialize a random MPS in the given sector.
+
+        Args:
+            model: Lattice model with an on-site interaction.
+            nelec (int or tuple): Number of electrons or (n_alpha, n_beta).
+            m_s (int): n_alpha - n_beta, nelec % 2 by default.
+            phase (float): Peierls phase passed to the model.
+            seed (int): Seed of the initial MPS.
+        """
+        if isinstance(nelec, (tuple, list)):
+            na, nb = nelec
+            if m_s is not None and m_s != na - nb:
+                raise Exception("nelec and m_s are inconsistent")
+        else:
+            if m_s is None:
+                m_s = nelec % 2
+            if (nelec + m_s) % 2 != 0 or abs(m_s) > nelec:
+                raise Exception("Invalid m_s for {} electrons".format(nelec))
+            na = (nelec + m_s)//2
+            nb = nelec - na
+        N = model.N
+        if not (0 <= na <= N and 0 <= nb <= N):
+            raise Exception("Invalid number of electrons")
+        self.model = model
+        self.N = N
+        self.n_alpha = na
+        self.n_beta = nb
+        self.phase = phase
+        self.mpo = MPO(model, phase=phase)
+        self.dtype = float if phase is None else complex
+        self._rand = numpy.random.RandomState(seed)
+        self.mps = _random_mps(N, na, nb, self._rand)
+        self.e_tot = None
+        self.energies = []
+        self.truncation = 0.0
+        self.entropy = numpy.zeros(max(N - 1, 0))
+
+    def _right_canonicalize(self):
+        """Bring the MPS into right-canonical form and normalize it."""
+        for k in range(self.N - 1, 0, -1):
+            Ls, self.mps[k] = _lq_site(self.mps[k])
+            self.mps[k - 1] = _absorb_right(self.mps[k - 1], Ls)
+        norm = numpy.sqrt(sum(numpy.vdot(X, X).real
+                              for X in self.mps[0].values()))
+        self.mps[0] = {k: X/norm for k, X in self.mps[0].items()}
+
+    def _theta(self, k):
+        """Return the two-site wave function of sites k and k + 1.
+
+        Every block allowed by the outer bonds is present, including
+        zero blocks of middle sectors that were truncated away, so that
+        the eigensolver and the noise can bring them back.
+        """
+        dl = {ql: X.shape[0] for (ql, s), X in self.mps[k].items()}
+        dr = {_add(qm, _CHARGE[s]): Y.shape[1]
+              for (qm, s), Y in self.mps[k + 1].items()}
+        theta = {}
+        for ql in dl:
+            for s1 in range(4):
+                for s2 in range(4):
+                    qr = _add(_add(ql, _CHARGE[s1]), _CHARGE[s2])
+                    if qr in dr:
+                        theta[ql, s1, s2] = numpy.zeros(
+                            (dl[ql], dr[qr]), dtype=self.dtype)
+        for (ql, s1), X in self.mps[k].items():
+            qm = _add(ql, _CHARGE[s1])
+            for s2 in range(4):
+                Y = self.mps[k + 1].get((qm, s2))
+                if Y is not None:
+                    theta[ql, s1, s2] = theta[ql, s1, s2] + X @ Y
+        return theta
+
+    def _split(self, theta, chi, cutoff, right):
+        """Split theta by SVD in each middle sector and truncate.
+
+        Returns:
+            (dict, dict, array, float): Site tensors, the kept singular
+                values and the discarded weight.
+        """
+        sectors = {}
+        for (ql, s1, s2), X in theta.items():
+            qm = _add(ql, _CHARGE[s1])
+            sectors.setdefault(qm, []).append((ql, s1, s2))
+        svd = {}
+        for qm, keys in sectors.items():
+            rows = sorted(set((ql, s1) for ql, s1, s2 in keys))
+            cols = sorted(set(s2 for ql, s1, s2 in keys))
+            dr = {k[2]: theta[k].shape[1] for k in keys}
+            dl = {(ql, s1): theta[ql, s1, s2].shape[0]
+                  for ql, s1, s2 in keys}
+            M = numpy.zeros((sum(dl[r] for r in rows),
+                             sum(dr[c] for c in cols)), dtype=self.dtype)
+            ro = numpy.cumsum([0] + [dl[r] for r in rows])
+            co = numpy.cumsum([0] + [dr[c] for c in cols])
+            for (ql, s1, s2) in keys:
+                i = rows.index((ql, s1))
+                j = cols.index(s2)
+                M[ro[i]:ro[i + 1], co[j]:co[j + 1]] = theta[ql, s1, s2]
+            u, s, vh = numpy.linalg.svd(M, full_matrices=False)
+            svd[qm] = (rows, cols, ro, co, u, s, vh)
+
+        # keep the largest singular values over all sectors
+        values = numpy.concatenate([x[5] for x in svd.values()])
+        order = numpy.sort(values)[::-1]
+        nkeep = min(chi, numpy.count_nonzero(order > cutoff))
+        nkeep = max(nkeep, 1)
+        threshold = order[nkeep - 1]
+        discarded = numpy.sum(order[nkeep:]**2)
+        A = {}
+        B = {}
+        kept = []
+        for qm, (rows, cols, ro, co, u, s, vh) in svd.items():
+            m = numpy.count_nonzero(s >= threshold)
+            if m == 0:
+                continue
+            u = u[:, :m]
+            vh = vh[:m]
+            s = s[:m]
+            kept.append(s)
+            if right:
+                vh = s[:, None]*vh
+            else:
+                u = u*s[None, :]
+            for i, r in enumerate(rows):
+                A[r] = u[ro[i]:ro[i + 1]]
+            for j, c in enumerate(cols):
+                B[qm, c] = vh[:, co[j]:co[j + 1]]
+        s = numpy.concatenate(kept)
+        norm = numpy.linalg.norm(s)
+        if right:
+            B = {k: X/norm for k, X in B.items()}
+        else:
+            A = {k: X/norm for k, X in A.items()}
+        return A, B, s/norm, discarded
+
+    def _optimize(self, k, L, R, chi, cutoff, right, tol, noise):
+        """Optimize sites k, k + 1 and return the energy."""
+        theta = self._theta(k)
+        keys = sorted(theta)
+        shapes = [theta[x].shape for x in keys]
+        mpo = self.mpo
+        H = _TwoSite(L, mpo.sites[k], mpo.sites[k + 1], R,
+                     mpo.charges[k], mpo.charges[k + 1], keys, shapes,
+                     self.dtype)
+        x0 = H.pack(theta, self.dtype)
+        e, x = solvers.davidson(H.matvec, H.diagonal(), nroots=1, x0=x0,
+                                tol=tol, tol_residual=numpy.sqrt(tol),
+                                maxiter=50, dtype=self.dtype)
+        x = x[:, 0]
+        if noise > 0:
+            # keeps weakly populated sectors from being truncated away
+            x = x + noise*(self._rand.rand(x.shape[0]) - 0.5)
+            x /= numpy.linalg.norm(x)
+        A, B, s, discarded = self._split(H.unpack(x), chi, cutoff, right)
+        self.mps[k] = A
+        self.mps[k + 1] = B
+        self.truncation = max(self.truncation, discarded)
+        p = s**2
+        p = p[p > 1e-300]
+        self.entropy[k] = -numpy.sum(p*numpy.log(p))
+        return e[0]
+
+    def run(self, chi=64, nsweeps=10, cutoff=1e-12, tol=1e-9,
+            noise=(1e-4, 1e-5, 1e-6, 0.0)):
+        """Sweep until the energy converges and return it.
+
+        Args:
+            chi (int or list): Largest bond dimension, or one per sweep
+                (the last value is used for the remaining sweeps).
+            nsweeps (int): Maximum number of sweeps, each left to right
+                and back.
+            cutoff (float): Singular values below this are discarded.
+            tol (float): Convergence threshold on the energy change of a
+                sweep.
+            noise (float or list): Amplitude of the random noise added to
+                the two-site wave function before truncation, or one per
+                sweep like chi.
+        """
+        N = self.N
+        if N == 1:
+            raise Exception("DMRG requires at least two sites")
+        mpo = self.mpo
+        self._right_canonicalize()
+        total = (self.n_alpha, self.n_beta)
+        L = [None]*(N + 1)
+        R = [None]*(N + 1)
+        L[0] = {0: {(0, 0): numpy.ones((1, 1))}}
+        R[N] = {1: {total: numpy.ones((1, 1))}}
+        for k in range(N - 1, 0, -1):
+            R[k] = _update_right(R[k + 1], self.mps[k], mpo.sites[k],
+                                 mpo.charges[k])
+        chis = chi if isinstance(chi, (list, tuple)) else [chi]
+        noises = noise if isinstance(noise, (list, tuple)) else [noise]
+        e_old = None
+        for sweep in range(nsweeps):
+            m = chis[min(sweep, len(chis) - 1)]
+            a = noises[min(sweep, len(noises) - 1)]
+            self.truncation = 0.0
+            for k in range(N - 1):
+                e = self._optimize(k, L[k], R[k + 2], m, cutoff, True, tol,
+                                   a)
+                L[k + 1] = _update_left(L[k], self.mps[k], mpo.sites[k],
+                                        mpo.charges[k])
+            for k in range(N - 2, -1, -1):
+                e = self._optimize(k, L[k], R[k + 2], m, cutoff, False, tol,
+                                   a)
+                R[k + 1] = _update_right(R[k + 2], self.mps[k + 1],
+                                         mpo.sites[k + 1],
+                                         mpo.charges[k + 1])
+            self.energies.append(e)
+            logging.info("dmrg sweep {}: e = {} chi = {} trunc = {}".format(
+                sweep, e, m, self.truncation))
+            self.e_tot = e
+            done = sweep + 1 >= max(len(chis), len(noises))
+            if done and e_old is not None and abs(e - e_old) < tol:
+                break
+            e_old = e
+        else:
+            logging.warning("DMRG did not converge in {} sweeps".format(
+                nsweeps))
+        return self.e_tot
+
+    def expect_local(self, op):
+        """Return <op_i> on every site for a charge-conserving 4 x 4 op.
+
+        The local basis is |0>, |up>, |down>, |up down>. `run` leaves
+        the MPS right-canonical with the norm on site 0, so a single
+        transfer from the left gives all sites.
+        """
+        op = numpy.asarray(op)
+        E = {(0, 0): numpy.ones((1, 1))}
+        out = numpy.zeros(self.N, dtype=numpy.result_type(op, self.dtype))
+        for k, A in enumerate(self.mps):
+            new = {}
+            for (ql, si), X in A.items():
+                EX = E[ql] @ X
+                for so in range(4):
+                    Y = A.get((ql, so))
+                    if op[so, si] != 0 and Y is not None:
+                        out[k] += op[so, si]*numpy.vdot(Y, EX)
+                qr = _add(ql, _CHARGE[si])
+                term = X.conj().T @ EX
+                new[qr] = new[qr] + term if qr in new else term
+            E = new
+        return out
+
+    def get_densities(self):
+        """Return the (2, N) alpha and beta site densities."""
+        na = self.expect_local(numpy.diag([0.0, 1.0, 0.0, 1.0])).real
+        nb = self.expect_local(numpy.diag([0.0, 0.0, 1.0, 1.0])).real
+        return numpy.array([na, nb])
+
+    def double_occupancy(self):
+        """Return <n_i,alpha n_i,beta> of every site."""
+        return self.expect_local(numpy.diag([0.0, 0.0, 0.0, 1.0])).real
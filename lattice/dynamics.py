@@ -0,0 +1,275 @@
+import numpy
+import logging
+from .scan import PhaseScan
+
+
+def _get_hamiltonian(fci, phase):
+    """Return a function that gives the matvec of H at time t.
+
+    Args:
+        fci (FCISimple): Determinant space.
+        phase (float or callable): Peierls phase, or a function of time.
+    """
+    if callable(phase):
+        get_phase = phase
+    else:
+        def get_phase(t):
+            return phase
+
+    if fci.m_s is not None:
+        def hamiltonian(t):
+            ph = get_phase(t)
+            return lambda x: fci.sigma(x, phase=ph)
+        return hamiltonian
+
+    # without a fixed m_s H is stored, a PhaseScan rebuilds it cheaply
+    if callable(phase):
+        scan = PhaseScan(fci)
+
+        def hamiltonian(t):
+            return scan.getH(get_phase(t), sparse=True).__matmul__
+        return hamiltonian
+    H = fci.getH(phase=phase, sparse=True)
+    return lambda t: H.__matmul__
+
+
+def _bessel_j(x, tol):
+    """Return J_k(x) for k = 0, 1, ... until the values fall below tol.
+
+    Miller's backward recurrence normalized by J_0 + 2 sum_k J_2k = 1.
+    """
+    kmax = int(abs(x) + 10*numpy.log10(1.0/tol) + 20)
+    J = numpy.zeros(kmax + 2)
+    J[kmax] = 1e-300
+    for k in range(kmax, 0, -1):
+        J[k - 1] = 2*k/x*J[k] - J[k + 1] if x != 0 else 0.0
+        if abs(J[k - 1]) > 1e250:
+            J[k - 1:] *= 1e-250
+    if x == 0:
+        J[:] = 0.0
+        J[0] = 1.0
+    else:
+        J /= J[0] + 2*J[2::2].sum()
+    big = numpy.nonzero(numpy.abs(J) > tol)[0]
+    return J[:big[-1] + 2] if big.shape[0] > 0 else J[:1]
+
+
+def spectral_bounds(matvec, n, dtype=complex, niter=30, seed=7):
+    """Return lower and upper bounds of the spectrum of H.
+
+    A short Lanczos run gives the extreme Ritz values, which are widened by
+    the residual norms of the corresponding Ritz vectors.
+
+    Args:
+        matvec (callable): Return H @ x.
+        n (int): Dimension of H.
+        dtype: Data type of the vectors.
+        niter (int): Number of Lanczos iterations.
+        seed (int): Seed of the random starting vector.
+    """
+    niter = min(niter, n)
+    rand = numpy.random.RandomState(seed)
+    V = numpy.zeros((n, niter), dtype=dtype)
+    v = rand.rand(n).astype(dtype)
+    V[:, 0] = v/numpy.linalg.norm(v)
+    alpha = numpy.zeros(niter)
+    beta = numpy.zeros(niter)
+    m = niter
+    for j in range(niter):
+        w = matvec(V[:, j])
+        alpha[j] = numpy.vdot(V[:, j], w).real
+        w = w - V[:, :j + 1] @ (V[:, :j + 1].conj().T @ w)
+        beta[j] = numpy.linalg.norm(w)
+        if j + 1 == niter or beta[j] < 1e-12:
+            m = j + 1
+            break
+        V[:, j + 1] = w/beta[j]
+    T = numpy.diag(alpha[:m]) + numpy.diag(beta[:m - 1], 1)
+    T += numpy.diag(beta[:m - 1], -1)
+    theta, s = numpy.linalg.eigh(T)
+    res = beta[m - 1]*numpy.abs(s[-1])
+    return theta[0] - res[0], theta[-1] + res[-1]
+
+
+def _krylov_step(matvec, c, dt, krylov_dim, tol):
+    """Advance c by exp(-i H tau) with tau <= dt.
+
+    The step is reduced until the a posteriori error estimate
+    beta_m |e_m^T exp(-i tau T_m) e_1| of the Lanczos approximation is
+    below tol.
+
+    Returns:
+        (array, float): The propagated vector and tau.
+    """
+    n = c.shape[0]
+    m = min(krylov_dim, n)
+    norm = numpy.linalg.norm(c)
+    V = numpy.zeros((n, m), dtype=complex)
+    V[:, 0] = c/norm
+    alpha = numpy.zeros(m)
+    beta = numpy.zeros(m)
+    for j in range(m):
+        w = matvec(V[:, j])
+        alpha[j] = numpy.vdot(V[:, j], w).real
+        # full reorthogonalization
+        w = w - V[:, :j + 1] @ (V[:, :j + 1].conj().T @ w)
+        beta[j] = numpy.linalg.norm(w)
+        if beta[j] < 1e-12*max(1.0, abs(alpha[j])):
+            # invariant subspace, the step is exact
+            m = j + 1
+            beta[j] = 0.0
+            break
+        if j + 1 < m:
+            V[:, j + 1] = w/beta[j]
+    T = numpy.diag(alpha[:m]) + numpy.diag(beta[:m - 1], 1)
+    T += numpy.diag(beta[:m - 1], -1)
+    theta, s = numpy.linalg.eigh(T)
+
+    tau = dt
+    while True:
+        y = s @ (numpy.exp(-1.j*theta*tau)*s[0])
+        err = beta[m - 1]*abs(y[-1])*norm
+        if err <= tol or tau < 1e-8*dt:
+            break
+        tau *= 0.5
+    return norm*(V[:, :m] @ y), tau
+
+
+def _chebyshev_step(matvec, c, dt, bounds, tol):
+    """Return exp(-i H dt) c from its Chebyshev expansion."""
+    emin, emax = bounds
+    a = 0.5*(emax + emin)
+    b = 0.5*(emax - emin)
+    J = _bessel_j(b*dt, tol)
+
+    def Hs(x):
+        return (matvec(x) - a*x)/b
+
+    t0 = c
+    t1 = Hs(c)
+    out = J[0]*t0 + 2*(-1.j)*J[1]*t1 if J.shape[0] > 1 else J[0]*t0
+    for k in range(2, J.shape[0]):
+        t0, t1 = t1, 2*Hs(t1) - t0
+        out = out + 2*(-1.j)**k*J[k]*t1
+    return numpy.exp(-1.j*a*dt)*out
+
+
+def _rk4_step(hamiltonian, c, t, h):
+    def f(tt, x):
+        return -1.j*hamiltonian(tt)(x)
+    k1 = f(t, c)
+    k2 = f(t + 0.5*h, c + 0.5*h*k1)
+    k3 = f(t + 0.5*h, c + 0.5*h*k2)
+    k4 = f(t + h, c + h*k3)
+    return c + h/6.0*(k1 + 2*k2 + 2*k3 + k4)
+
+
+def evolve(fci, c0, t_final, dt, method='krylov', phase=None, tol=1e-10,
+           krylov_dim=20, max_step=None, bounds=None):
+    """Yield (t, c(t)) for the real-time evolution of a CI vector.
+
+    The state is propagated with i dc/dt = H(t) c using only products of
+    H with vectors, and is returned at t = 0, dt, 2 dt, ..., t_final.
+    Only a few vectors are stored, so long trajectories use constant
+    memory. The yielded array is not modified after it is returned.
+
+    For a quench, build the initial state from one model and propagate it
+    with `fci.with_model(model)` for the model after the quench.
+
+    Args:
+        fci (FCISimple): Determinant space and Hamiltonian.
+        c0 (array): (k,) initial CI vector.
+        t_final (float): Final time.
+        dt (float): Output interval.
+        method (str): 'krylov' (Lanczos exponential with adaptive steps),
+            'chebyshev' or 'rk4' (adaptive by step doubling).
+        phase (float or callable): Peierls phase, or a function of time
+            for a time-dependent phase. Exponential propagators use the
+            phase at the midpoint of each step.
+        tol (float): Error tolerance of each step.
+        krylov_dim (int): Maximum Krylov space dimension.
+        max_step (float): Upper limit of the internal steps, for example
+            to resolve a time-dependent phase.
+        bounds (tuple): Spectral bounds of H for 'chebyshev'. Estimated
+            with `spectral_bounds` if not given.
+    """
+    if method not in ('krylov', 'chebyshev', 'rk4'):
+        raise Exception("Unrecognized method: {}".format(method))
+    hamiltonian = _get_hamiltonian(fci, phase)
+    c = numpy.array(c0, dtype=complex).reshape(-1)
+    if c.shape[0] != fci.k:
+        raise Exception("Expected a vector of length {}".format(fci.k))
+    nstep = int(round(t_final/dt))
+    h = dt if max_step is None else min(dt, max_step)
+    if method == 'chebyshev' and bounds is None:
+        emin, emax = spectral_bounds(hamiltonian(0.0), fci.k)
+        pad = 0.05*(emax - emin) + 1e-8
+        bounds = (emin - pad, emax + pad)
+        if callable(phase):
+            logging.warning("Spectral bounds are estimated at t = 0")
+
+    t = 0.0
+    yield t, c
+    for istep in range(1, nstep + 1):
+        t_out = istep*dt
+        while t < t_out - 1e-12*dt:
+            step = min(h, t_out - t)
+            if max_step is not None:
+                step = min(step, max_step)
+            if method == 'krylov':
+                new, taken = _krylov_step(
+                    hamiltonian(t + 0.5*step), c, step, krylov_dim, tol)
+                if taken < step and callable(phase):
+                    # redo with the Hamiltonian at the new midpoint
+                    new, taken = _krylov_step(
+                        hamiltonian(t + 0.5*taken), c, taken, krylov_dim,
+                        tol)
+                # grow the step again if it was limited by the error
+                h = taken*1.5 if taken < step else max(h, step)
+            elif method == 'chebyshev':
+                new = _chebyshev_step(
+                    hamiltonian(t + 0.5*step), c, step, bounds, tol)
+                taken = step
+            else:
+                full = _rk4_step(hamiltonian, c, t, step)
+                half = _rk4_step(hamiltonian, c, t, 0.5*step)
+                half = _rk4_step(hamiltonian, half, t + 0.5*step, 0.5*step)
+                err = numpy.linalg.norm(half - full)/15.0
+                if err > tol and step > 1e-8*dt:
+                    h = step*max(0.1, 0.9*(tol/err)**0.2)
+                    continue
+                new = half + (half - full)/15.0
+                taken = step
+                if err > 0:
+                    h = step*min(2.0, 0.9*(tol/err)**0.2)
+                else:
+                    h = 2*step
+            c = new
+            t += taken
+        t = t_out
+        yield t, c
+
+
+def propagate(fci, c0, t_final, dt, callback=None, **kwargs):
+    """Propagate a CI vector and collect observables along the way.
+
+    Args:
+        fci (FCISimple): Determinant space and Hamiltonian.
+        c0 (array): (k,) initial CI vector.
+        t_final (float): Final time.
+        dt (float): Output interval.
+        callback (callable): callback(t, c) is evaluated at every output
+            time, e.g. to compute currents with `rdm.bond_currents`.
+        kwargs: Options passed to `evolve`.
+
+    Returns:
+        (array, list, array): Output times, the callback values and the
+            final CI vector.
+    """
+    times = []
+    values = []
+    for t, c in evolve(fci, c0, t_final, dt, **kwargs):
+        times.append(t)
+        if callback is not None:
+            values.append(callback(t, c))
+    return numpy.array(times), values, c
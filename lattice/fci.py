@@ -1,42 +1,318 @@
+import copy
 import numpy
-import itertools
 import logging
+from . import utils
+from . import solvers
+from . import strings
+from . import interaction
+from .cache import DiskCache, pack_links, unpack_links
+from .outcore import davidson as _outcore_davidson
 
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
 
-#def binom(a, b):
-#    """ Return binomial coefficient 'a choose b'"""
-#    if a < 0 or b < 0:
-#        return None
-#    elif a < b:
-#        return 0
-#    elif a == b:
-#        return 1
-#    else:
-#        return factorial(a) // factorial(b) // factorial(a - b)
+
+def _bitcount(x):
+    """Return the number of set bits in a python integer."""
+    return bin(x).count('1')
+
+
+def _bitlist(x):
+    """Return the sorted list of set bits in a python integer."""
+    out = []
+    while x:
+        low = x & -x
+        out.append(low.bit_length() - 1)
+        x ^= low
+    return out
+
+
+def _between(p, q):
+    """Return the mask of bits strictly between p and q."""
+    lo, hi = int(min(p, q)), int(max(p, q))
+    return ((1 << hi) - 1) ^ ((1 << (lo + 1)) - 1)
+
+
+def _phase(det, p, q):
+    """Return the sign of a^+_p a_q acting on `det` (q occupied, p empty)."""
+    return -1 if _bitcount(det & _between(p, q)) % 2 else 1
+
+
+def excitation_degree(idet, dets):
+    """Return the excitation degree between `idet` and each of `dets`."""
+    x = numpy.bitwise_xor(numpy.uint64(idet), dets)
+    return utils.popcount(x) // 2
+
+
+def _phases(dets, p, q):
+    """Return the signs of a^+_p a_q acting on an array of determinants."""
+    mask = numpy.uint64(_between(p, q))
+    par = utils.popcount(numpy.bitwise_and(dets, mask)) % 2
+    return 1 - 2*par
+
+
+def _excitations(T, U, thresh=1e-14):
+    """Return the single and double excitations coupled by T and U.
+
+    Args:
+        T (array): One-electron integrals.
+        U (Interaction): Two-electron integrals.
+
+    Returns:
+        singles (list): (p, q, w) with w[x] the two-electron contribution
+            from an occupied spectator x, or None if there is none.
+        doubles (list): (p1, p2, q1, q2, v) with p1 < p2, q1 < q2 and v the
+            antisymmetrized integral.
+    """
+    norb = T.shape[0]
+    # W[p, q, x] = U[p, x, q, x] - U[p, x, x, q]
+    W = numpy.zeros((norb, norb, norb), dtype=U.val.dtype)
+    a, b, c, d = U.idx.T
+    J = b == d
+    K = b == c
+    numpy.add.at(W, (a[J], c[J], b[J]), U.val[J])
+    numpy.add.at(W, (a[K], d[K], b[K]), -U.val[K])
+    offd = numpy.abs(T) > thresh
+    offd |= numpy.any(numpy.abs(W) > thresh, axis=2)
+    offd[numpy.diag_indices(norb)] = False
+    singles = []
+    for p, q in zip(*numpy.nonzero(offd)):
+        w = W[p, q]
+        w = w if numpy.any(numpy.abs(w) > thresh) else None
+        singles.append((p, q, w))
+
+    # coefficient of a^+_p1 a^+_p2 a_q2 a_q1 with p1 < p2 and q1 < q2
+    A = {}
+    for p, q, r, s, v in U:
+        if p == q or r == s or {p, q} & {r, s}:
+            continue
+        sign = (1 if p < q else -1)*(1 if r < s else -1)
+        key = (min(p, q), max(p, q), min(r, s), max(r, s))
+        A[key] = A.get(key, 0.0) + 0.5*sign*v
+    doubles = [k + (v,) for k, v in sorted(A.items()) if abs(v) > thresh]
+    return singles, doubles
+
+
+def _connections(dets, T, U, norb):
+    """Yield the off-diagonal Hamiltonian elements connected to `dets`.
+
+    Each item is a tuple (src, new, h) where `src` indexes `dets`, `new`
+    holds the connected determinants and h = <new|H|dets[src]>.
+    """
+    one = numpy.uint64(1)
+    singles, doubles = _excitations(T, U)
+    for p, q, w in singles:
+        bp = one << numpy.uint64(p)
+        bq = one << numpy.uint64(q)
+        src = numpy.nonzero(((dets & bq) != 0) & ((dets & bp) == 0))[0]
+        d = dets[src]
+        h = numpy.full(src.shape, T[p, q])
+        if w is not None:
+            h = h + utils.bits_to_bool(d, norb) @ w
+        yield src, d ^ (bp | bq), _phases(d, p, q)*h
+
+    for p1, p2, q1, q2, v in doubles:
+        pmask = (one << numpy.uint64(p1)) | (one << numpy.uint64(p2))
+        qmask = (one << numpy.uint64(q1)) | (one << numpy.uint64(q2))
+        src = numpy.nonzero(
+            ((dets & qmask) == qmask) & ((dets & pmask) == 0))[0]
+        d = dets[src]
+        k = d ^ (one << numpy.uint64(q2)) ^ (one << numpy.uint64(p2))
+        sign = _phases(d, p2, q2)*_phases(k, p1, q1)
+        yield src, d ^ pmask ^ qmask, sign*v
+
+
+def _diagonal(dets, T, U, norb, blksize=65536):
+    """Return the diagonal Hamiltonian elements of `dets`.
+
+    Args:
+        dets (array): Bit strings of the determinants.
+        T (array): One-electron integrals.
+        U (Interaction): Two-electron integrals.
+        norb (int): Number of spin-orbitals.
+    """
+    t = numpy.diag(T)
+    JK = U.get_jk()
+    out = numpy.zeros(dets.shape, dtype=t.dtype)
+    for i0 in range(0, dets.shape[0], blksize):
+        occ = utils.bits_to_bool(dets[i0:i0 + blksize], norb).astype(float)
+        out[i0:i0 + blksize] = occ @ t + 0.5*numpy.einsum(
+            'ki,ki->k', occ @ JK, occ)
+    return out
 
 
 class FCISimple(object):
-    def __init__(self, model, nelec, m_s=None):
+    def __init__(self, model, nelec, m_s=None, max_memory=None, cache=None):
+        """Initialize the determinant basis.
+
+        For fixed m_s the alpha and beta strings are enumerated separately
+        and the basis is their outer product (alpha-major). The list of
+        determinants is then only built when it is needed, the iterative
+        solvers work from the strings alone.
+
+        Args:
+            model: Lattice model.
+            nelec (int or tuple): Number of electrons or (n_alpha, n_beta).
+            m_s (int): n_alpha - n_beta, or None for all spin sectors.
+            max_memory (float): Memory limit in MB. The available system
+                memory is used if this is not given.
+            cache (DiskCache or str): Disk cache (or its directory) for
+                the basis, the single-replacement lists and the sparse H.
+        """
+        if isinstance(nelec, (tuple, list)):
+            na, nb = nelec
+            if m_s is not None and m_s != na - nb:
+                raise Exception("nelec and m_s are inconsistent")
+            nelec = na + nb
+            m_s = na - nb
         self.model = model
         self.nelec = nelec
         self.norb = model.get_dim()
         self.m_s = m_s
+        self.max_memory = max_memory
+        self.cache = DiskCache(cache) if isinstance(cache, str) else cache
         logging.warning("FCISimple only works in for certain cases, beware!")
-        if self.norb > 16:
-            raise Exception("This code cannot handle more than 8 sites")
+        if self.norb > 64:
+            raise Exception(
+                "This code cannot handle more than 64 spin orbitals")
 
-        seed = [i for i in range(self.norb)]
-        combs = list(itertools.combinations(seed, nelec))
+        # determinants are stored as bit strings of occupied spin-orbitals
+        self._dets = None
         if self.m_s is None:
-            self.basis = numpy.asarray(combs)
-            self.k = self.basis.shape[0]
+            self.n_alpha = self.n_beta = None
+            self.k = utils.binom(self.norb, nelec)
+            self._check_memory(24*self.k, "The determinant list")
+
+            def _build():
+                dets = strings.make_strings(self.norb, nelec)
+                order = numpy.argsort(dets)
+                return {'dets': dets, 'order': order, 'sorted': dets[order]}
+            data = self._cached(('dets', self.norb, nelec), _build)
+            self._dets = data['dets']
+            self._order = data['order']
+            self._sorted = data['sorted']
         else:
-            new = []
-            for state in combs:
-                if self._get_m_s(state) == self.m_s:
-                    new.append(state)
-            self.basis = numpy.asarray(new)
-            self.k = self.basis.shape[0]
+            if (nelec + m_s) % 2 != 0 or abs(m_s) > nelec:
+                raise Exception("Invalid m_s for {} electrons".format(nelec))
+            N = self.model.N
+            self.n_alpha = (nelec + m_s)//2
+            self.n_beta = nelec - self.n_alpha
+            self.astrings = self._get_strings(N, self.n_alpha)
+            self.bstrings = self._get_strings(N, self.n_beta)
+            self._za = strings.make_addressing(N, self.n_alpha)
+            self._zb = strings.make_addressing(N, self.n_beta)
+            self.k = self.astrings.shape[0]*self.bstrings.shape[0]
+        self._links = None
+        self._terms = None
+
+    def _cached(self, parts, build):
+        """Return build() through the disk cache if there is one."""
+        if self.cache is None:
+            return build()
+        return self.cache.cached(parts, build)
+
+    def _get_strings(self, N, n):
+        def _build():
+            return {'strings': strings.make_strings(N, n)}
+        return self._cached(('strings', N, n), _build)['strings']
+
+    def _get_string_links(self, strs, n):
+        N = self.model.N
+        if self.cache is None:
+            return strings.make_links(strs, N)
+
+        def _build():
+            return pack_links(strings.make_links(strs, N))
+        return unpack_links(self._cached(('links', N, n), _build))
+
+    @property
+    def dets(self):
+        """Bit strings of the determinants."""
+        if self._dets is None:
+            self._check_memory(8*self.k, "The determinant list")
+            b = self.bstrings << numpy.uint64(self.model.N)
+            self._dets = (self.astrings[:, None] | b[None, :]).reshape(-1)
+        return self._dets
+
+    def _check_memory(self, nbytes, what):
+        """Raise if `nbytes` exceed the memory limit or available memory."""
+        avail = utils.available_memory()
+        if self.max_memory is not None:
+            limit = self.max_memory*1e6
+            avail = limit if avail is None else min(avail, limit)
+        if avail is not None and nbytes > avail:
+            raise Exception(
+                "{} needs about {:.2f} GB but only {:.2f} GB is "
+                "available".format(what, nbytes/1e9, avail/1e9))
+
+    def _get_itemsize(self):
+        h = self.model.get_hmat()
+        U = interaction.get_interaction(self.model)
+        return numpy.result_type(h, U.val).itemsize
+
+    def _estimate_nnz(self):
+        """Return the expected number of nonzero elements of H."""
+        h = self.model.get_hmat()
+        U = interaction.get_interaction(self.model)
+        singles, doubles = _excitations(h, U)
+        M = self.norb
+        n = self.nelec
+        nconn = len(singles)*utils.binom(M - 2, n - 1)
+        nconn += len(doubles)*utils.binom(M - 4, n - 2)
+        return self.k + nconn*self.k//utils.binom(M, n)
+
+    def memory_estimate(self, method='davidson', nroots=1, max_space=None):
+        """Return the estimated peak memory of `run` in bytes.
+
+        Args:
+            method (str): 'dense', 'davidson' or 'lanczos'.
+            nroots (int): Number of roots.
+            max_space (int): Subspace size of the iterative solvers.
+        """
+        k = self.k
+        vec = k*self._get_itemsize()
+        if method == 'dense':
+            # H, the eigenvectors and the LAPACK workspace
+            return 3*k*vec
+        if max_space is None:
+            max_space = max(20 if method == 'davidson' else 40, 8*nroots)
+        max_space = min(max_space, k)
+        # subspace, its image, Ritz vectors, residuals and corrections
+        mem = (2*max_space + 4*nroots)*vec + 8*k
+        if self.m_s is None:
+            # determinants and the sparse H (COO assembly and CSR copy)
+            return mem + 24*k + 56*self._estimate_nnz()
+        # sigma workspace and the single-replacement lists
+        mem += 3*nroots*vec
+        N = self.model.N
+        for n in (self.n_alpha, self.n_beta):
+            nlink = N*utils.binom(N - 1, n - 1)
+            nlink += N*(N - 1)*utils.binom(N - 2, n - 1)
+            mem += 17*nlink
+        return mem
+
+    def with_model(self, model):
+        """Return an FCISimple for another model on the same basis.
+
+        The determinants, string tables and single-replacement lists are
+        shared with this object, only the integrals are replaced.
+
+        Args:
+            model: Lattice model with the same number of spin-orbitals.
+        """
+        if model.get_dim() != self.norb:
+            raise Exception("Model has a different number of orbitals")
+        new = copy.copy(self)
+        new.model = model
+        new._terms = None
+        return new
+
+    @property
+    def basis(self):
+        """Return the (k, nelec) array of occupied spin-orbitals."""
+        return utils.bits_to_occ(self.dets, self.norb, self.nelec)
 
     def _get_m_s(self, state):
         N = self.model.N
@@ -46,85 +322,358 @@ class FCISimple(object):
             m_s = m_s + d
         return m_s
 
+    def _get_m_s_dets(self, dets):
+        """Return m_s of each determinant in an array of bit strings."""
+        N = self.model.N
+        amask = numpy.uint64((1 << N) - 1)
+        na = utils.popcount(numpy.bitwise_and(dets, amask))
+        return 2*na - self.nelec
+
     def print_basis(self):
-        k, nelec = self.basis.shape
+        basis = self.basis
+        k, nelec = basis.shape
         assert(k == self.k)
         assert(nelec == self.nelec)
+        m_s = self._get_m_s_dets(self.dets)
         out = str()
         for i in range(k):
             sss = "|"
             for j in range(nelec):
-                sss = sss + str(self.basis[i, j])
+                sss = sss + str(basis[i, j])
                 if j < nelec - 1:
                     sss = sss + " "
 
-            sss = sss + ">" + " m_s = " + str(self._get_m_s(self.basis[i])) + "\n"
+            sss = sss + ">" + " m_s = " + str(m_s[i]) + "\n"
             out += sss
         return out
 
-    def _get_matrixel(self, istate, jstate, U, T):
-        iset = set(istate)
-        jset = set(jstate)
-        ii = len(iset)
-        jj = len(jset)
-        assert(ii == jj)
-        common = iset & jset
-        di = iset - common
-        dj = jset - common
-        assert(len(di) == len(dj))
-        ndiff = len(di)
+    def _get_matrixel(self, idet, jdet, U, T):
+        idet = int(idet)
+        jdet = int(jdet)
+        diff = idet ^ jdet
+        common = idet & jdet
+        ndiff = _bitcount(diff) // 2
         if ndiff == 0:
+            occ = _bitlist(idet)
             m = 0.0
-            for iel in iset:
+            for iel in occ:
                 m += T[iel, iel]
-                for jel in iset:
+                for jel in occ:
                     m += 0.5*(U[iel, jel, iel, jel] - U[iel, jel, jel, iel])
             return m
         elif ndiff == 1:
-            i1 = list(di)[0]
-            j1 = list(dj)[0]
+            i1 = (diff & idet).bit_length() - 1
+            j1 = (diff & jdet).bit_length() - 1
             m = T[i1, j1]
-            for x in common:
+            for x in _bitlist(common):
                 m += (U[i1, x, j1, x] - U[i1, x, x, j1])
-            ipos = numpy.argwhere(istate == i1)
-            jpos = numpy.argwhere(jstate == j1)
-            sign = (ipos[0, 0] - jpos[0, 0]) % 2
-            return m if sign == 0 else -m
+            return _phase(jdet, i1, j1)*m
         elif ndiff == 2:
-            i1 = list(di)[0]
-            i2 = list(di)[1]
-            j1 = list(dj)[0]
-            j2 = list(dj)[1]
-            ipos1 = numpy.argwhere(istate == i1)
-            ipos2 = numpy.argwhere(istate == i2)
-            jpos1 = numpy.argwhere(jstate == j1)
-            jpos2 = numpy.argwhere(jstate == j2)
-            s1 = 1 if (ipos1[0, 0] - jpos1[0, 0]) % 2 == 0 else -1
-            s2 = 1 if (ipos2[0, 0] - jpos2[0, 0]) % 2 == 0 else -1
-            return s1*s2*(U[i1, i2, j1, j2] - U[i1, i2, j2, j1])
+            i1, i2 = _bitlist(diff & idet)
+            j1, j2 = _bitlist(diff & jdet)
+            kdet = jdet ^ (1 << j2) ^ (1 << i2)
+            sign = _phase(jdet, i2, j2)*_phase(kdet, i1, j1)
+            return sign*(U[i1, i2, j1, j2] - U[i1, i2, j2, j1])
         else:
             return 0.0
 
-    def getH(self, phase=None):
-        k, nelec = self.basis.shape
-        assert(k == self.k)
-        assert(nelec == self.nelec)
-        U = self.model.get_umat()
-        T = self.model.get_tmat(phase=phase)
-        if phase is None:
-            H = numpy.zeros((k, k))
+    def index(self, dets):
+        """Return the basis index of each determinant, or -1 if absent."""
+        dets = numpy.asarray(dets, dtype=numpy.uint64)
+        if self.m_s is not None:
+            # lexical string addresses give the index directly
+            N = self.model.N
+            a = numpy.bitwise_and(dets, numpy.uint64((1 << N) - 1))
+            b = numpy.right_shift(dets, numpy.uint64(N))
+            found = utils.popcount(a) == self.n_alpha
+            found &= utils.popcount(b) == self.n_beta
+            idx = strings.address(a, self._za)*self.bstrings.shape[0]
+            idx += strings.address(b, self._zb)
+            return numpy.where(found, idx, -1)
+        pos = numpy.searchsorted(self._sorted, dets)
+        pos = numpy.minimum(pos, self.k - 1)
+        found = self._sorted[pos] == dets
+        return numpy.where(found, self._order[pos], -1)
+
+    def getH(self, phase=None, sparse=False):
+        """Return the Hamiltonian in the determinant basis.
+
+        Only determinants connected by the nonzero elements of T and U
+        are visited.
+
+        Args:
+            phase (float): Peierls phase passed to the model.
+            sparse (bool): Return a scipy.sparse CSR matrix. A dense
+                matrix is returned if scipy is not available.
+        """
+        k = self.k
+        if sparse and scipy is not None:
+            self._check_memory(56*self._estimate_nnz(), "The sparse H")
         else:
-            H = numpy.zeros((k, k), dtype=complex)
+            self._check_memory(16*k*k, "The dense H")
+        U = interaction.get_interaction(self.model)
+        T = self.model.get_hmat(phase=phase)
+        dtype = float if phase is None else complex
 
-        for i in range(k):
-            for j in range(k):
-                istate = self.basis[i]
-                jstate = self.basis[j]
-                H[i, j] = self._get_matrixel(istate, jstate, U, T)
+        if sparse and scipy is None:
+            logging.warning("scipy is not available, H will be dense")
+        if sparse and scipy is not None:
+            def _build():
+                rows, cols, vals = self._get_coo(T, U)
+                H = scipy.sparse.coo_matrix(
+                    (vals.astype(dtype), (rows, cols)), shape=(k, k))
+                H = H.tocsr()
+                return {'data': H.data, 'indices': H.indices,
+                        'indptr': H.indptr}
+            # the key holds the integrals, not the model parameters
+            parts = ('H', self.norb, self.nelec, self.m_s, T, U.idx, U.val)
+            data = self._cached(parts, _build)
+            return scipy.sparse.csr_matrix(
+                (data['data'], data['indices'], data['indptr']),
+                shape=(k, k))
+        rows, cols, vals = self._get_coo(T, U)
+        vals = vals.astype(dtype)
+        H = numpy.zeros((k, k), dtype=dtype)
+        numpy.add.at(H, (rows, cols), vals)
         return H
 
-    def run(self):
-        H = self.getH()
-        e, v = numpy.linalg.eigh(H)
+    def _get_coo(self, T, U):
+        """Return the (rows, cols, vals) elements of H for given integrals.
+
+        Args:
+            T (array): One-electron integrals in the spin-orbital basis.
+            U (Interaction): Two-electron interaction.
+        """
+        k = self.k
+        rows = [numpy.arange(k)]
+        cols = [numpy.arange(k)]
+        vals = [_diagonal(self.dets, T, U, self.norb)]
+        for src, new, h in _connections(self.dets, T, U, self.norb):
+            idx = self.index(new)
+            keep = idx >= 0
+            rows.append(idx[keep])
+            cols.append(src[keep])
+            vals.append(h[keep])
+        rows = numpy.concatenate(rows)
+        cols = numpy.concatenate(cols)
+        vals = numpy.concatenate(vals)
+        return rows, cols, vals
+
+    def _get_links(self):
+        """Return the alpha and beta single-replacement lists.
+
+        For fixed m_s the basis is the outer product of alpha strings and
+        beta strings (alpha-major), so a CI vector reshapes to a matrix
+        C[Ia, Ib].
+        """
+        if self.m_s is None:
+            raise Exception("A fixed m_s is required for sigma")
+        if self._links is None:
+            astr = self.astrings
+            bstr = self.bstrings
+            self._links = (
+                astr.shape[0], bstr.shape[0],
+                self._get_string_links(astr, self.n_alpha),
+                self._get_string_links(bstr, self.n_beta))
+        return self._links
+
+    def _string_diagonal(self, T, U):
+        """Return the factors of the (na, nb) diagonal of H.
+
+        The diagonal is ea[Ia] + eb[Ib] + (oa W)[Ia] . ob[Ib] with oa and
+        ob the occupations of the alpha and beta strings, so only
+        (na + nb) rows of length N are stored, see `_diagonal`.
+        """
+        N = self.model.N
+        a = slice(0, N)
+        b = slice(N, 2*N)
+        t = numpy.diag(T).real
+        JK = U.get_jk().real
+        oa = utils.bits_to_bool(self.astrings, N).astype(float)
+        ob = utils.bits_to_bool(self.bstrings, N).astype(float)
+        ea = oa @ t[a] + 0.5*numpy.einsum('ki,ki->k', oa @ JK[a, a], oa)
+        eb = ob @ t[b] + 0.5*numpy.einsum('ki,ki->k', ob @ JK[b, b], ob)
+        W = 0.5*(JK[a, b] + JK[b, a].T)
+        return ea, eb, oa @ W, ob
+
+    def _diagonal(self, terms, rows=slice(None)):
+        """Return the (n, nb) diagonal of H for a slice of alpha strings.
 
-        return e, v
+        Args:
+            terms (dict): Terms of `_get_sigma_terms`.
+            rows (slice): Alpha strings.
+        """
+        ea, eb, aW, ob = terms['diag']
+        return ea[rows, None] + eb[None, :] + aW[rows] @ ob.T
+
+    def _get_sigma_terms(self, phase=None):
+        """Return the nonzero one- and two-electron terms split by spin.
+
+        Terms that do not change the determinant are collected in the
+        factors 'diag' of the diagonal, see `_diagonal`, and left out of
+        the term lists.
+        """
+        if self._terms is not None and self._terms[0] == phase:
+            return self._terms[1]
+        N = self.model.N
+        T = self.model.get_hmat(phase=phase)
+        U = interaction.get_interaction(self.model)
+        a = slice(0, N)
+        b = slice(N, 2*N)
+        if numpy.any(T[a, b] != 0) or numpy.any(T[b, a] != 0):
+            raise Exception("sigma requires spin-conserving integrals")
+
+        def _nonzero(X):
+            idx = numpy.nonzero(numpy.abs(X) > 1e-14)
+            return [tuple(i) + (X[tuple(i)],) for i in zip(*idx)]
+
+        # split U by spin, V[p, q, r, s] multiplies E^a_pr E^b_qs
+        same = {'aa': {}, 'bb': {}}
+        V = {}
+        for p, q, r, s, v in U:
+            sp = [int(x >= N) for x in (p, q, r, s)]
+            p, q, r, s = p % N, q % N, r % N, s % N
+            if sp[0] + sp[1] != sp[2] + sp[3]:
+                if v != 0:
+                    raise Exception("sigma requires spin-conserving integrals")
+            elif sp[0] == sp[1]:
+                if p == q or r == s:
+                    continue
+                # coefficient of a^+_p a^+_q a_s a_r with p < q and r < s
+                sign = (1 if p < q else -1)*(1 if r < s else -1)
+                key = (min(p, q), max(p, q), min(r, s), max(r, s))
+                d = same['aa' if sp[0] == 0 else 'bb']
+                d[key] = d.get(key, 0.0) + 0.5*sign*v
+            else:
+                # reorder to a^+_p(alpha) a^+_q(beta) a_s(beta) a_r(alpha)
+                sign = 0.5
+                if sp[0] == 1:
+                    p, q = q, p
+                    sign = -sign
+                if sp[3] == 0:
+                    r, s = s, r
+                    sign = -sign
+                V[p, q, r, s] = V.get((p, q, r, s), 0.0) + sign*v
+
+        def _terms(d):
+            return [k + (v,) for k, v in sorted(d.items())
+                    if abs(v) > 1e-14 and k[:2] != k[2:]]
+
+        def _offdiag(X):
+            return [x for x in _nonzero(X) if x[0] != x[1]]
+
+        terms = {
+            'a': _offdiag(T[a, a]), 'b': _offdiag(T[b, b]),
+            'aa': _terms(same['aa']), 'bb': _terms(same['bb']),
+            'ab': _terms(V),
+            'diag': self._string_diagonal(T, U),
+            'dtype': numpy.result_type(T, U.val)}
+        self._terms = (phase, terms)
+        return terms
+
+    def sigma(self, c, phase=None):
+        """Return H applied to a CI vector or a block of CI vectors.
+
+        The Hamiltonian is never stored. It is applied directly from the
+        integrals through the single-replacement lists of the alpha and
+        beta strings, so the memory scales with the number of vectors.
+
+        Args:
+            c (array): (k,) vector or (k, m) block of vectors.
+            phase (float): Peierls phase passed to the model.
+        """
+        na, nb, la, lb = self._get_links()
+        terms = self._get_sigma_terms(phase)
+        c = numpy.asarray(c)
+        C = c.reshape(na, nb, -1)
+        dtype = numpy.result_type(C, terms['dtype'])
+        out = (self._diagonal(terms)[:, :, None]*C).astype(dtype, copy=False)
+
+        def _apply(X, link, v, Y):
+            I, J, sign = link
+            Y[I] += (v*sign)[:, None, None]*X[J]
+
+        # the beta terms act on the transposed vector, so that the beta
+        # replacement lists index its leading axis
+        beta = len(terms['b']) > 0 or len(terms['bb']) > 0
+        Ct = numpy.ascontiguousarray(C.transpose(1, 0, 2)) if beta else None
+        outt = numpy.zeros(Ct.shape, dtype=dtype) if beta else None
+        for p, q, v in terms['a']:
+            _apply(C, la[p, q], v, out)
+        for p, q, v in terms['b']:
+            _apply(Ct, lb[p, q], v, outt)
+        for key, X0, Y, link in (('aa', C, out, la), ('bb', Ct, outt, lb)):
+            for p, q, r, s, v in terms[key]:
+                # a^+_p a^+_q a_s a_r = E_pr E_qs - delta_qr E_ps
+                X = numpy.zeros(X0.shape, dtype=dtype)
+                _apply(X0, link[q, s], 1.0, X)
+                _apply(X, link[p, r], v, Y)
+                if q == r:
+                    _apply(X0, link[p, s], -v, Y)
+        if beta:
+            out += outt.transpose(1, 0, 2)
+        for p, q, r, s, v in terms['ab']:
+            Ia, Ja, sa = la[p, r]
+            Ib, Jb, sb = lb[q, s]
+            fac = v*sa[:, None]*sb[None, :]
+            out[numpy.ix_(Ia, Ib)] += fac[:, :, None]*C[numpy.ix_(Ja, Jb)]
+        return out.reshape(c.shape)
+
+    def run(self, nroots=None, method='dense', x0=None, tol=1e-12,
+            tol_residual=1e-6, maxiter=None, max_space=None, outcore=None):
+        """Return the lowest eigenvalues and eigenvectors of H.
+
+        Args:
+            nroots (int): Number of roots. All roots are returned by the
+                dense solver and one root by the iterative solvers if this
+                is not given.
+            method (str): 'dense', 'davidson' or 'lanczos'.
+            x0 (array): Initial guess for the iterative solvers.
+            tol (float): Convergence threshold on the eigenvalues.
+            tol_residual (float): Convergence threshold on the residuals.
+            maxiter (int): Maximum number of iterations.
+            max_space (int): Subspace size that triggers a restart.
+            outcore (str): Directory for an out-of-core Davidson run with
+                the vectors in memory-mapped files. The roots are then
+                returned as `outcore.CIVector` handles.
+        """
+        if outcore is not None:
+            if method != 'davidson' or self.m_s is None:
+                raise Exception(
+                    "outcore requires method='davidson' and a fixed m_s")
+            kwargs = {} if maxiter is None else {'maxiter': maxiter}
+            return _outcore_davidson(
+                self, nroots=(nroots or 1), path=outcore, x0=x0, tol=tol,
+                tol_residual=tol_residual, max_space=max_space, **kwargs)
+        if method == 'dense':
+            self._check_memory(self.memory_estimate(method), "FCISimple.run")
+            H = self.getH()
+            e, v = numpy.linalg.eigh(H)
+            if nroots is not None:
+                e, v = e[:nroots], v[:, :nroots]
+            return e, v
+        elif method == 'davidson':
+            solver = solvers.davidson
+        elif method == 'lanczos':
+            solver = solvers.lanczos
+        else:
+            raise Exception("Unrecognized method: {}".format(method))
+
+        self._check_memory(
+            self.memory_estimate(method, nroots or 1, max_space),
+            "FCISimple.run")
+        kwargs = {} if maxiter is None else {'maxiter': maxiter}
+        if self.m_s is None:
+            H = self.getH(sparse=True)
+            matvec = H.__matmul__
+            diag = H.diagonal()
+            dtype = H.dtype
+        else:
+            matvec = self.sigma
+            terms = self._get_sigma_terms()
+            diag = self._diagonal(terms).reshape(-1)
+            dtype = terms['dtype']
+        return solver(
+            matvec, diag, nroots=(nroots or 1), x0=x0, tol=tol,
+            tol_residual=tol_residual, max_space=max_space, dtype=dtype,
+            **kwargs)
@@ -0,0 +1,350 @@
+import numpy
+import logging
+from . import utils
+from . import interaction
+from .model import Model
+from .greens import lanczos_coefficients
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+
+class FreeFermions(object):
+    """Exact ground state of the one-body part of a model.
+
+    For U = 0 the ground state is the Slater determinant of the lowest
+    eigenvectors of h = T + V, so the energy, the correlation matrix and
+    the Green's function follow from one diagonalization of a (2N, 2N)
+    matrix, or of its two (N, N) spin blocks, instead of the determinant
+    basis of FCISimple. The interaction of the model is ignored.
+
+    Attributes:
+        model: Lattice model.
+        nelec (int): Number of electrons.
+        n_alpha (int): Number of alpha electrons, None for an int nelec.
+        n_beta (int): Number of beta electrons, None for an int nelec.
+        mo_energy (array): (2N,) orbital energies.
+        mo_coeff (array): (2N, 2N) orbitals in columns.
+        occ (array): (2N,) occupation numbers of the orbitals.
+        e_tot (float): Ground state energy.
+    """
+    def __init__(self, model, nelec, phase=None):
+        """Diagonalize the one-body Hamiltonian.
+
+        Args:
+            model: Lattice model.
+            nelec (int or tuple): Number of electrons, or (n_alpha,
+                n_beta) for a spin-conserving h.
+            phase (float): Peierls phase passed to the model.
+        """
+        self.model = model
+        self.phase = phase
+        N = model.N
+        h = model.get_hmat(phase=phase)
+        if isinstance(nelec, (tuple, list)):
+            self.n_alpha, self.n_beta = nelec
+            self.nelec = self.n_alpha + self.n_beta
+            if not (0 <= self.n_alpha <= N and 0 <= self.n_beta <= N):
+                raise Exception("Invalid number of electrons")
+            if numpy.any(h[:N, N:] != 0):
+                raise Exception("Fixed m_s requires a spin-conserving h")
+            ea, ca = numpy.linalg.eigh(h[:N, :N])
+            eb, cb = numpy.linalg.eigh(h[N:, N:])
+            self.mo_energy = numpy.concatenate((ea, eb))
+            self.mo_coeff = utils.block_diag(ca, cb)
+            self.occ = numpy.zeros(2*N)
+            self.occ[:self.n_alpha] = 1.0
+            self.occ[N:N + self.n_beta] = 1.0
+            for e, n in ((ea, self.n_alpha), (eb, self.n_beta)):
+                self._check_gap(e, n)
+        else:
+            self.n_alpha = self.n_beta = None
+            self.nelec = nelec
+            if not 0 <= nelec <= 2*N:
+                raise Exception("Invalid number of electrons")
+            self.mo_energy, self.mo_coeff = numpy.linalg.eigh(h)
+            self.occ = numpy.zeros(2*N)
+            self.occ[:nelec] = 1.0
+            self._check_gap(self.mo_energy, nelec)
+        self.e_tot = numpy.dot(self.occ, self.mo_energy)
+
+    def _check_gap(self, e, n):
+        if 0 < n < e.shape[0] and e[n] - e[n - 1] < 1e-10:
+            logging.warning("Degenerate Fermi level, the ground state is "
+                            "not unique")
+
+    def get_occupied(self):
+        """Return the (2N, nelec) occupied spin-orbitals."""
+        return self.mo_coeff[:, self.occ > 0]
+
+    def make_rdm1(self):
+        """Return the (2N, 2N) correlation matrix <a^+_p a_q>."""
+        C = self.get_occupied()
+        return C.conj() @ C.T
+
+    def make_rdm1s(self):
+        """Return the alpha and beta blocks of the correlation matrix."""
+        N = self.model.N
+        dm = self.make_rdm1()
+        return dm[:N, :N], dm[N:, N:]
+
+    def get_greens(self, omega, eta=0.05, orbitals=None):
+        """Return G_pq(w) = sum_k C_pk C*_qk/(w + i eta - e_k).
+
+        This is the retarded Green's function of the ground state,
+        particle and hole parts together, for the Hamiltonian without
+        a chemical potential as in `GreensFunction`.
+
+        Args:
+            omega (array): (nw,) real frequencies.
+            eta (float): Broadening.
+            orbitals (list): Spin-orbitals p, q, all by default.
+
+        Returns:
+            array: (nw, m, m) Green's function of the m orbitals.
+        """
+        z = numpy.asarray(omega, dtype=float).reshape(-1) + 1.j*eta
+        C = self.mo_coeff
+        if orbitals is not None:
+            C = C[orbitals]
+        g = 1.0/(z[:, None] - self.mo_energy[None, :])
+        return numpy.einsum('pk,wk,qk->wpq', C, g, C.conj())
+
+    def spectral(self, p, omega, eta=0.05):
+        """Return A_p(w) = -Im G_pp(w)/pi."""
+        g = self.get_greens(omega, eta=eta, orbitals=[p])[:, 0, 0]
+        return -g.imag/numpy.pi
+
+
+def chain_surface(z, e, t, n=None):
+    """Return the surface Green's function of a uniform chain.
+
+    The chain has on-site energy e and hopping t between neighbors. For
+    a semi-infinite chain, g = (x - sqrt(x - 1) sqrt(x + 1))/|t| with
+    x = (z - e)/(2|t|), which is the decaying (retarded for Im z > 0)
+    root of |t|^2 g^2 - (z - e) g + 1 = 0. A finite chain of n sites is
+    summed as a continued fraction.
+
+    Args:
+        z (array): Complex frequencies.
+        e (float): On-site energy.
+        t (complex): Hopping.
+        n (int): Number of sites, None for a semi-infinite chain.
+    """
+    z = numpy.asarray(z, dtype=complex)
+    t2 = abs(t)**2
+    if n is None:
+        x = (z - e)/(2*abs(t))
+        return (x - numpy.sqrt(x - 1)*numpy.sqrt(x + 1))/abs(t)
+    g = numpy.zeros(z.shape, dtype=complex)
+    for i in range(n):
+        g = 1.0/(z - e - t2*g)
+    return g
+
+
+def sancho_rubio(z, h00, h01, tol=1e-12, maxiter=100):
+    """Return the surface Green's function of a semi-infinite lead.
+
+    The lead is a repetition of principal layers with Hamiltonian h00,
+    where h01 couples a layer to the next one away from the surface.
+    The decimation of Lopez Sancho et al. doubles the number of
+    eliminated layers in each iteration.
+
+    Args:
+        z (array): (nz,) complex frequencies, Im z > 0.
+        h00 (array): (n, n) Hamiltonian of one layer.
+        h01 (array): (n, n) coupling to the next layer.
+        tol (float): Threshold on the remaining effective coupling.
+        maxiter (int): Maximum number of iterations.
+
+    Returns:
+        array: (nz, n, n) surface Green's function.
+    """
+    z = numpy.asarray(z, dtype=complex).reshape(-1)
+    h00 = numpy.asarray(h00, dtype=complex)
+    h01 = numpy.asarray(h01, dtype=complex)
+    n = h00.shape[0]
+    zI = z[:, None, None]*numpy.eye(n)
+    eps_s = numpy.broadcast_to(h00, zI.shape).copy()
+    eps = eps_s.copy()
+    alpha = numpy.broadcast_to(h01, zI.shape).copy()
+    beta = numpy.broadcast_to(h01.conj().T, zI.shape).copy()
+    for it in range(maxiter):
+        g = numpy.linalg.inv(zI - eps)
+        agb = alpha @ g @ beta
+        eps_s += agb
+        eps += agb + beta @ g @ alpha
+        alpha = alpha @ g @ alpha
+        beta = beta @ g @ beta
+        if numpy.abs(alpha).max() < tol and numpy.abs(beta).max() < tol:
+            break
+    else:
+        logging.warning("Decimation did not converge in {} iterations, "
+                        "is Im z too small?".format(maxiter))
+    return numpy.linalg.inv(zI - eps_s)
+
+
+def anderson_self_energy(model, z, semi_infinite=True):
+    """Return the self-energies of the leads of an Anderson model.
+
+    Each lead is a uniform chain with hopping t (1 in the units of the
+    model) and on-site potential +v/2 (left) or -v/2 (right), coupled to
+    the dot by td/t. The Peierls phase is a gauge in this geometry and
+    does not enter.
+
+    Args:
+        model (Anderson): Impurity model.
+        z (array): Complex frequencies.
+        semi_infinite (bool): Use semi-infinite leads instead of the
+            ll and lr sites of the model.
+
+    Returns:
+        (array, array): Sigma_L(z) and Sigma_R(z) on the dot.
+    """
+    out = []
+    for n, e in ((model.ll, model.v/2), (model.lr, -model.v/2)):
+        if n == 0:
+            out.append(numpy.zeros(numpy.shape(z), dtype=complex))
+            continue
+        g = chain_surface(z, e, 1.0, n=None if semi_infinite else n)
+        out.append(model.tdr**2*g)
+    return tuple(out)
+
+
+def transmission(model, omega, eta=0.0, semi_infinite=True):
+    """Return the Landauer transmission through a non-interacting dot.
+
+    T(w) = Gamma_L Gamma_R |G_d|^2 with G_d = 1/(w - vg - Sigma_L -
+    Sigma_R) and Gamma = -2 Im Sigma. The interaction is ignored.
+
+    Args:
+        model (Anderson): Impurity model.
+        omega (array): Real frequencies.
+        eta (float): Broadening, 0 is allowed for semi-infinite leads.
+        semi_infinite (bool): See `anderson_self_energy`.
+    """
+    z = numpy.asarray(omega, dtype=float) + 1.j*eta
+    sl, sr = anderson_self_energy(model, z, semi_infinite=semi_infinite)
+    gamma = 4*sl.imag*sr.imag
+    # the band edges, where G_d may diverge, do not transmit
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        gd = 1.0/(z - model.vg - sl - sr)
+        return numpy.where(gamma == 0, 0.0, gamma*numpy.abs(gd)**2)
+
+
+class ChainModel(Model):
+    """An impurity site coupled to the end of a chain of bath sites.
+
+    Site 0 is the impurity with on-site energy `eps` and interaction
+    `U`, and sites 1..n form the bath chain from `downfold`.
+
+    Attributes:
+        N (int): Number of sites.
+        eps (float): On-site energy of the impurity.
+        U (float): Interaction on the impurity.
+        a (array): (N - 1,) on-site energies of the bath.
+        b (array): (N - 1,) hoppings, b[0] couples the impurity.
+    """
+    def __init__(self, eps, U, a, b):
+        """Initialize the chain.
+
+        Args:
+            eps (float): On-site energy of the impurity.
+            U (float): Interaction on the impurity.
+            a (array): On-site energies of the bath.
+            b (array): Hoppings along the chain, starting at the
+                impurity.
+        """
+        self.eps = eps
+        self.U = U
+        self.a = numpy.asarray(a, dtype=float)
+        self.b = numpy.asarray(b, dtype=float)
+        assert(self.a.shape == self.b.shape)
+        self.N = self.a.shape[0] + 1
+
+    def get_tmatS(self, phase=None, sparse=False):
+        """Return the spatial hopping matrix.
+
+        Args:
+            phase (float): Peierls phase, t[i, i+1] is multiplied by
+                exp(i phase).
+            sparse (bool): Return a scipy.sparse CSR matrix.
+        """
+        off = -self.b
+        if phase is not None:
+            off = off*numpy.exp(1.j*phase)
+        if sparse:
+            if scipy is None:
+                raise Exception("scipy is required for sparse output")
+            return scipy.sparse.diags([off, off.conj()], [1, -1],
+                                      shape=(self.N, self.N), format='csr')
+        return numpy.diag(off, 1) + numpy.diag(off.conj(), -1)
+
+    def get_tmat(self, phase=None, sparse=False):
+        t = self.get_tmatS(phase=phase, sparse=sparse)
+        return utils.block_diag(t, t)
+
+    def get_vmatS(self, sparse=False):
+        v = numpy.concatenate(([self.eps], self.a))
+        if sparse:
+            if scipy is None:
+                raise Exception("scipy is required for sparse output")
+            return scipy.sparse.diags([v], [0], format='csr')
+        return numpy.diag(v)
+
+    def get_vmat(self, sparse=False):
+        v = self.get_vmatS(sparse=sparse)
+        return utils.block_diag(v, v)
+
+    def get_interaction(self):
+        U = numpy.zeros(self.N)
+        U[0] = self.U
+        return interaction.onsite(self.N, U)
+
+
+def downfold(model, nbath, imp=None, phase=None):
+    """Return the impurity with its bath folded into a short chain.
+
+    Lanczos on the bath Hamiltonian, started from the coupling of the
+    bath to the impurity, gives a chain of nbath sites whose
+    hybridization reproduces the first 2 nbath moments of the exact one.
+    These moments only involve bath sites within nbath hops of the
+    impurity, so long leads are represented to the same accuracy as
+    semi-infinite ones. If the bath has at most nbath states reachable
+    from the impurity, the result is exact.
+
+    Args:
+        model: Spin-symmetric lattice model with one interacting site,
+            for example Anderson.
+        nbath (int): Number of bath sites.
+        imp (int): Impurity site, the site with a nonzero on-site U by
+            default.
+        phase (float): Peierls phase passed to the model.
+    """
+    N = model.N
+    U = interaction.get_interaction(model)
+    if U.onsite is None:
+        raise Exception("downfold requires an on-site interaction")
+    onsite = numpy.asarray(U.onsite, dtype=float)
+    if imp is None:
+        sites = numpy.nonzero(onsite)[0]
+        if sites.shape[0] != 1:
+            raise Exception("Specify the impurity site")
+        imp = sites[0]
+    sparse = scipy is not None
+    h = model.get_hmat(phase=phase, sparse=sparse)
+    if sparse:
+        h = h.tocsr()
+    h = h[:N, :N]
+    bath = numpy.array([i for i in range(N) if i != imp])
+    hb = h[bath][:, bath]
+    v = h[bath][:, [imp]]
+    v = v.toarray().reshape(-1) if sparse else numpy.asarray(v).reshape(-1)
+    norm2, a, b = lanczos_coefficients(
+        hb.__matmul__, v, niter=nbath, tol=1e-10)
+    if norm2 == 0:
+        a = b = numpy.zeros(0)
+    hops = numpy.concatenate(([numpy.sqrt(norm2)], b))[:len(a)]
+    return ChainModel(h[imp, imp].real, onsite[imp], a, hops)
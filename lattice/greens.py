@@ -0,0 +1,210 @@
+import numpy
+from . import utils
+from .fci import FCISimple
+
+
+def _ladder(fci, target, c, p, create):
+    """Apply a^+_p (create) or a_p to c and return it in the target space.
+
+    The sign is the parity of the occupied spin-orbitals below p.
+    """
+    one = numpy.uint64(1)
+    bit = one << numpy.uint64(p)
+    dets = fci.dets
+    c = numpy.asarray(c)
+    occ = (dets & bit) != 0
+    sel = numpy.nonzero(~occ if create else occ)[0]
+    below = numpy.uint64((1 << p) - 1)
+    par = utils.popcount(dets[sel] & below) % 2
+    sign = 1 - 2*par
+    idx = target.index(dets[sel] ^ bit)
+    if numpy.any(idx < 0):
+        raise Exception("Target space does not contain the result")
+    out = numpy.zeros((target.k,) + c.shape[1:], dtype=c.dtype)
+    out[idx] = sign.reshape((-1,) + (1,)*(c.ndim - 1))*c[sel]
+    return out
+
+
+def apply_creation(fci, target, c, p):
+    """Return a^+_p c in the determinant space `target`.
+
+    Args:
+        fci (FCISimple): Space of c.
+        target (FCISimple): Space with one more electron.
+        c (array): (k,) vector or (k, m) block of vectors.
+        p (int): Spin-orbital.
+    """
+    return _ladder(fci, target, c, p, True)
+
+
+def apply_annihilation(fci, target, c, p):
+    """Return a_p c in the determinant space `target`.
+
+    Args:
+        fci (FCISimple): Space of c.
+        target (FCISimple): Space with one electron less.
+        c (array): (k,) vector or (k, m) block of vectors.
+        p (int): Spin-orbital.
+    """
+    return _ladder(fci, target, c, p, False)
+
+
+def lanczos_coefficients(matvec, v, niter=200, tol=1e-12):
+    """Return the continued fraction coefficients of <v|(z - H)^-1|v>.
+
+    A plain three-term Lanczos recurrence is used, so only three vectors
+    are kept. Loss of orthogonality does not affect the low moments that
+    the continued fraction reproduces.
+
+    Args:
+        matvec (callable): Return H @ x.
+        v (array): Starting vector, not necessarily normalized.
+        niter (int): Maximum number of Lanczos iterations.
+        tol (float): Stop when beta falls below tol.
+
+    Returns:
+        (float, array, array): <v|v>, the diagonal a and the off-diagonal
+            b of the tridiagonal matrix, len(b) == len(a) - 1.
+    """
+    norm2 = numpy.vdot(v, v).real
+    a = []
+    b = []
+    if norm2 == 0:
+        return 0.0, numpy.zeros(1), numpy.zeros(0)
+    q = v/numpy.sqrt(norm2)
+    q_old = numpy.zeros_like(q)
+    beta = 0.0
+    for j in range(min(niter, v.shape[0])):
+        w = matvec(q)
+        alpha = numpy.vdot(q, w).real
+        a.append(alpha)
+        w = w - alpha*q - beta*q_old
+        beta = numpy.linalg.norm(w)
+        if beta < tol or j + 1 == min(niter, v.shape[0]):
+            break
+        b.append(beta)
+        q_old, q = q, w/beta
+    return norm2, numpy.array(a), numpy.array(b)
+
+
+def continued_fraction(z, norm2, a, b):
+    """Evaluate norm2/(z - a_0 - b_0^2/(z - a_1 - b_1^2/(...))).
+
+    Args:
+        z (array): Complex frequencies, any shape.
+        norm2 (float): <v|v>.
+        a (array): Diagonal Lanczos coefficients.
+        b (array): Off-diagonal Lanczos coefficients.
+    """
+    z = numpy.asarray(z, dtype=complex)
+    g = numpy.zeros(z.shape, dtype=complex)
+    for j in range(len(a) - 1, -1, -1):
+        bj = b[j]**2 if j < len(b) else 0.0
+        g = 1.0/(z - a[j] - bj*g)
+    return norm2*g
+
+
+class GreensFunction(object):
+    """Zero-temperature single-particle Green's function.
+
+    G_pp(w) = <a_p (w + i eta - H + E0)^-1 a^+_p>
+            + <a^+_p (w + i eta + H - E0)^-1 a_p>
+
+    for spin-orbital p, from Lanczos continued fractions in the N+1 and
+    N-1 electron spaces. These are built from the ground state space with
+    `nelec` changed by one, keeping the alpha and beta counts separate
+    for fixed m_s. The coefficients are computed once per orbital, after
+    which any number of frequencies costs a few array operations each.
+
+    Attributes:
+        fci (FCISimple): Space of the ground state.
+        c (array): Normalized ground state.
+        e0 (float): Ground state energy.
+    """
+    def __init__(self, fci, c, e0=None, phase=None, niter=200):
+        """Initialize from a ground state.
+
+        Args:
+            fci (FCISimple): Space of the ground state.
+            c (array): (k,) ground state vector.
+            e0 (float): Ground state energy, <c|H|c> if not given.
+            phase (float): Peierls phase of the Hamiltonian.
+            niter (int): Maximum number of Lanczos iterations.
+        """
+        c = numpy.asarray(c).reshape(-1)
+        self.fci = fci
+        self.c = c/numpy.linalg.norm(c)
+        self.phase = phase
+        self.niter = niter
+        if e0 is None:
+            e0 = numpy.vdot(self.c, self._matvec(fci)(self.c)).real
+        self.e0 = e0
+        self._spaces = {}
+        self._coeffs = {}
+
+    def _matvec(self, fci):
+        if fci.m_s is not None:
+            return lambda x: fci.sigma(x, phase=self.phase)
+        H = fci.getH(phase=self.phase, sparse=True)
+        return H.__matmul__
+
+    def _get_space(self, p, dn):
+        """Return the space of a^+_p c (dn = 1) or a_p c (dn = -1)."""
+        fci = self.fci
+        N = fci.model.N
+        if fci.m_s is None:
+            key = (dn,)
+            nelec = fci.nelec + dn
+            if nelec < 0 or nelec > fci.norb:
+                return None
+            args = (nelec,)
+        else:
+            spin = p//N
+            key = (dn, spin)
+            na = fci.n_alpha + (dn if spin == 0 else 0)
+            nb = fci.n_beta + (dn if spin == 1 else 0)
+            if min(na, nb) < 0 or max(na, nb) > N:
+                return None
+            args = ((na, nb),)
+        if key not in self._spaces:
+            self._spaces[key] = FCISimple(
+                fci.model, *args, max_memory=fci.max_memory,
+                cache=fci.cache)
+        return self._spaces[key]
+
+    def get_coefficients(self, p):
+        """Return the particle and hole continued fractions of orbital p.
+
+        Returns:
+            tuple: (norm2, a, b) for the particle and the hole part.
+        """
+        if p not in self._coeffs:
+            out = []
+            for dn, create in ((1, True), (-1, False)):
+                target = self._get_space(p, dn)
+                if target is None:
+                    out.append((0.0, numpy.zeros(1), numpy.zeros(0)))
+                    continue
+                v = _ladder(self.fci, target, self.c, p, create)
+                out.append(lanczos_coefficients(
+                    self._matvec(target), v, niter=self.niter))
+            self._coeffs[p] = tuple(out)
+        return self._coeffs[p]
+
+    def __call__(self, p, omega, eta=0.05):
+        """Return G_pp at real frequencies.
+
+        Args:
+            p (int): Spin-orbital.
+            omega (array): Frequencies.
+            eta (float): Broadening.
+        """
+        z = numpy.asarray(omega) + 1.j*eta
+        particle, hole = self.get_coefficients(p)
+        g = continued_fraction(z + self.e0, *particle)
+        g -= continued_fraction(self.e0 - z, *hole)
+        return g
+
+    def spectral(self, p, omega, eta=0.05):
+        """Return A_p(w) = -Im G_pp(w)/pi."""
+        return -self(p, omega, eta=eta).imag/numpy.pi
@@ -1,51 +1,82 @@
 import numpy
 from . import utils
+from . import interaction
+from . import lattices
+from .model import Model
 
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
 
-class HubbardBase(object):
+
+class HubbardBase(Model):
     """Generic Hubbard model."""
-    def __init__(self, N, t, U, nn):
+    def __init__(self, N, t, U, nn, twist=None):
         """Initialize 2D Hubbard model.
 
         Args:
             N (int): Number of sites.
             t (float): Hubbard t (hopping) parameter.
             U (float): Hubbard U (on-site repulsion) parameter.
-            nn (list): List of nearest neighbors.
+            nn (list): List of nearest neighbors, or an (N, z) integer
+                array in which negative entries are padding.
+            twist (array): Optional (N, z) phase angles of the bonds in an
+                array `nn`, used for twisted boundary conditions.
         """
         self.N = N
         self.t = t
         self.U = U
         self.u = U/(4.0*t)
         self.nn = nn
+        self.twist = twist
 
     def get_dim(self):
         """Return spin-orbital dimension."""
         return 2*self.N
 
-    def get_tmatS(self, phase=None):
-        """ Return T-matrix in the spatial orbital basis."""
+    def get_edges(self):
+        """Return the (E, 2) array of directed bonds (i, x)."""
+        return utils.nn_to_edges(self.nn)
+
+    def _get_tmat_coo(self, phase=None):
+        """ Return the (rows, cols, vals) of the spatial T-matrix."""
+        i, x = self.get_edges().T
+        if phase is None:
+            f = numpy.full(i.shape, -self.t/2)
+        else:
+            assert(numpy.all(i != x))
+            # phase factors for x < i and x > i
+            fac = -numpy.exp(1.j*phase*numpy.array([-1, 0, 1]))*self.t/2
+            f = fac[numpy.sign(x - i) + 1]
+        if self.twist is not None:
+            keep = numpy.asarray(self.nn).reshape(-1) >= 0
+            theta = numpy.asarray(self.twist).reshape(-1)[keep]
+            f = f*numpy.exp(1.j*theta)
+        rows = numpy.concatenate((i, x))
+        cols = numpy.concatenate((x, i))
+        vals = numpy.concatenate((f, f.conj()))
+        return rows, cols, vals
+
+    def get_tmatS(self, phase=None, sparse=False):
+        """ Return T-matrix in the spatial orbital basis.
+
+        Args:
+            phase (float): Peierls phase, bonds (i, x) with x > i get a
+                factor exp(i*phase).
+            sparse (bool): Return a scipy.sparse CSR matrix.
+        """
         N = self.N
-        dtype = float if phase is None else complex
-        t = numpy.zeros((N, N), dtype=dtype)
-        for i in range(N):
-            nn = self.nn[i]
-            for x in nn:
-                if phase is None:
-                    t[i, x] -= self.t/2
-                    t[x, i] -= self.t/2
-                elif x > i:
-                    t[i, x] -= numpy.exp(1.j*phase)*self.t/2
-                    t[x, i] -= numpy.exp(-1.j*phase)*self.t/2
-                else:
-                    assert(x < i)
-                    t[i, x] -= numpy.exp(-1.j*phase)*self.t/2
-                    t[x, i] -= numpy.exp(1.j*phase)*self.t/2
+        rows, cols, vals = self._get_tmat_coo(phase=phase)
+        if sparse:
+            return _coo_to_csr(rows, cols, vals, N)
+        t = numpy.zeros((N, N), dtype=vals.dtype)
+        numpy.add.at(t, (rows, cols), vals)
         return t
 
-    def get_tmat(self, phase=None):
+    def get_tmat(self, phase=None, sparse=False):
         """ Return T-matrix in the spin orbital basis."""
-        t = self.get_tmatS(phase=phase)
+        t = self.get_tmatS(phase=phase, sparse=sparse)
         return utils.block_diag(t, t)
 
     def get_umatS(self):
@@ -57,36 +88,33 @@ class HubbardBase(object):
             umat[i, i, i, i] = self.U
         return umat
 
+    def get_interaction(self):
+        """ Return the sparse on-site interaction in the spin orbital
+        basis."""
+        return interaction.onsite(self.N, self.U)
+
     def get_umat(self):
         """ Return U-matrix in the spin orbital basis."""
-        N = self.N
-        umat = numpy.zeros((2*N, 2*N, 2*N, 2*N))
-        for i in range(N):
-            umat[i, N + i, i, N + i] = self.U
-            umat[N + i, i, N + i, i] = self.U
-            umat[i, i, i, i] = self.U
-            umat[N + i, N + i, N + i, N + i] = self.U
-        return umat
+        return self.get_interaction().todense()
+
+
+def _coo_to_csr(rows, cols, vals, n):
+    if scipy is None:
+        raise Exception("scipy is required for sparse output")
+    t = scipy.sparse.coo_matrix((vals, (rows, cols)), shape=(n, n))
+    return t.tocsr()
 
 
 def _get_nn_1d(L, boundary):
-    nn = []
-    for i in range(L):
-        if boundary == "p" or boundary == "pbc":
-            l = L - 1 if i == 0 else i - 1
-            r = 0 if i == (L - 1) else i + 1
-            x = (l, r)
-        else:
-            if i == 0:
-                x = (i + 1,)
-            elif i == (L - 1):
-                x = (i - 1,)
-            else:
-                l = i - 1
-                r = i + 1
-                x = (l, r)
-        nn.append(x)
-    return nn
+    i = numpy.arange(L)
+    if boundary == "p" or boundary == "pbc":
+        l = (i - 1) % L
+        r = (i + 1) % L
+        return list(zip(l.tolist(), r.tolist()))
+    if L == 1:
+        return [()]
+    nn = list(zip((i[1:-1] - 1).tolist(), (i[1:-1] + 1).tolist()))
+    return [(1,)] + nn + [(L - 2,)]
 
 
 class Hubbard1D(HubbardBase):
@@ -117,8 +145,26 @@ class Hubbard1D(HubbardBase):
         HubbardBase.__init__(self, L, t, U, nn)
 
 
+def _get_lattice(N, lattice, names, shape, boundary, twist):
+    """Return the neighbor list and bond twist of a lattice keyword."""
+    if lattice not in names:
+        raise Exception("Unrecognized lattice keyword!")
+    if shape is None:
+        raise Exception("shape is required with a lattice keyword")
+    lat = lattices.get_lattice(lattice, shape, boundary)
+    if lat.nn.shape[0] != N:
+        raise Exception("The {} lattice has {} sites".format(
+            lattice, lat.nn.shape[0]))
+    if twist is not None:
+        twist = lattices.get_twist(lat, twist)
+        if not numpy.any(twist):
+            twist = None
+    return lat.nn, twist
+
+
 class Hubbard2D(HubbardBase):
-    def __init__(self, N, t, U, lattice):
+    def __init__(self, N, t, U, lattice, shape=None, boundary='p',
+                 twist=None):
         """Initialize 2D Hubbard model.
 
         Args:
@@ -126,17 +172,28 @@ class Hubbard2D(HubbardBase):
             t (float): Hubbard t (hopping) parameter.
             U (float): Hubbard U (on-site repulsion) parameter.
             lattice: Specify lattice by string or list of nearest neighbors.
+                Recognized strings are 'square', 'rectangular',
+                'triangular' and 'honeycomb'.
+            shape (tuple): Number of unit cells along each axis, required
+                for a lattice keyword.
+            boundary (str or tuple): 'o' (open), 'p' (periodic) or 't'
+                (twisted), for all axes or one per axis.
+            twist (float or tuple): Twist angle of each twisted axis.
         """
         # lattice is specified by keyword
         if isinstance(lattice, str):
-            raise Exception("Unrecognized lattice keyword!")
+            names = ('square', 'rectangular', 'triangular', 'honeycomb')
+            nn, twist = _get_lattice(
+                N, lattice, names, shape, boundary, twist)
+            HubbardBase.__init__(self, N, t, U, nn, twist=twist)
         # lattice is specified explicitly
         else:
             HubbardBase.__init__(self, N, t, U, lattice)
 
 
 class Hubbard3D(HubbardBase):
-    def __init__(self, N, t, U, lattice):
+    def __init__(self, N, t, U, lattice, shape=None, boundary='p',
+                 twist=None):
         """Initialize 3D Hubbard model.
 
         Args:
@@ -144,10 +201,18 @@ class Hubbard3D(HubbardBase):
             t (float): Hubbard t (hopping) parameter.
             U (float): Hubbard U (on-site repulsion) parameter.
             lattice: Specify lattice by string or list of nearest neighbors.
+                The recognized string is 'cubic'.
+            shape (tuple): Number of sites along each axis, required for a
+                lattice keyword.
+            boundary (str or tuple): 'o' (open), 'p' (periodic) or 't'
+                (twisted), for all axes or one per axis.
+            twist (float or tuple): Twist angle of each twisted axis.
         """
         # lattice is specified by keyword
         if isinstance(lattice, str):
-            raise Exception("Unrecognized lattice keyword!")
+            nn, twist = _get_lattice(
+                N, lattice, ('cubic',), shape, boundary, twist)
+            HubbardBase.__init__(self, N, t, U, nn, twist=twist)
         # lattice is specified explicitly
         else:
             HubbardBase.__init__(self, N, t, U, lattice)
@@ -0,0 +1,101 @@
+import numpy
+
+
+class Interaction(object):
+    """Sparse two-electron interaction in the spin-orbital basis.
+
+    The nonzero elements U[p, q, r, s] (physicist's notation, not
+    antisymmetrized) are stored in coordinate format.
+
+    Attributes:
+        norb (int): Number of spin-orbitals.
+        idx (array): (nnz, 4) array of (p, q, r, s).
+        val (array): (nnz,) array of values.
+        onsite (array): On-site U of each spatial site for Hubbard-like
+            interactions, otherwise None.
+    """
+    def __init__(self, norb, idx, val, onsite=None):
+        """Initialize the interaction.
+
+        Args:
+            norb (int): Number of spin-orbitals.
+            idx (array): (nnz, 4) array of (p, q, r, s).
+            val (array): (nnz,) array of values.
+            onsite (array): Optional on-site U of each spatial site.
+        """
+        self.norb = norb
+        self.idx = numpy.asarray(idx, dtype=numpy.int64).reshape(-1, 4)
+        self.val = numpy.asarray(val).reshape(-1)
+        self.onsite = onsite
+        self.nnz = self.val.shape[0]
+
+    def __iter__(self):
+        """Iterate over the nonzero elements as (p, q, r, s, value)."""
+        for (p, q, r, s), v in zip(self.idx, self.val):
+            yield p, q, r, s, v
+
+    def __len__(self):
+        return self.nnz
+
+    def todense(self):
+        """Return the dense (norb, norb, norb, norb) tensor."""
+        n = self.norb
+        U = numpy.zeros((n, n, n, n), dtype=self.val.dtype)
+        numpy.add.at(U, tuple(self.idx.T), self.val)
+        return U
+
+    def get_jk(self):
+        """Return the (norb, norb) matrix U[i, j, i, j] - U[i, j, j, i]."""
+        n = self.norb
+        p, q, r, s = self.idx.T
+        JK = numpy.zeros((n, n), dtype=self.val.dtype)
+        J = (p == r) & (q == s)
+        K = (p == s) & (q == r)
+        numpy.add.at(JK, (p[J], q[J]), self.val[J])
+        numpy.add.at(JK, (p[K], q[K]), -self.val[K])
+        return JK
+
+
+def onsite(N, U):
+    """Return the on-site (Hubbard) interaction of N spatial sites.
+
+    The elements are laid out as in `HubbardBase.get_umat`, with spin
+    orbitals 0..N-1 alpha and N..2N-1 beta. Sites with U = 0 are skipped.
+
+    Args:
+        N (int): Number of sites.
+        U (float or array): On-site repulsion, a scalar or one per site.
+    """
+    U = numpy.broadcast_to(numpy.asarray(U, dtype=float), (N,)).copy()
+    i = numpy.nonzero(U)[0]
+    a = i
+    b = i + N
+    idx = numpy.concatenate((
+        numpy.stack((a, b, a, b), axis=1),
+        numpy.stack((b, a, b, a), axis=1),
+        numpy.stack((a, a, a, a), axis=1),
+        numpy.stack((b, b, b, b), axis=1)))
+    val = numpy.tile(U[i], 4)
+    return Interaction(2*N, idx, val, onsite=U)
+
+
+def from_dense(U, thresh=0.0):
+    """Return the Interaction of the nonzero elements of a dense tensor.
+
+    Args:
+        U (array): (norb, norb, norb, norb) tensor.
+        thresh (float): Elements with magnitude below this are dropped.
+    """
+    U = numpy.asarray(U)
+    idx = numpy.argwhere(numpy.abs(U) > thresh)
+    return Interaction(U.shape[0], idx, U[tuple(idx.T)])
+
+
+def get_interaction(model):
+    """Return the Interaction of a model.
+
+    Models without `get_interaction` are handled through `get_umat`.
+    """
+    if hasattr(model, 'get_interaction'):
+        return model.get_interaction()
+    return from_dense(model.get_umat())
@@ -0,0 +1,193 @@
+import numpy
+import functools
+import collections
+
+Lattice = collections.namedtuple(
+    'Lattice', ['nn', 'wind', 'shape', 'boundary'])
+Lattice.__doc__ = """Neighbor structure of a lattice.
+
+Attributes:
+    nn (array): (N, z) array of neighbors, negative entries are padding.
+    wind (array): (N, z, d) number of times each bond wraps around each
+        periodic or twisted axis.
+    shape (tuple): Number of unit cells along each axis.
+    boundary (tuple): Boundary condition along each axis.
+"""
+
+
+def _get_boundary(boundary, d):
+    if isinstance(boundary, str):
+        boundary = (boundary,)*d
+    boundary = tuple(boundary)
+    if len(boundary) != d:
+        raise Exception("Expected {} boundary conditions".format(d))
+    for b in boundary:
+        if b not in ('o', 'p', 't', 'obc', 'pbc', 'tbc'):
+            raise Exception("Unrecognized boundary: {}".format(b))
+    return tuple(b[0] for b in boundary)
+
+
+def _freeze(nn, wind, shape, boundary):
+    nn.setflags(write=False)
+    wind.setflags(write=False)
+    return Lattice(nn, wind, shape, boundary)
+
+
+def _bonds(shape, boundary, src, offsets):
+    """Return the neighbors of cells `src` displaced by `offsets`.
+
+    Returns:
+        (array, array): (n, z) neighboring cell indices (-1 for bonds cut by
+            an open boundary) and (n, z, d) winding numbers.
+    """
+    shape = numpy.array(shape)
+    coords = numpy.stack(numpy.unravel_index(src, tuple(shape)), axis=1)
+    offsets = numpy.asarray(offsets).reshape(-1, len(shape))
+    target = coords[:, None, :] + offsets[None, :, :]
+    wind = numpy.floor_divide(target, shape)
+    open_axes = numpy.array([b == 'o' for b in boundary])
+    valid = ~numpy.any((wind != 0) & open_axes, axis=2)
+    idx = numpy.ravel_multi_index(
+        tuple(numpy.moveaxis(target % shape, 2, 0)), tuple(shape))
+    idx = numpy.where(valid, idx, -1)
+    wind = numpy.where(valid[:, :, None], wind, 0)
+    return idx, wind
+
+
+def _bravais(shape, boundary, offsets):
+    shape = tuple(int(L) for L in shape)
+    boundary = _get_boundary(boundary, len(shape))
+    offsets = numpy.asarray(offsets)
+    offsets = numpy.concatenate((offsets, -offsets))
+    N = int(numpy.prod(shape))
+    src = numpy.arange(N)
+    nn, wind = _bonds(shape, boundary, src, offsets)
+    # bonds of a site to itself (periodic axis of length 1) are dropped
+    self_bond = nn == src[:, None]
+    nn = numpy.where(self_bond, -1, nn)
+    wind = numpy.where(self_bond[:, :, None], 0, wind)
+    return _freeze(nn, wind, shape, boundary)
+
+
+@functools.lru_cache(maxsize=128)
+def square(Lx, Ly, boundary='p'):
+    """Return the square (or rectangular) lattice of Lx x Ly sites.
+
+    Site (x, y) has index x*Ly + y.
+
+    Args:
+        Lx (int): Number of sites along x.
+        Ly (int): Number of sites along y.
+        boundary (str or tuple): 'o' (open), 'p' (periodic) or 't'
+            (twisted), for all axes or one per axis.
+    """
+    return _bravais((Lx, Ly), boundary, [(1, 0), (0, 1)])
+
+
+def rectangular(Lx, Ly, boundary='p'):
+    """Return the rectangular lattice of Lx x Ly sites, see `square`."""
+    return square(Lx, Ly, boundary)
+
+
+@functools.lru_cache(maxsize=128)
+def triangular(Lx, Ly, boundary='p'):
+    """Return the triangular lattice of Lx x Ly sites.
+
+    The lattice is a square grid with an extra bond along the (1, -1)
+    diagonal, site (x, y) has index x*Ly + y.
+
+    Args:
+        Lx (int): Number of sites along the first lattice vector.
+        Ly (int): Number of sites along the second lattice vector.
+        boundary (str or tuple): 'o', 'p' or 't' for all or each axis.
+    """
+    return _bravais((Lx, Ly), boundary, [(1, 0), (0, 1), (1, -1)])
+
+
+@functools.lru_cache(maxsize=128)
+def cubic(Lx, Ly, Lz, boundary='p'):
+    """Return the simple cubic lattice of Lx x Ly x Lz sites.
+
+    Site (x, y, z) has index (x*Ly + y)*Lz + z.
+
+    Args:
+        Lx (int): Number of sites along x.
+        Ly (int): Number of sites along y.
+        Lz (int): Number of sites along z.
+        boundary (str or tuple): 'o', 'p' or 't' for all or each axis.
+    """
+    return _bravais((Lx, Ly, Lz), boundary,
+                    [(1, 0, 0), (0, 1, 0), (0, 0, 1)])
+
+
+@functools.lru_cache(maxsize=128)
+def honeycomb(Lx, Ly, boundary='p'):
+    """Return the honeycomb lattice of Lx x Ly two-site unit cells.
+
+    Site 2*c is the A site and 2*c + 1 the B site of cell c = x*Ly + y.
+    A sites bond to the B sites of cells c, c - (1, 0) and c - (0, 1).
+
+    Args:
+        Lx (int): Number of unit cells along the first lattice vector.
+        Ly (int): Number of unit cells along the second lattice vector.
+        boundary (str or tuple): 'o', 'p' or 't' for all or each axis.
+    """
+    shape = (int(Lx), int(Ly))
+    boundary = _get_boundary(boundary, 2)
+    ncell = shape[0]*shape[1]
+    cells = numpy.arange(ncell)
+    offsets = numpy.array([(0, 0), (-1, 0), (0, -1)])
+    ca, wa = _bonds(shape, boundary, cells, offsets)
+    cb, wb = _bonds(shape, boundary, cells, -offsets)
+    # the A-B bond within a cell is never cut
+    ca[:, 0] = cells
+    cb[:, 0] = cells
+    nn = numpy.zeros((2*ncell, 3), dtype=numpy.int64)
+    nn[0::2] = numpy.where(ca >= 0, 2*ca + 1, -1)
+    nn[1::2] = numpy.where(cb >= 0, 2*cb, -1)
+    wind = numpy.zeros((2*ncell, 3, 2), dtype=numpy.int64)
+    wind[0::2] = wa
+    wind[1::2] = wb
+    return _freeze(nn, wind, shape, boundary)
+
+
+_GENERATORS = {
+    'square': (square, 2),
+    'rectangular': (rectangular, 2),
+    'triangular': (triangular, 2),
+    'honeycomb': (honeycomb, 2),
+    'cubic': (cubic, 3),
+}
+
+
+def get_lattice(name, shape, boundary='p'):
+    """Return a lattice by keyword.
+
+    Args:
+        name (str): 'square', 'rectangular', 'triangular', 'honeycomb' or
+            'cubic'.
+        shape (tuple): Number of unit cells along each axis.
+        boundary (str or tuple): 'o', 'p' or 't' for all or each axis.
+    """
+    if name not in _GENERATORS:
+        raise Exception("Unrecognized lattice keyword!")
+    gen, d = _GENERATORS[name]
+    if len(shape) != d:
+        raise Exception("Expected a shape with {} axes".format(d))
+    if not isinstance(boundary, str):
+        boundary = tuple(boundary)
+    return gen(*shape, boundary=boundary)
+
+
+def get_twist(lat, twist):
+    """Return the (N, z) bond phase angles of a twisted lattice.
+
+    Args:
+        lat (Lattice): Lattice with twisted axes.
+        twist (float or tuple): Twist angle for each axis. Angles on
+            axes that are not twisted are ignored.
+    """
+    d = len(lat.shape)
+    twist = numpy.broadcast_to(numpy.asarray(twist, dtype=float), (d,))
+    twist = numpy.where([b == 't' for b in lat.boundary], twist, 0.0)
+    return lat.wind @ twist
@@ -0,0 +1,60 @@
+import numpy
+from . import interaction
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+
+class Model(object):
+    """Common interface of the lattice models.
+
+    A model has N spatial sites and 2N spin-orbitals, orbitals 0..N-1 are
+    alpha and N..2N-1 are beta. FCISimple only uses the methods below.
+    Subclasses set `N` and implement `get_tmat` and either
+    `get_interaction` or `get_umat`.
+
+    Attributes:
+        N (int): Number of sites.
+    """
+    def get_dim(self):
+        """Return spin-orbital dimension."""
+        return 2*self.N
+
+    def get_tmat(self, phase=None, sparse=False):
+        """Return the hopping matrix in the spin-orbital basis."""
+        raise NotImplementedError
+
+    def get_vmat(self, sparse=False):
+        """Return the one-body potential in the spin-orbital basis."""
+        n = self.get_dim()
+        if sparse:
+            if scipy is None:
+                raise Exception("scipy is required for sparse output")
+            return scipy.sparse.csr_matrix((n, n))
+        return numpy.zeros((n, n))
+
+    def get_hmat(self, phase=None, sparse=False):
+        """Return the one-body Hamiltonian h = T + V.
+
+        Args:
+            phase (float): Peierls phase passed to `get_tmat`.
+            sparse (bool): Return a scipy.sparse CSR matrix.
+        """
+        if sparse:
+            h = self.get_tmat(phase=phase, sparse=True)
+            return (h + self.get_vmat(sparse=True)).tocsr()
+        return self.get_tmat(phase=phase) + self.get_vmat()
+
+    def get_interaction(self):
+        """Return the two-body interaction as an Interaction."""
+        if type(self).get_umat is Model.get_umat:
+            raise NotImplementedError(
+                "{} implements neither get_interaction nor get_umat".format(
+                    type(self).__name__))
+        return interaction.from_dense(self.get_umat())
+
+    def get_umat(self):
+        """Return the dense two-body interaction tensor."""
+        return self.get_interaction().todense()
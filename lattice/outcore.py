@@ -0,0 +1,357 @@
+import os
+import shutil
+import logging
+import tempfile
+import numpy
+
+# target size of the blocks that are read into memory at once
+_BLOCK_BYTES = 1 << 26
+
+
+class CIVector(object):
+    """Lazy handle of a CI vector stored in an .npy file.
+
+    Nothing is read until `load` is called, `array` gives a memory map.
+
+    Attributes:
+        path (str): Path of the .npy file.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def array(self, mode='r'):
+        """Return the vector as a numpy.memmap."""
+        return numpy.load(self.path, mmap_mode=mode)
+
+    @property
+    def shape(self):
+        return self.array().shape
+
+    @property
+    def dtype(self):
+        return self.array().dtype
+
+    def load(self):
+        """Return the vector as an in-memory array."""
+        return numpy.array(self.array())
+
+    def __array__(self, dtype=None, copy=None):
+        x = self.load()
+        return x if dtype is None else x.astype(dtype)
+
+
+def _scratch(path, name, shape, dtype):
+    """Return a zero-initialized memmap in the directory path."""
+    return numpy.lib.format.open_memmap(
+        os.path.join(path, name + '.npy'), mode='w+', dtype=dtype,
+        shape=shape)
+
+
+def _chunks(n, ncol, itemsize):
+    """Yield row slices of an (n, ncol) array of about _BLOCK_BYTES."""
+    step = max(1, _BLOCK_BYTES//max(1, ncol*itemsize))
+    for i0 in range(0, n, step):
+        yield slice(i0, min(i0 + step, n))
+
+
+def _read_rows(X, J):
+    """Return X[J], reading the rows in increasing order."""
+    order = numpy.argsort(J, kind='stable')
+    out = numpy.empty((J.shape[0],) + X.shape[1:], dtype=X.dtype)
+    out[order] = X[J[order]]
+    return out
+
+
+def sigma(fci, x, out=None, phase=None, blksize=None):
+    """Apply H to CI vectors stored on disk, one block of rows at a time.
+
+    The rows of the (na, nb) CI matrix are alpha strings. For each block
+    of output rows the beta terms act within the block, while the alpha
+    and alpha-beta terms gather the input rows they connect to. Only the
+    current block and the gathered rows are held in memory, so x and out
+    may be numpy.memmap arrays larger than the memory.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        x (array): (k,) or (k, m) vectors, e.g. a numpy.memmap.
+        out (array): (k, m) output array, allocated in memory if None.
+        phase (float): Peierls phase passed to the model.
+        blksize (int): Alpha strings per block.
+    """
+    na, nb, la, lb = fci._get_links()
+    terms = fci._get_sigma_terms(phase)
+    X = x.reshape(na, nb, -1)
+    m = X.shape[2]
+    dtype = numpy.result_type(X.dtype, terms['dtype'])
+    if out is None:
+        out = numpy.zeros(x.shape, dtype=dtype)
+    Y = out.reshape(na, nb, m)
+    if blksize is None:
+        blksize = max(1, _BLOCK_BYTES//(nb*m*dtype.itemsize))
+    inverse = {}
+
+    def _inverse(pq):
+        # row J of E_pq C comes from row J_pq[inv[J]] of C
+        if pq not in inverse:
+            I, J, sign = la[pq]
+            inv = numpy.full(na, -1, dtype=numpy.int64)
+            inv[I] = numpy.arange(I.shape[0])
+            inverse[pq] = inv
+        return inverse[pq]
+
+    def _apply(X0, link, v, Y0):
+        I, J, sign = link
+        Y0[I] += (v*sign)[:, None, None]*X0[J]
+
+    for i0 in range(0, na, blksize):
+        i1 = min(i0 + blksize, na)
+        C = numpy.asarray(X[i0:i1], dtype=dtype)
+        blk = fci._diagonal(terms, slice(i0, i1))[:, :, None]*C
+
+        # the beta terms only mix determinants within a row
+        Ct = numpy.ascontiguousarray(C.transpose(1, 0, 2))
+        outt = numpy.zeros(Ct.shape, dtype=dtype)
+        for p, q, v in terms['b']:
+            _apply(Ct, lb[p, q], v, outt)
+        for p, q, r, s, v in terms['bb']:
+            T = numpy.zeros(Ct.shape, dtype=dtype)
+            _apply(Ct, lb[q, s], 1.0, T)
+            _apply(T, lb[p, r], v, outt)
+            if q == r:
+                _apply(Ct, lb[p, s], -v, outt)
+        blk += outt.transpose(1, 0, 2)
+
+        def _gather(link):
+            """Return the links of output rows in the block."""
+            I, J, sign = link
+            sel = (I >= i0) & (I < i1)
+            return I[sel] - i0, J[sel], sign[sel]
+
+        for p, q, v in terms['a']:
+            I, J, sign = _gather(la[p, q])
+            if I.shape[0] > 0:
+                blk[I] += (v*sign)[:, None, None]*_read_rows(X, J)
+        for p, q, r, s, v in terms['aa']:
+            # a^+_p a^+_q a_s a_r = E_pr E_qs - delta_qr E_ps
+            I, J, sign = _gather(la[p, r])
+            idx = _inverse((q, s))[J]
+            ok = idx >= 0
+            if numpy.any(ok):
+                Iq, Jq, sq = la[q, s]
+                src = Jq[idx[ok]]
+                fac = v*sign[ok]*sq[idx[ok]]
+                blk[I[ok]] += fac[:, None, None]*_read_rows(X, src)
+            if q == r:
+                I, J, sign = _gather(la[p, s])
+                if I.shape[0] > 0:
+                    blk[I] -= (v*sign)[:, None, None]*_read_rows(X, J)
+        for p, q, r, s, v in terms['ab']:
+            Ia, Ja, sa = _gather(la[p, r])
+            if Ia.shape[0] == 0:
+                continue
+            Ib, Jb, sb = lb[q, s]
+            fac = v*sa[:, None]*sb[None, :]
+            rows = _read_rows(X, Ja)
+            blk[numpy.ix_(Ia, Ib)] += fac[:, :, None]*rows[:, Jb]
+        Y[i0:i1] = blk
+    return out
+
+
+def _lowest(x, n, rows):
+    """Return the indices of the n lowest entries of x, read by blocks.
+
+    Ties are broken by the index, as in a stable argsort of x.
+    """
+    idx = numpy.zeros(0, dtype=numpy.int64)
+    val = numpy.zeros(0)
+    for c in rows:
+        v = numpy.asarray(x[c])
+        low = numpy.argsort(v, kind='stable')[:n]
+        idx = numpy.concatenate((idx, low + c.start))
+        val = numpy.concatenate((val, v[low]))
+        keep = numpy.lexsort((idx, val))[:n]
+        idx = idx[keep]
+        val = val[keep]
+    return idx
+
+
+def _project(A, V, m, rows):
+    """Remove the span of the first m columns of V from A in place."""
+    if m == 0:
+        return
+    S = numpy.zeros((m, A.shape[1]), dtype=A.dtype)
+    for c in rows:
+        S += V[c, :m].conj().T @ A[c]
+    for c in rows:
+        A[c] -= V[c, :m] @ S
+
+
+def davidson(fci, nroots=1, path=None, x0=None, tol=1e-12,
+             tol_residual=1e-6, maxiter=200, max_space=None, phase=None,
+             lindep=1e-10):
+    """Davidson's method with the subspace stored in memory-mapped files.
+
+    This follows `solvers.davidson`, but the subspace, its image and the
+    correction vectors live in .npy files and every operation streams
+    over blocks of determinants. The diagonal of H is written to a file
+    as well, so only the subspace matrix and the string factors of the
+    diagonal and the replacement lists are kept in memory.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        nroots (int): Number of roots.
+        path (str): Directory of the scratch and result files, a new
+            temporary directory if not given.
+        x0 (array): Initial guess, (k,) or (k, m).
+        tol (float): Convergence threshold on the eigenvalues.
+        tol_residual (float): Convergence threshold on the residual norms.
+        maxiter (int): Maximum number of iterations.
+        max_space (int): Subspace size that triggers a restart.
+        phase (float): Peierls phase passed to the model.
+        lindep (float): Threshold for linearly dependent corrections.
+
+    Returns:
+        (array, list): The eigenvalues and a CIVector for each root, in
+            the files root0.npy, root1.npy, ... of path.
+    """
+    if path is None:
+        path = tempfile.mkdtemp()
+    os.makedirs(path, exist_ok=True)
+    work = tempfile.mkdtemp(dir=path)
+    terms = fci._get_sigma_terms(phase)
+    na, nb = fci._get_links()[:2]
+    dtype = numpy.dtype(terms['dtype'])
+    k = fci.k
+    nroots = min(nroots, k)
+    if max_space is None:
+        max_space = max(20, 8*nroots)
+    size = min(max(max_space, 2*nroots), k)
+    try:
+        V = _scratch(work, 'V', (k, size), dtype)
+        AV = _scratch(work, 'AV', (k, size), dtype)
+        T = _scratch(work, 'T', (k, nroots), dtype)
+        AT = _scratch(work, 'AT', (k, nroots), dtype)
+        rows = list(_chunks(k, size, dtype.itemsize))
+        diag = _scratch(work, 'diag', (k,), numpy.float64)
+        for c in _chunks(na, nb, diag.itemsize):
+            diag[c.start*nb:c.stop*nb] = fci._diagonal(terms, c).reshape(-1)
+        Hsub = numpy.zeros((size, size), dtype=dtype)
+
+        # initial guess, unit vectors on the lowest diagonal elements
+        if x0 is not None:
+            x0 = numpy.asarray(x0).reshape(k, -1)[:, :nroots]
+        nguess = 0 if x0 is None else x0.shape[1]
+        order = _lowest(diag, nroots - nguess, rows)
+        for c in rows:
+            if x0 is not None:
+                T[c, :nguess] = x0[c]
+        T[order, nguess + numpy.arange(order.shape[0])] = 1.0
+        m = 0
+
+        def _append(m, nt):
+            """Orthonormalize T[:, :nt] and add it to the subspace."""
+            norm = numpy.zeros(nt)
+            for c in rows:
+                norm += numpy.einsum('ij,ij->j', T[c, :nt].conj(),
+                                     T[c, :nt]).real
+            norm = numpy.sqrt(numpy.maximum(norm, 1e-300))
+            u = numpy.diag(1.0/norm)
+            # two passes of projection and canonical orthonormalization,
+            # the second one restores the orthogonality lost in the first
+            for _ in range(2):
+                for c in rows:
+                    T[c, :u.shape[1]] = T[c, :nt] @ u
+                nt = u.shape[1]
+                _project(T[:, :nt], V, m, rows)
+                G = numpy.zeros((nt, nt), dtype=dtype)
+                for c in rows:
+                    G += T[c, :nt].conj().T @ T[c, :nt]
+                w, u = numpy.linalg.eigh(0.5*(G + G.conj().T))
+                keep = w > lindep**2
+                if not numpy.any(keep) or m + keep.sum() > size:
+                    return m, 0
+                u = u[:, keep]/numpy.sqrt(w[keep])
+            for c in rows:
+                T[c, :u.shape[1]] = T[c, :nt] @ u
+                T[c, u.shape[1]:] = 0.0
+            nt = u.shape[1]
+            for c in rows:
+                V[c, m:m + nt] = T[c, :nt]
+            sigma(fci, T, out=AT, phase=phase)
+            H = numpy.zeros((m + nt, nt), dtype=dtype)
+            for c in rows:
+                AV[c, m:m + nt] = AT[c, :nt]
+                H += V[c, :m + nt].conj().T @ AT[c, :nt]
+            Hsub[:m + nt, m:m + nt] = H
+            Hsub[m:m + nt, :m] = H[:m].conj().T
+            return m + nt, nt
+
+        m, nt = _append(0, nroots)
+        e_old = numpy.zeros(nroots)
+        conv = numpy.zeros(nroots, dtype=bool)
+        for it in range(maxiter):
+            H = 0.5*(Hsub[:m, :m] + Hsub[:m, :m].conj().T)
+            theta, s = numpy.linalg.eigh(H)
+            theta = theta[:nroots]
+            s = s[:, :nroots]
+            rnorm = numpy.zeros(nroots)
+            for c in rows:
+                R = AV[c, :m] @ s - (V[c, :m] @ s)*theta[None, :]
+                rnorm += numpy.einsum('ij,ij->j', R.conj(), R).real
+                denom = theta[None, :] - diag[c, None]
+                denom[numpy.abs(denom) < 1e-8] = 1e-8
+                T[c] = R/denom
+            rnorm = numpy.sqrt(rnorm)
+            de = numpy.abs(theta - e_old)
+            e_old = theta
+            conv = (rnorm < tol_residual) & (de < tol)
+            logging.info("outcore davidson {}: e = {} |r| = {}".format(
+                it, theta[0], rnorm.max()))
+            if numpy.all(conv):
+                break
+            todo = numpy.nonzero(~conv)[0]
+            for c in rows:
+                T[c, :todo.shape[0]] = T[c][:, todo]
+            if m + todo.shape[0] > size:
+                # restart from the current Ritz vectors, row by row
+                for c in rows:
+                    X = V[c, :m] @ s
+                    AX = AV[c, :m] @ s
+                    V[c, :nroots] = X
+                    AV[c, :nroots] = AX
+                Hsub[:] = 0.0
+                Hsub[:nroots, :nroots] = numpy.diag(theta)
+                m = nroots
+            m, nt = _append(m, todo.shape[0])
+            if nt == 0:
+                if numpy.any(rnorm >= tol_residual):
+                    logging.warning(
+                        "outcore davidson stopped with linearly dependent"
+                        " corrections, |r| = {}".format(rnorm.max()))
+                break
+        else:
+            logging.warning(
+                "outcore davidson did not converge in {} iterations".format(
+                    maxiter))
+
+        # Ritz vectors, one contiguous file per root
+        H = 0.5*(Hsub[:m, :m] + Hsub[:m, :m].conj().T)
+        theta, s = numpy.linalg.eigh(H)
+        theta = theta[:nroots]
+        s = s[:, :nroots]
+        out = []
+        files = []
+        for i in range(nroots):
+            f = os.path.join(path, 'root{}.npy'.format(i))
+            files.append(numpy.lib.format.open_memmap(
+                f, mode='w+', dtype=dtype, shape=(k,)))
+            out.append(CIVector(f))
+        for c in rows:
+            X = V[c, :m] @ s
+            for i in range(nroots):
+                files[i][c] = X[:, i]
+        for x in files:
+            x.flush()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return theta, out
@@ -0,0 +1,244 @@
+import numpy
+from . import utils
+
+
+def _get_civec(fci, c):
+    """Return CI vector(s) as an (na, nb, m) array and whether c was 1D."""
+    na, nb, la, lb = fci._get_links()
+    c = numpy.asarray(c)
+    return c.reshape(na, nb, -1), c.ndim == 1
+
+
+def _squeeze(x, single):
+    return x[0] if single else x
+
+
+def _images(C, links, N, spin):
+    """Return T[p, q] = E_pq C for all orbital pairs of one spin.
+
+    The result has N*N times the size of C.
+    """
+    T = numpy.zeros((N, N) + C.shape, dtype=C.dtype)
+    for (p, q), (I, J, sign) in links.items():
+        s = sign[:, None, None]
+        if spin == 0:
+            T[p, q][I] = s*C[J]
+        else:
+            T[p, q][:, I] = s.transpose(1, 0, 2)*C[:, J]
+    return T
+
+
+def _expect_ab(C, link_a, link_b):
+    """Return <C|E^a_pr E^b_qs|C> for each root."""
+    Ia, Ja, sa = link_a
+    Ib, Jb, sb = link_b
+    fac = sa[:, None, None]*sb[None, :, None]
+    X = fac*C[numpy.ix_(Ja, Jb)]
+    return numpy.einsum('abm,abm->m', C[numpy.ix_(Ia, Ib)].conj(), X)
+
+
+def make_rdm1s(fci, c):
+    """Return the alpha and beta one-particle density matrices.
+
+    gamma_s[p, q] = <a^+_ps a_qs>, computed from the single-replacement
+    lists used by `FCISimple.sigma`.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+
+    Returns:
+        (array, array): (N, N) matrices, or (m, N, N) for a block.
+    """
+    na, nb, la, lb = fci._get_links()
+    C, single = _get_civec(fci, c)
+    N = fci.model.N
+    m = C.shape[2]
+    Ct = C.transpose(1, 0, 2)
+    out = []
+    for links, X in ((la, C), (lb, Ct)):
+        dm = numpy.zeros((m, N, N), dtype=C.dtype)
+        for (p, q), (I, J, sign) in links.items():
+            v = numpy.einsum('ibm,ibm->im', X[I].conj(), X[J])
+            dm[:, p, q] = sign @ v
+        out.append(_squeeze(dm, single))
+    return tuple(out)
+
+
+def make_rdm1(fci, c):
+    """Return the spin-summed one-particle density matrix."""
+    dma, dmb = make_rdm1s(fci, c)
+    return dma + dmb
+
+
+def make_rdm2s(fci, c):
+    """Return the spin-resolved two-particle density matrices.
+
+    Gamma[p, q, r, s] = <a^+_p a^+_q a_s a_r> for (alpha, alpha),
+    (alpha, beta) and (beta, beta) spins of (p, r) and (q, s). They are
+    computed from the single excitations T_pq = E_pq C as
+    <E_pr E_qs> = <T_rp|T_qs>, with N^2 times the memory of the CI
+    vectors.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+
+    Returns:
+        (array, array, array): (N, N, N, N) arrays, or (m, N, N, N, N)
+            for a block.
+    """
+    na, nb, la, lb = fci._get_links()
+    C, single = _get_civec(fci, c)
+    N = fci.model.N
+    m = C.shape[2]
+    dma, dmb = make_rdm1s(fci, C.reshape(-1, m))
+    Ta = _images(C, la, N, 0).reshape(N*N, -1, m).transpose(2, 0, 1)
+    Tb = _images(C, lb, N, 1).reshape(N*N, -1, m).transpose(2, 0, 1)
+
+    def _pair(X, Y):
+        # G[m, p, q, r, s] = <X_rp|Y_qs>
+        G = (X.conj() @ Y.transpose(0, 2, 1)).reshape(m, N, N, N, N)
+        return G.transpose(0, 2, 3, 1, 4)
+
+    eye = numpy.eye(N)
+    aa = _pair(Ta, Ta) - numpy.einsum('qr,mps->mpqrs', eye, dma)
+    bb = _pair(Tb, Tb) - numpy.einsum('qr,mps->mpqrs', eye, dmb)
+    ab = _pair(Ta, Tb)
+    return _squeeze(aa, single), _squeeze(ab, single), _squeeze(bb, single)
+
+
+def make_rdm12(fci, c):
+    """Return the spin-orbital one- and two-particle density matrices.
+
+    The energy is sum_pq h[p, q] dm1[p, q] + 1/2 sum U[p, q, r, s]
+    dm2[p, q, r, s] in the conventions of the models.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+    """
+    dma, dmb = make_rdm1s(fci, c)
+    aa, ab, bb = make_rdm2s(fci, c)
+    N = fci.model.N
+    a = slice(0, N)
+    b = slice(N, 2*N)
+    lead = dma.shape[:-2]
+    dm1 = numpy.zeros(lead + (2*N, 2*N), dtype=dma.dtype)
+    dm1[..., a, a] = dma
+    dm1[..., b, b] = dmb
+    dm2 = numpy.zeros(lead + (2*N,)*4, dtype=aa.dtype)
+    n = len(lead)
+
+    def _t(*axes):
+        return tuple(range(n)) + tuple(n + x for x in axes)
+
+    dm2[..., a, a, a, a] = aa
+    dm2[..., b, b, b, b] = bb
+    dm2[..., a, b, a, b] = ab
+    dm2[..., b, a, b, a] = ab.transpose(_t(1, 0, 3, 2))
+    dm2[..., a, b, b, a] = -ab.transpose(_t(0, 1, 3, 2))
+    dm2[..., b, a, a, b] = -ab.transpose(_t(1, 0, 2, 3))
+    return dm1, dm2
+
+
+def _probabilities(fci, c):
+    """Return |C|^2 and the alpha and beta string occupations."""
+    C, single = _get_civec(fci, c)
+    N = fci.model.N
+    P = numpy.abs(C)**2
+    oa = utils.bits_to_bool(fci.astrings, N).astype(float)
+    ob = utils.bits_to_bool(fci.bstrings, N).astype(float)
+    return P, oa, ob, single
+
+
+def double_occupancy(fci, c):
+    """Return <n_i,alpha n_i,beta> of each site.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+
+    Returns:
+        array: (N,) or (m, N) double occupancies.
+    """
+    P, oa, ob, single = _probabilities(fci, c)
+    d = numpy.einsum('abm,ai,bi->mi', P, oa, ob)
+    return _squeeze(d, single)
+
+
+def _diagonal_correlations(fci, c):
+    """Return <n^s_i n^s'_j> for the spin pairs aa, ab and bb."""
+    P, oa, ob, single = _probabilities(fci, c)
+    pa = P.sum(axis=1)
+    pb = P.sum(axis=0)
+    aa = numpy.einsum('am,ai,aj->mij', pa, oa, oa)
+    bb = numpy.einsum('bm,bi,bj->mij', pb, ob, ob)
+    ab = numpy.einsum('abm,ai,bj->mij', P, oa, ob)
+    return aa, ab, bb, single
+
+
+def density_correlation(fci, c):
+    """Return <n_i n_j> with n_i = n_i,alpha + n_i,beta.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+
+    Returns:
+        array: (N, N) or (m, N, N) correlations.
+    """
+    aa, ab, bb, single = _diagonal_correlations(fci, c)
+    nn = aa + bb + ab + ab.transpose(0, 2, 1)
+    return _squeeze(nn, single)
+
+
+def spin_correlation(fci, c):
+    """Return <S_i . S_j> for all pairs of sites.
+
+    The transverse part uses S^+_i S^-_j = delta_ij E^a_ii - E^a_ij E^b_ji.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+
+    Returns:
+        array: (N, N) or (m, N, N) correlations.
+    """
+    na, nb, la, lb = fci._get_links()
+    aa, ab, bb, single = _diagonal_correlations(fci, c)
+    zz = 0.25*(aa + bb - ab - ab.transpose(0, 2, 1))
+    C, _ = _get_civec(fci, c)
+    N = fci.model.N
+    dma, dmb = make_rdm1s(fci, C.reshape(-1, C.shape[2]))
+    pm = numpy.zeros(zz.shape, dtype=C.dtype)
+    for i in range(N):
+        for j in range(N):
+            pm[:, i, j] = -_expect_ab(C, la[i, j], lb[j, i])
+    idx = numpy.arange(N)
+    pm[:, idx, idx] += dma[:, idx, idx]
+    # S^-_i S^+_j = (S^+_j S^-_i)^+
+    mp = pm.transpose(0, 2, 1).conj()
+    ss = zz + 0.5*(pm + mp).real
+    return _squeeze(ss, single)
+
+
+def bond_currents(fci, c, phase=None):
+    """Return the particle currents J[i, j] from site i to site j.
+
+    J_ij = -2 Im(h_ij <a^+_i a_j>), summed over spin, where h is the
+    one-body Hamiltonian of the model at the given Peierls phase.
+
+    Args:
+        fci (FCISimple): Determinant space with fixed m_s.
+        c (array): (k,) CI vector or (k, m) block of CI vectors.
+        phase (float): Peierls phase of the CI vectors.
+
+    Returns:
+        array: (N, N) or (m, N, N) antisymmetric currents.
+    """
+    N = fci.model.N
+    h = fci.model.get_hmat(phase=phase)
+    dma, dmb = make_rdm1s(fci, c)
+    J = -2*(h[:N, :N]*dma).imag - 2*(h[N:, N:]*dmb).imag
+    return J
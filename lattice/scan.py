@@ -0,0 +1,188 @@
+import numpy
+import logging
+from . import solvers
+from . import interaction
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+
+def _split_hmat(model):
+    """Return the parts of h(phase) = T0 + e^{i phase} Tp + e^{-i phase} Tm.
+
+    The parts are found from the model at the phases 0, pi/2 and pi and
+    checked at a fourth phase.
+    """
+    T1 = model.get_hmat(phase=0.0)
+    T2 = model.get_hmat(phase=0.5*numpy.pi)
+    T3 = model.get_hmat(phase=numpy.pi)
+    T0 = 0.5*(T1 + T3)
+    S = 0.5*(T1 - T3)
+    D = -1.j*(T2 - T0)
+    Tp = 0.5*(S + D)
+    Tm = 0.5*(S - D)
+    phi = 1.0
+    T = model.get_hmat(phase=phi)
+    err = T - (T0 + numpy.exp(1.j*phi)*Tp + numpy.exp(-1.j*phi)*Tm)
+    if numpy.abs(err).max() > 1e-12:
+        raise Exception("h is not linear in exp(i phase)")
+    return T0, Tp, Tm
+
+
+class PhaseScan(object):
+    """Hamiltonian of an FCISimple space as a function of the Peierls phase.
+
+    The Hamiltonian is split as
+
+        H(phase) = H0 + e^{i phase} Hp + e^{-i phase} Hm
+
+    where H0 holds the two-electron part and the phase-independent hopping
+    and Hp, Hm hold the hopping terms that pick up the Peierls phase. The
+    three parts are built once on a common sparsity pattern, so H at a new
+    phase only combines three arrays of matrix elements.
+
+    Attributes:
+        fci (FCISimple): Determinant space.
+        nnz (int): Number of stored matrix elements.
+    """
+    def __init__(self, fci):
+        """Build the phase-independent parts of H.
+
+        Args:
+            fci (FCISimple): Determinant space.
+        """
+        self.fci = fci
+        k = fci.k
+        T0, Tp, Tm = _split_hmat(fci.model)
+        U = interaction.get_interaction(fci.model)
+        empty = interaction.Interaction(fci.norb, [], [])
+
+        keys = []
+        vals = []
+        parts = ((T0, U), (Tp, empty), (Tm, empty))
+        for i, (T, V) in enumerate(parts):
+            rows, cols, h = fci._get_coo(T, V)
+            keys.append(rows*k + cols)
+            v = numpy.zeros((3, h.shape[0]), dtype=complex)
+            v[i] = h
+            vals.append(v)
+        keys = numpy.concatenate(keys)
+        vals = numpy.concatenate(vals, axis=1)
+
+        # merge onto one sorted (row, col) pattern
+        keys, inv = numpy.unique(keys, return_inverse=True)
+        data = numpy.zeros((3, keys.shape[0]), dtype=complex)
+        for i in range(3):
+            numpy.add.at(data[i], inv, vals[i])
+        keep = numpy.any(numpy.abs(data) > 1e-14, axis=0)
+        keys = keys[keep]
+        self._data = data[:, keep]
+        self._rows = keys//k
+        self.indices = keys % k
+        self.indptr = numpy.zeros(k + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(self._rows, minlength=k),
+                     out=self.indptr[1:])
+        self.nnz = keys.shape[0]
+        self._diag = self._rows == self.indices
+
+    def get_data(self, phases):
+        """Return the matrix elements of H for one or more phases.
+
+        Args:
+            phases (float or array): Peierls phase(s).
+
+        Returns:
+            array: (nnz,) elements for a scalar phase, otherwise
+                (len(phases), nnz), in the order of `indices`.
+        """
+        phases = numpy.asarray(phases, dtype=float)
+        f = numpy.exp(1.j*phases)[..., None]
+        d0, dp, dm = self._data
+        return d0 + f*dp + f.conj()*dm
+
+    def getH(self, phase, sparse=False):
+        """Return the Hamiltonian at a given phase.
+
+        Args:
+            phase (float): Peierls phase.
+            sparse (bool): Return a scipy.sparse CSR matrix. A dense
+                matrix is returned if scipy is not available.
+        """
+        return self._to_matrix(self.get_data(phase), sparse)
+
+    def get_current(self, phase, v):
+        """Return <v|dH/dphase|v> for each column of v.
+
+        Args:
+            phase (float): Peierls phase.
+            v (array): (k,) vector or (k, m) block of normalized vectors.
+        """
+        f = numpy.exp(1.j*phase)
+        _, dp, dm = self._data
+        dH = self._to_matrix(1.j*(f*dp - numpy.conj(f)*dm), True)
+        v = numpy.asarray(v)
+        return numpy.einsum('i...,i...->...', v.conj(), dH @ v).real
+
+    def _to_matrix(self, data, sparse):
+        k = self.fci.k
+        if sparse and scipy is None:
+            logging.warning("scipy is not available, H will be dense")
+        if sparse and scipy is not None:
+            return scipy.sparse.csr_matrix(
+                (data, self.indices, self.indptr), shape=(k, k))
+        H = numpy.zeros((k, k), dtype=data.dtype)
+        H[self._rows, self.indices] = data
+        return H
+
+    def run(self, phases, nroots=1, method='dense', return_vectors=False,
+            **kwargs):
+        """Return the lowest eigenvalues of H over a set of phases.
+
+        The iterative solvers are started from the eigenvectors at the
+        previous phase, so a fine scan converges in a few iterations.
+
+        Args:
+            phases (array): Peierls phases, in scan order.
+            nroots (int): Number of roots.
+            method (str): 'dense', 'davidson' or 'lanczos'.
+            return_vectors (bool): Also return the eigenvectors.
+            kwargs: Options passed to the iterative solver.
+
+        Returns:
+            array: (len(phases), nroots) energies, and with `return_vectors`
+                also the (len(phases), k, nroots) eigenvectors.
+        """
+        if method == 'davidson':
+            solver = solvers.davidson
+        elif method == 'lanczos':
+            solver = solvers.lanczos
+        elif method != 'dense':
+            raise Exception("Unrecognized method: {}".format(method))
+        phases = numpy.asarray(phases, dtype=float).reshape(-1)
+        nroots = min(nroots, self.fci.k)
+        es = numpy.zeros((phases.shape[0], nroots))
+        vs = [] if return_vectors else None
+        v = None
+        for i, phase in enumerate(phases):
+            data = self.get_data(phase)
+            if method == 'dense':
+                H = self._to_matrix(data, False)
+                if return_vectors:
+                    e, v = numpy.linalg.eigh(H)
+                    e, v = e[:nroots], v[:, :nroots]
+                else:
+                    e = numpy.linalg.eigvalsh(H)[:nroots]
+            else:
+                H = self._to_matrix(data, True)
+                diag = numpy.zeros(self.fci.k, dtype=complex)
+                diag[self._rows[self._diag]] = data[self._diag]
+                e, v = solver(H.__matmul__, diag.real, nroots=nroots,
+                              x0=v, dtype=complex, **kwargs)
+            es[i] = e
+            if return_vectors:
+                vs.append(v)
+        if return_vectors:
+            return es, numpy.stack(vs)
+        return es
@@ -0,0 +1,421 @@
+import numpy
+import logging
+from . import utils
+from . import interaction
+
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+except ImportError:
+    scipy = None
+
+
+class DIIS(object):
+    """Pulay (DIIS) extrapolation of a fixed-point iteration x -> g(x).
+
+    The next input is sum_i c_i g(x_i) with sum_i c_i = 1 and the norm
+    of sum_i c_i (g(x_i) - x_i) minimized over the stored iterations.
+
+    Attributes:
+        space (int): Number of stored iterations.
+    """
+    def __init__(self, space=8):
+        self.space = space
+        self._out = []
+        self._res = []
+
+    def update(self, x, gx):
+        """Store the pair (x, g(x)) and return the extrapolated input."""
+        self._out.append(gx.reshape(-1))
+        self._res.append((gx - x).reshape(-1))
+        if len(self._out) > self.space:
+            self._out.pop(0)
+            self._res.pop(0)
+        n = len(self._res)
+        R = numpy.array(self._res)
+        B = numpy.zeros((n + 1, n + 1))
+        B[:n, :n] = (R.conj() @ R.T).real
+        B[n, :n] = B[:n, n] = -1.0
+        rhs = numpy.zeros(n + 1)
+        rhs[n] = -1.0
+        # scale for the conditioning of nearly converged iterations
+        scale = max(numpy.abs(numpy.diag(B[:n, :n])).max(), 1e-300)
+        B[:n, :n] /= scale
+        try:
+            c = numpy.linalg.solve(B, rhs)[:n]
+        except numpy.linalg.LinAlgError:
+            c = numpy.linalg.lstsq(B, rhs, rcond=None)[0][:n]
+        return (c @ numpy.array(self._out)).reshape(gx.shape)
+
+
+def _get_onsite(model):
+    """Return the on-site U of each site, or raise for other interactions."""
+    U = interaction.get_interaction(model)
+    if U.onsite is None:
+        raise Exception("SCF requires an on-site (Hubbard) interaction")
+    return numpy.asarray(U.onsite, dtype=float)
+
+
+def _eigh(F, nocc, sparse):
+    """Return the orbital energies and orbitals of a Fock matrix.
+
+    With sparse diagonalization only the nocc + 1 lowest orbitals are
+    computed, by shift-invert Lanczos below the Gershgorin bound of the
+    spectrum, which resolves the closely spaced levels of a band edge.
+    Beyond a tenth of the spectrum a partial solve is slower than a full
+    one, and the matrix is diagonalized densely instead.
+    """
+    n = F.shape[0]
+    if sparse and scipy is not None and 0 < nocc < n//10:
+        d = F.diagonal().real
+        lo = (d - (abs(F).sum(axis=1).A1 - abs(d))).min()
+        shift = lo - 1e-3*max(1.0, abs(lo))
+        # a fixed start vector keeps the iterations reproducible
+        v0 = numpy.random.RandomState(1).rand(n)
+        e, c = scipy.sparse.linalg.eigsh(
+            F.tocsc(), k=nocc + 1, sigma=shift, which='LM', v0=v0)
+        order = numpy.argsort(e)
+        return e[order], c[:, order]
+    if scipy is not None and scipy.sparse.issparse(F):
+        F = F.toarray()
+    return numpy.linalg.eigh(F)
+
+
+class SCF(object):
+    """Hartree-Fock for lattice models with an on-site interaction.
+
+    For H = sum h_pq a^+_p a_q + sum_i U_i n_i,alpha n_i,beta the Fock
+    matrix is h plus a site-diagonal mean field, which depends only on
+    the site densities (and, for GHF, the on-site spin-flip amplitudes).
+    These O(N) parameters are what is iterated and DIIS-extrapolated, so
+    building a Fock matrix costs O(N) on top of h, which may be a
+    scipy.sparse matrix for large lattices.
+
+    Attributes:
+        model: Lattice model.
+        kind (str): 'rhf', 'uhf' or 'ghf'.
+        n_alpha (int): Number of alpha electrons (not used by GHF).
+        n_beta (int): Number of beta electrons (not used by GHF).
+        e_tot (float): Energy after `run`.
+        mo_energy (list): Orbital energies of each spin (one for GHF).
+        mo_coeff (list): Orbitals of each spin (one for GHF), in columns.
+        x (array): Mean-field parameters, (N,) total densities for RHF,
+            (2, N) alpha and beta densities for UHF and (3, N) densities
+            and P[i_alpha, i_beta] for GHF.
+        converged (bool): Whether `run` converged.
+    """
+    def __init__(self, model, nelec, kind='uhf', phase=None, sparse=False):
+        """Initialize the mean-field problem.
+
+        Args:
+            model: Lattice model with an on-site interaction.
+            nelec (int or tuple): Number of electrons or (n_alpha, n_beta).
+            kind (str): 'rhf', 'uhf' or 'ghf'.
+            phase (float): Peierls phase passed to the model.
+            sparse (bool): Use a sparse h and sparse diagonalization of the
+                lowest orbitals, see `_eigh`.
+        """
+        if kind not in ('rhf', 'uhf', 'ghf'):
+            raise Exception("Unrecognized SCF kind: {}".format(kind))
+        if isinstance(nelec, (tuple, list)):
+            na, nb = nelec
+        else:
+            nb = nelec//2
+            na = nelec - nb
+        if kind == 'rhf' and na != nb:
+            raise Exception("RHF requires n_alpha = n_beta")
+        self.model = model
+        self.kind = kind
+        self.n_alpha = na
+        self.n_beta = nb
+        self.nelec = na + nb
+        self.sparse = sparse and scipy is not None
+        if sparse and scipy is None:
+            logging.warning("scipy is not available, SCF will be dense")
+        self.N = N = model.N
+        self.U = _get_onsite(model)
+        h = model.get_hmat(phase=phase, sparse=self.sparse)
+        if kind == 'ghf':
+            self.h = [h]
+        else:
+            if abs(h[:N, N:]).max() > 0:
+                raise Exception("{} requires a spin-diagonal h".format(
+                    kind.upper()))
+            self.h = [h[:N, :N], h[N:, N:]]
+            if kind == 'rhf' and abs(self.h[0] - self.h[1]).max() > 0:
+                raise Exception("RHF requires equal alpha and beta h")
+        self.e_tot = None
+        self.mo_energy = None
+        self.mo_coeff = None
+        self.x = None
+        self.converged = False
+
+    def get_fock(self, x):
+        """Return the Fock matrices of each spin for the parameters x."""
+        U = self.U
+        N = self.N
+        idx = numpy.arange(N)
+        if self.kind == 'rhf':
+            v = [U*x[0]/2]
+        elif self.kind == 'uhf':
+            v = [U*x[1], U*x[0]]
+        else:
+            v = [numpy.concatenate((U*x[1].real, U*x[0].real))]
+        F = []
+        for h, vs in zip(self.h, v):
+            if self.sparse:
+                f = h + scipy.sparse.diags(vs, format='csr')
+            else:
+                f = h.copy()
+                f[numpy.arange(len(vs)), numpy.arange(len(vs))] += vs
+            F.append(f)
+        if self.kind == 'ghf':
+            # spin-flip mean field -U P[i_alpha, i_beta]
+            flip = -U*x[2]
+            if self.sparse:
+                off = scipy.sparse.coo_matrix(
+                    (numpy.concatenate((flip, flip.conj())),
+                     (numpy.concatenate((idx, idx + N)),
+                      numpy.concatenate((idx + N, idx)))),
+                    shape=(2*N, 2*N))
+                F[0] = (F[0] + off).tocsr()
+            else:
+                F[0] = F[0].astype(numpy.result_type(F[0], flip))
+                F[0][idx, idx + N] += flip
+                F[0][idx + N, idx] += flip.conj()
+        return F
+
+    def _occupied(self):
+        if self.kind == 'rhf':
+            return [self.n_alpha]
+        if self.kind == 'uhf':
+            return [self.n_alpha, self.n_beta]
+        return [self.nelec]
+
+    def _densities(self, C):
+        """Return the mean-field parameters of occupied orbitals C."""
+        N = self.N
+
+        def _diag(c):
+            return numpy.einsum('pk,pk->p', c, c.conj()).real
+
+        if self.kind == 'rhf':
+            return 2*_diag(C[0])[None, :]
+        if self.kind == 'uhf':
+            return numpy.array([_diag(C[0]), _diag(C[1])])
+        c = C[0]
+        na = _diag(c[:N])
+        nb = _diag(c[N:])
+        ab = numpy.einsum('pk,pk->p', c[:N], c[N:].conj())
+        return numpy.array([na, nb, ab])
+
+    def _double(self, x):
+        """Return the sum of U_i times the on-site pair density of x."""
+        if self.kind == 'rhf':
+            return self.U @ (x[0]/2)**2
+        double = (x[0]*x[1]).real
+        if self.kind == 'ghf':
+            double = double - numpy.abs(x[2])**2
+        return self.U @ double
+
+    def energy(self, x_in, eocc, x):
+        """Return the energy of the densities x of the Fock matrices of x_in.
+
+        Args:
+            x_in (array): Parameters of the Fock matrices.
+            eocc (float): Sum of the occupied orbital energies.
+            x (array): Parameters of the occupied orbitals.
+        """
+        U = self.U
+        if self.kind == 'rhf':
+            # sum_i v_i n_i with v = U n_in/2
+            return eocc - (U*x_in[0]/2) @ x[0] + self._double(x)
+        dv = U @ (x_in[1]*x[0] + x_in[0]*x[1])
+        if self.kind == 'ghf':
+            dv = dv.real - 2*(U @ (x_in[2]*x[2].conj())).real
+        return eocc - dv + self._double(x)
+
+    def _damping(self, x, t, x_out, t_out):
+        """Return the optimal damping step from x towards x_out.
+
+        The energy t + double(x) of a mixed density, with t its one-body
+        energy, is quadratic along the line x + l (x_out - x) and is
+        minimized for l in [0, 1] (optimal damping algorithm).
+        """
+        dx = x_out - x
+        d0 = self._double(x)
+        dp = self._double(x + dx)
+        dm = self._double(x - dx)
+        slope = t_out - t + (dp - dm)/2
+        curv = (dp + dm)/2 - d0
+        if curv <= 0:
+            return 1.0
+        return min(1.0, max(0.0, -slope/(2*curv)))
+
+    def _step(self, x):
+        """Return the orbitals, the new parameters and the energy."""
+        mo_e = []
+        mo_c = []
+        eocc = 0.0
+        occ = []
+        spin = 2 if self.kind == 'rhf' else 1
+        for F, nocc in zip(self.get_fock(x), self._occupied()):
+            e, c = _eigh(F, nocc, self.sparse)
+            mo_e.append(e)
+            mo_c.append(c)
+            occ.append(c[:, :nocc])
+            eocc += spin*e[:nocc].sum()
+        x_out = self._densities(occ)
+        return mo_e, mo_c, x_out, self.energy(x, eocc, x_out)
+
+    def get_guess(self, guess='core', seed=7, amplitude=0.1):
+        """Return initial mean-field parameters.
+
+        Args:
+            guess (str): 'core' for the orbitals of h, 'random' for those
+                plus a random spin polarization (and spin-flip amplitude
+                for GHF), which breaks the symmetry of UHF and GHF.
+            seed (int): Seed of the random polarization.
+            amplitude (float): Size of the random polarization.
+        """
+        x0 = numpy.zeros((3 if self.kind == 'ghf' else 2, self.N))
+        if self.kind == 'rhf':
+            x0 = x0[:1]
+        zero = numpy.zeros_like(self.U)
+        U = self.U
+        self.U = zero
+        try:
+            x = self._step(x0)[2]
+        finally:
+            self.U = U
+        if guess == 'random' and self.kind != 'rhf':
+            rand = numpy.random.RandomState(seed)
+            d = amplitude*(rand.rand(self.N) - 0.5)
+            x = x.astype(complex) if self.kind == 'ghf' else x
+            x[0] += d
+            x[1] -= d
+            if self.kind == 'ghf':
+                x[2] += amplitude*(rand.rand(self.N) - 0.5)
+        elif guess not in ('core', 'random'):
+            raise Exception("Unrecognized guess: {}".format(guess))
+        return x
+
+    def run(self, x0=None, tol=1e-8, max_cycle=200, diis_space=8,
+            diis_start=1e-2, damping=True):
+        """Iterate to self-consistency and return the energy.
+
+        Until the parameters change by less than diis_start, the densities
+        are mixed with the optimal damping of `_damping`, which lowers the
+        energy at every step and removes the oscillation between two
+        determinants that plain iteration runs into when the orbital
+        energies near the Fermi level are close, e.g. at low filling.
+        DIIS then takes over to converge quickly.
+
+        Args:
+            x0 (array): Initial mean-field parameters, see `x`, or a
+                guess keyword for `get_guess`. The default is 'core' for
+                RHF and 'random' otherwise.
+            tol (float): Convergence threshold on the largest change of
+                the parameters and on the energy.
+            max_cycle (int): Maximum number of iterations.
+            diis_space (int): DIIS subspace size, 0 for no DIIS.
+            diis_start (float): Largest change of the parameters below
+                which DIIS is used.
+            damping (bool): Use optimal damping before DIIS, otherwise
+                the iteration is undamped.
+        """
+        if x0 is None:
+            x0 = 'core' if self.kind == 'rhf' else 'random'
+        if isinstance(x0, str):
+            x = self.get_guess(x0)
+        else:
+            x = numpy.array(x0)
+        if self.kind == 'ghf':
+            x = x.astype(complex)
+        diis = DIIS(diis_space) if diis_space > 0 else None
+        use_diis = False
+        # one-body energy of the density x, unknown for a guess
+        t = None
+        e_old = None
+        self.converged = False
+        for cycle in range(max_cycle):
+            mo_e, mo_c, x_out, e = self._step(x)
+            t_out = e - self._double(x_out)
+            err = numpy.abs(x_out - x).max()
+            logging.info("scf {}: e = {} |dx| = {}".format(cycle, e, err))
+            self.mo_energy, self.mo_coeff, self.e_tot = mo_e, mo_c, e
+            if err < tol and e_old is not None and abs(e - e_old) < tol:
+                self.converged = True
+                self.x = x
+                break
+            e_old = e
+            use_diis |= diis is not None and err < diis_start
+            if use_diis:
+                x = diis.update(x, x_out)
+            elif damping and t is not None:
+                step = self._damping(x, t, x_out, t_out)
+                x = x + step*(x_out - x)
+                t = t + step*(t_out - t)
+            else:
+                x, t = x_out, t_out
+        else:
+            self.x = x
+            logging.warning("SCF did not converge in {} cycles".format(
+                max_cycle))
+        return self.e_tot
+
+    def get_occupied(self):
+        """Return the (2N, nelec) occupied spin-orbitals.
+
+        Alpha orbitals come first, the rows follow the spin-orbital order
+        of the model.
+        """
+        N = self.N
+        occ = [c[:, :n] for c, n in zip(self.mo_coeff, self._occupied())]
+        if self.kind == 'ghf':
+            return occ[0]
+        ca = occ[0]
+        cb = occ[-1][:, :self.n_beta]
+        out = numpy.zeros((2*N, self.nelec), dtype=numpy.result_type(ca, cb))
+        out[:N, :self.n_alpha] = ca
+        out[N:, self.n_alpha:] = cb
+        return out
+
+    def get_orbitals(self):
+        """Return the (2N, 2N) unitary of all spin-orbitals.
+
+        Column p is orbital p of the rotated basis. RHF and UHF orbitals
+        keep the alpha-beta order of the model. Requires dense
+        diagonalization.
+        """
+        if any(c.shape[1] < c.shape[0] for c in self.mo_coeff):
+            raise Exception("Not all orbitals were computed")
+        if self.kind == 'ghf':
+            return self.mo_coeff[0]
+        return utils.block_diag(self.mo_coeff[0], self.mo_coeff[-1])
+
+    def get_ci_vector(self, fci):
+        """Return the Slater determinant of the occupied orbitals in the
+        determinant basis of an FCISimple.
+
+        The coefficient of a determinant with occupied spin-orbitals
+        p_1 < p_2 < ... is det(C[p_i, k]).
+
+        Args:
+            fci (FCISimple): Determinant space with the same electrons.
+        """
+        if fci.nelec != self.nelec:
+            raise Exception("FCISimple has a different number of electrons")
+        C = self.get_occupied()
+        N = self.N
+        if fci.m_s is None or self.kind == 'ghf':
+            occ = utils.bits_to_occ(fci.dets, 2*N, self.nelec)
+            return numpy.linalg.det(C[occ])
+        if fci.n_alpha != self.n_alpha:
+            raise Exception("FCISimple has a different m_s")
+        na = self.n_alpha
+        oa = utils.bits_to_occ(fci.astrings, N, na)
+        ob = utils.bits_to_occ(fci.bstrings, N, self.nelec - na)
+        da = numpy.linalg.det(C[:N, :na][oa])
+        db = numpy.linalg.det(C[N:, na:][ob])
+        return (da[:, None]*db[None, :]).reshape(-1)
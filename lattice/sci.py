@@ -0,0 +1,337 @@
+import numpy
+import logging
+from . import solvers
+from . import interaction
+from .fci import _connections, _diagonal
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+_EMPTY = numpy.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _hash(x):
+    """Return the splitmix64 hash of each element of a uint64 array."""
+    x = numpy.asarray(x, dtype=numpy.uint64)
+    x = x ^ (x >> numpy.uint64(30))
+    x = x*numpy.uint64(0xbf58476d1ce4e5b9)
+    x = x ^ (x >> numpy.uint64(27))
+    x = x*numpy.uint64(0x94d049bb133111eb)
+    return x ^ (x >> numpy.uint64(31))
+
+
+class DeterminantSet(object):
+    """Hash set of determinant bit strings.
+
+    The set is an open-addressing table with linear probing. Lookups and
+    insertions are done for whole arrays of determinants at a time.
+    Determinants are numbered in the order they are added. The bit string
+    with all 64 bits set marks empty slots and cannot be stored.
+
+    Attributes:
+        dets (array): The determinants in insertion order.
+    """
+    def __init__(self, dets=None, capacity=1024):
+        """Initialize the set.
+
+        Args:
+            dets (array): Optional initial determinants.
+            capacity (int): Initial number of slots.
+        """
+        cap = 1 << max(4, int(capacity - 1).bit_length())
+        self._table = numpy.full(cap, _EMPTY, dtype=numpy.uint64)
+        self._index = numpy.full(cap, -1, dtype=numpy.int64)
+        self._keys = numpy.zeros(cap//2, dtype=numpy.uint64)
+        self._n = 0
+        if dets is not None:
+            self.add(dets)
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def dets(self):
+        return self._keys[:self._n]
+
+    def lookup(self, dets):
+        """Return the index of each determinant, or -1 if absent."""
+        dets = numpy.asarray(dets, dtype=numpy.uint64).reshape(-1)
+        mask = numpy.uint64(self._table.shape[0] - 1)
+        out = numpy.full(dets.shape, -1, dtype=numpy.int64)
+        pending = numpy.arange(dets.shape[0])
+        pos = _hash(dets) & mask
+        while pending.shape[0] > 0:
+            t = self._table[pos]
+            hit = t == dets[pending]
+            out[pending[hit]] = self._index[pos[hit]]
+            cont = ~hit & (t != _EMPTY)
+            pending = pending[cont]
+            pos = (pos[cont] + numpy.uint64(1)) & mask
+        return out
+
+    def _insert(self, keys, ids):
+        """Store new keys, which must not be in the table yet."""
+        mask = numpy.uint64(self._table.shape[0] - 1)
+        pending = numpy.arange(keys.shape[0])
+        pos = _hash(keys) & mask
+        while pending.shape[0] > 0:
+            used = self._table[pos] != _EMPTY
+            pos[used] = (pos[used] + numpy.uint64(1)) & mask
+            free = numpy.nonzero(~used)[0]
+            # one key per free slot, the others probe again
+            _, first = numpy.unique(pos[free], return_index=True)
+            win = free[first]
+            self._table[pos[win]] = keys[pending[win]]
+            self._index[pos[win]] = ids[pending[win]]
+            keep = numpy.ones(pending.shape[0], dtype=bool)
+            keep[win] = False
+            pending = pending[keep]
+            pos = pos[keep]
+
+    def add(self, dets):
+        """Add determinants to the set.
+
+        Returns:
+            array: The index of each determinant.
+        """
+        dets = numpy.asarray(dets, dtype=numpy.uint64).reshape(-1)
+        if numpy.any(dets == _EMPTY):
+            raise Exception("Cannot store a determinant with all bits set")
+        uniq, inv = numpy.unique(dets, return_inverse=True)
+        idx = self.lookup(uniq)
+        new = uniq[idx < 0]
+        n = self._n + new.shape[0]
+        if 2*n > self._table.shape[0]:
+            # keep the load factor below 1/2
+            cap = self._table.shape[0]
+            while 2*n > cap:
+                cap *= 2
+            self._table = numpy.full(cap, _EMPTY, dtype=numpy.uint64)
+            self._index = numpy.full(cap, -1, dtype=numpy.int64)
+            keys = numpy.zeros(cap//2, dtype=numpy.uint64)
+            keys[:self._n] = self.dets
+            self._keys = keys
+            self._insert(self.dets, numpy.arange(self._n))
+        ids = numpy.arange(self._n, n)
+        self._keys[self._n:n] = new
+        self._insert(new, ids)
+        self._n = n
+        idx[idx < 0] = ids
+        return idx[inv.reshape(-1)]
+
+
+def _initial_det(h, U, N, na, nb):
+    """Return a determinant of low diagonal energy, built greedily.
+
+    Ties are broken in favor of orbitals that are not coupled by h to the
+    occupied ones, which gives a Neel state for bipartite Hubbard models.
+    """
+    JK = U.get_jk().real
+    d = numpy.diag(h).real
+    coupled = numpy.abs(h) > 1e-12
+    occ = []
+    for spin, n in ((0, na), (1, nb)):
+        for _ in range(n):
+            orbs = [p for p in range(spin*N, (spin + 1)*N) if p not in occ]
+            de = numpy.array([d[p] + JK[p, occ].sum() for p in orbs])
+            nadj = numpy.array([coupled[p, occ].sum() for p in orbs])
+            best = numpy.lexsort((nadj, numpy.round(de, 10)))[0]
+            occ.append(orbs[best])
+    det = 0
+    for p in occ:
+        det |= 1 << p
+    return det
+
+
+class SelectedCI(object):
+    """Selected configuration interaction (CIPSI) for lattice models.
+
+    The variational space is grown from a single determinant. In every
+    cycle H is diagonalized in the selected space, the determinants
+    connected to it are screened in batches, and the most important ones
+    are added. The energy is corrected by Epstein-Nesbet perturbation
+    theory in the space of connected determinants,
+
+        E_PT2 = sum_a |<a|H|psi>|^2 / (E - <a|H|a>).
+
+    Attributes:
+        e_var (float): Variational energy.
+        e_pt2 (float): Second-order correction.
+        dets (DeterminantSet): Selected determinants.
+        ci (array): Coefficients of the selected determinants.
+        history (list): (ndet, e_var, e_pt2) of each cycle.
+    """
+    def __init__(self, model, nelec, m_s=None, det0=None, phase=None):
+        """Initialize the selected CI.
+
+        Args:
+            model: Lattice model with at most 64 spin-orbitals.
+            nelec (int or tuple): Number of electrons or (n_alpha, n_beta).
+            m_s (int): n_alpha - n_beta, the lowest possible by default.
+            det0 (int or list): Starting determinant as a bit string or a
+                list of occupied spin-orbitals. Chosen greedily from the
+                diagonal energy if not given.
+            phase (float): Peierls phase passed to the model.
+        """
+        if isinstance(nelec, (tuple, list)):
+            na, nb = nelec
+        else:
+            if m_s is None:
+                m_s = nelec % 2
+            if (nelec + m_s) % 2 != 0 or abs(m_s) > nelec:
+                raise Exception("Invalid m_s for {} electrons".format(nelec))
+            na = (nelec + m_s)//2
+            nb = nelec - na
+        self.model = model
+        self.norb = model.get_dim()
+        if self.norb > 64:
+            raise Exception(
+                "This code cannot handle more than 64 spin orbitals")
+        self.n_alpha = na
+        self.n_beta = nb
+        self.h = model.get_hmat(phase=phase)
+        self.U = interaction.get_interaction(model)
+        if det0 is None:
+            det0 = _initial_det(self.h, self.U, model.N, na, nb)
+        elif isinstance(det0, (int, numpy.integer)):
+            det0 = int(det0)
+        else:
+            det0 = sum(1 << int(p) for p in det0)
+        if bin(det0).count('1') != na + nb:
+            raise Exception("det0 has the wrong number of electrons")
+        self.det0 = det0
+        self.e_var = None
+        self.e_pt2 = None
+        self.dets = None
+        self.ci = None
+        self.history = []
+
+    def _getH(self, dets):
+        """Return H in the selected space, sparse if scipy is available."""
+        n = len(dets)
+        d = dets.dets
+        rows = [numpy.arange(n)]
+        cols = [numpy.arange(n)]
+        vals = [_diagonal(d, self.h, self.U, self.norb)]
+        for src, new, h in _connections(d, self.h, self.U, self.norb):
+            idx = dets.lookup(new)
+            keep = idx >= 0
+            rows.append(idx[keep])
+            cols.append(src[keep])
+            vals.append(h[keep])
+        rows = numpy.concatenate(rows)
+        cols = numpy.concatenate(cols)
+        vals = numpy.concatenate(vals)
+        if scipy is None:
+            H = numpy.zeros((n, n), dtype=vals.dtype)
+            numpy.add.at(H, (rows, cols), vals)
+            return H
+        H = scipy.sparse.coo_matrix((vals, (rows, cols)), shape=(n, n))
+        return H.tocsr()
+
+    def _diagonalize(self, dets, c0, dense_max=400, **kwargs):
+        H = self._getH(dets)
+        n = len(dets)
+        if n <= dense_max:
+            if scipy is not None:
+                H = H.toarray()
+            e, v = numpy.linalg.eigh(H)
+            return e[0], v[:, 0]
+        diag = H.diagonal().real
+        e, v = solvers.davidson(H.__matmul__, diag, nroots=1, x0=c0,
+                                dtype=H.dtype, **kwargs)
+        return e[0], v[:, 0]
+
+    def _external(self, dets, c, eps, blksize):
+        """Return the connected determinants outside the selected space.
+
+        Contributions |<a|H|I> c_I| below `eps` are skipped.
+
+        Returns:
+            (DeterminantSet, array, array): The external determinants,
+                <a|H|psi> and the largest single contribution of each.
+        """
+        ext = DeterminantSet()
+        num = numpy.zeros(0, dtype=numpy.result_type(c, self.h))
+        hmax = numpy.zeros(0)
+        d = dets.dets
+        for i0 in range(0, d.shape[0], blksize):
+            for src, new, h in _connections(
+                    d[i0:i0 + blksize], self.h, self.U, self.norb):
+                t = h*c[i0 + src]
+                keep = numpy.abs(t) > eps
+                new, t = new[keep], t[keep]
+                keep = dets.lookup(new) < 0
+                new, t = new[keep], t[keep]
+                if new.shape[0] == 0:
+                    continue
+                idx = ext.add(new)
+                if len(ext) > num.shape[0]:
+                    size = max(len(ext), 2*num.shape[0])
+                    num = numpy.concatenate(
+                        (num, numpy.zeros(size - num.shape[0], num.dtype)))
+                    hmax = numpy.concatenate(
+                        (hmax, numpy.zeros(size - hmax.shape[0])))
+                numpy.add.at(num, idx, t)
+                numpy.maximum.at(hmax, idx, numpy.abs(t))
+        return ext, num[:len(ext)], hmax[:len(ext)]
+
+    def run(self, ndet_max=10000, grow=2.0, select='pt2', eps_pt2=0.0,
+            tol=1e-8, max_cycle=50, blksize=4096, **kwargs):
+        """Return the variational and second-order corrected energies.
+
+        Args:
+            ndet_max (int): Maximum number of selected determinants.
+            grow (float): Factor by which the space grows in each cycle.
+            select (str): 'pt2' ranks determinants by their second-order
+                energy, 'heatbath' by max_I |<a|H|I> c_I|.
+            eps_pt2 (float): Screening threshold on |<a|H|I> c_I|.
+            tol (float): Stop when the total energy changes less than this.
+            max_cycle (int): Maximum number of cycles.
+            blksize (int): Selected determinants screened at a time.
+            kwargs: Options passed to the Davidson solver.
+
+        Returns:
+            (float, float): E_var and E_var + E_PT2.
+        """
+        if select not in ('pt2', 'heatbath'):
+            raise Exception("Unrecognized selection: {}".format(select))
+        dets = DeterminantSet([self.det0])
+        c = numpy.ones(1)
+        e_old = None
+        for cycle in range(max_cycle):
+            e, c = self._diagonalize(dets, c, **kwargs)
+            ext, num, hmax = self._external(dets, c, eps_pt2, blksize)
+            haa = _diagonal(ext.dets, self.h, self.U, self.norb).real
+            # degenerate determinants are left to the selection
+            denom = e - haa
+            small = numpy.abs(denom) < 1e-10
+            denom[small] = 1.0
+            e2 = numpy.where(small, 0.0, numpy.abs(num)**2/denom)
+            e_pt2 = e2.sum()
+            self.history.append((len(dets), e, e_pt2))
+            logging.info("sci {}: ndet = {} e_var = {} e_pt2 = {}".format(
+                cycle, len(dets), e, e_pt2))
+            etot = e + e_pt2
+            done = e_old is not None and abs(etot - e_old) < tol
+            if done or len(dets) >= ndet_max or len(ext) == 0:
+                break
+            e_old = etot
+
+            nadd = max(1, int((grow - 1.0)*len(dets)))
+            nadd = min(nadd, ndet_max - len(dets), len(ext))
+            score = numpy.abs(e2) if select == 'pt2' else hmax.copy()
+            score[small] = numpy.inf
+            best = numpy.argsort(-score, kind='stable')[:nadd]
+            dets.add(ext.dets[best])
+            c = numpy.concatenate((c, numpy.zeros(nadd, dtype=c.dtype)))
+        else:
+            logging.warning("sci did not converge in {} cycles".format(
+                max_cycle))
+        self.e_var = e
+        self.e_pt2 = e_pt2
+        self.dets = dets
+        self.ci = c
+        return e, e + e_pt2
@@ -0,0 +1,214 @@
+import numpy
+import logging
+
+
+def _hdot(A, B):
+    """Return A^H B without copying a real A."""
+    if numpy.iscomplexobj(A):
+        return A.conj().T @ B
+    return A.T @ B
+
+
+def _orthonormalize(X, V=None, lindep=1e-12):
+    """Orthonormalize the columns of X against V and among themselves.
+
+    Columns that become linearly dependent are dropped.
+    """
+    out = []
+    for i in range(X.shape[1]):
+        x = X[:, i].copy()
+        # two passes of Gram-Schmidt for numerical stability
+        for _ in range(2):
+            if V is not None and V.shape[1] > 0:
+                x -= V @ _hdot(V, x)
+            for y in out:
+                x -= y*numpy.vdot(y, x)
+        norm = numpy.linalg.norm(x)
+        if norm > lindep:
+            out.append(x/norm)
+    if len(out) == 0:
+        return X[:, :0]
+    return numpy.stack(out, axis=1)
+
+
+def _initial_guess(diag, nroots, x0, dtype):
+    """Return the starting block of vectors."""
+    n = diag.shape[0]
+    if x0 is None:
+        X = numpy.zeros((n, 0), dtype=dtype)
+    else:
+        X = numpy.asarray(x0, dtype=dtype).reshape(n, -1)
+    if X.shape[1] < nroots:
+        # add unit vectors on the lowest diagonal elements
+        order = numpy.argsort(diag.real)[:nroots + X.shape[1]]
+        extra = numpy.zeros((n, order.shape[0]), dtype=dtype)
+        extra[order, numpy.arange(order.shape[0])] = 1.0
+        X = numpy.hstack((X, extra))
+    V = _orthonormalize(X)
+    return V
+
+
+def davidson(matvec, diag, nroots=1, x0=None, tol=1e-12, tol_residual=1e-6,
+             maxiter=200, max_space=None, dtype=float):
+    """Return the lowest eigenpairs of a Hermitian operator.
+
+    Davidson's method with a diagonal preconditioner. Only products of
+    the operator with blocks of vectors are required.
+
+    Args:
+        matvec (callable): Return H @ X for an (n, m) array X.
+        diag (array): Diagonal of H.
+        nroots (int): Number of roots.
+        x0 (array): Initial guess, (n,) or (n, m).
+        tol (float): Convergence threshold on the eigenvalues.
+        tol_residual (float): Convergence threshold on the residual norms.
+        maxiter (int): Maximum number of iterations.
+        max_space (int): Subspace size that triggers a restart.
+        dtype: Data type of the vectors.
+    """
+    diag = numpy.asarray(diag)
+    n = diag.shape[0]
+    nroots = min(nroots, n)
+    if max_space is None:
+        max_space = max(20, 8*nroots)
+    max_space = min(max(max_space, 2*nroots), n)
+    V0 = _initial_guess(diag, nroots, x0, dtype)
+    AV0 = matvec(V0)
+
+    # the subspace, its image and the subspace matrix are kept in
+    # preallocated buffers, only the newest columns are computed
+    size = max(max_space, V0.shape[1])
+    dtype = numpy.result_type(V0, AV0)
+    V = numpy.empty((n, size), dtype=dtype, order='F')
+    AV = numpy.empty((n, size), dtype=dtype, order='F')
+    Hsub = numpy.zeros((size, size), dtype=dtype)
+    m = 0
+
+    def _append(X, AX):
+        i0 = m
+        i1 = m + X.shape[1]
+        V[:, i0:i1] = X
+        AV[:, i0:i1] = AX
+        Hsub[:i1, i0:i1] = _hdot(V[:, :i1], AX)
+        Hsub[i0:i1, :i0] = Hsub[:i0, i0:i1].conj().T
+        return i1
+
+    m = _append(V0, AV0)
+    e_old = numpy.zeros(nroots)
+    for it in range(maxiter):
+        H = 0.5*(Hsub[:m, :m] + Hsub[:m, :m].conj().T)
+        theta, s = numpy.linalg.eigh(H)
+        theta = theta[:nroots]
+        s = s[:, :nroots]
+        X = V[:, :m] @ s
+        AX = AV[:, :m] @ s
+        R = AX - X*theta[None, :]
+        rnorm = numpy.linalg.norm(R, axis=0)
+        de = numpy.abs(theta - e_old)
+        e_old = theta
+        conv = (rnorm < tol_residual) & (de < tol)
+        logging.info("davidson {}: e = {} |r| = {}".format(
+            it, theta[0], rnorm.max()))
+        if numpy.all(conv):
+            return theta, X
+
+        # preconditioned residuals for unconverged roots
+        T = []
+        for i in numpy.nonzero(~conv)[0]:
+            denom = theta[i] - diag
+            denom[numpy.abs(denom) < 1e-8] = 1e-8
+            T.append(R[:, i]/denom)
+        T = numpy.stack(T, axis=1).astype(dtype)
+
+        if m + T.shape[1] > size:
+            # restart from the current Ritz vectors
+            m = 0
+            m = _append(X, AX)
+        T = _orthonormalize(T, V[:, :m])
+        if T.shape[1] == 0:
+            if numpy.any(rnorm >= tol_residual):
+                logging.warning(
+                    "davidson stopped with linearly dependent corrections,"
+                    " |r| = {}".format(rnorm.max()))
+            return theta, X
+        m = _append(T, matvec(T))
+
+    logging.warning("davidson did not converge in {} iterations".format(
+        maxiter))
+    return theta, X
+
+
+def lanczos(matvec, diag, nroots=1, x0=None, tol=1e-12, tol_residual=1e-6,
+            maxiter=1000, max_space=None, dtype=float):
+    """Return the lowest eigenpairs of a Hermitian operator.
+
+    Block Lanczos iteration with full reorthogonalization, using a block of
+    `nroots` starting vectors so that degenerate roots are resolved. When
+    the Krylov space reaches `max_space` vectors it is thick-restarted
+    from the current Ritz vectors.
+
+    Args:
+        matvec (callable): Return H @ X for an (n, m) array X.
+        diag (array): Diagonal of H, only used for the default guess.
+        nroots (int): Number of roots.
+        x0 (array): Initial guess, (n,) or (n, m).
+        tol (float): Convergence threshold on the eigenvalues.
+        tol_residual (float): Convergence threshold on the residual norms.
+        maxiter (int): Maximum number of block iterations.
+        max_space (int): Krylov space size that triggers a restart.
+        dtype: Data type of the vectors.
+    """
+    diag = numpy.asarray(diag)
+    n = diag.shape[0]
+    nroots = min(nroots, n)
+    if max_space is None:
+        max_space = max(40, 8*nroots)
+    max_space = min(max(max_space, 3*nroots), n)
+    V = _initial_guess(diag, nroots, x0, dtype)[:, :nroots]
+    if x0 is None:
+        # unit vectors are poor Krylov seeds, perturb them slightly
+        rand = numpy.random.RandomState(7).rand(n, V.shape[1])
+        V = _orthonormalize(V + 1e-3*rand)
+    AV = matvec(V)
+    nblock = V.shape[1]
+    e_old = numpy.zeros(nroots)
+    for it in range(maxiter):
+        Hsub = _hdot(V, AV)
+        Hsub = 0.5*(Hsub + Hsub.conj().T)
+        theta, s = numpy.linalg.eigh(Hsub)
+        m = min(nroots, theta.shape[0])
+        de = numpy.abs(theta[:m] - e_old[:m])
+        e_old[:m] = theta[:m]
+        done = V.shape[1] == n
+        if m == nroots and (numpy.all(de < tol) or done):
+            X = V @ s[:, :nroots]
+            R = AV @ s[:, :nroots] - X*theta[None, :nroots]
+            rnorm = numpy.linalg.norm(R, axis=0)
+            logging.info("lanczos {}: e = {} |r| = {}".format(
+                it, theta[0], rnorm.max()))
+            if numpy.all(rnorm < tol_residual) or done:
+                return theta[:nroots], X
+
+        # extend the Krylov space with H applied to the newest block
+        W = _orthonormalize(AV[:, -nblock:], V)
+        if W.shape[1] == 0:
+            # invariant subspace, continue from a random direction
+            W = numpy.random.RandomState(it).rand(n, 1).astype(dtype)
+            W = _orthonormalize(W, V)
+            if W.shape[1] == 0:
+                break
+        nblock = W.shape[1]
+        if V.shape[1] + nblock > max_space:
+            # thick restart: keep the Ritz vectors and the newest block
+            keep = s[:, :nroots]
+            V = numpy.hstack((V @ keep, W))
+            AV = numpy.hstack((AV @ keep, matvec(W)))
+        else:
+            V = numpy.hstack((V, W))
+            AV = numpy.hstack((AV, matvec(W)))
+
+    logging.warning("lanczos did not converge in {} iterations".format(
+        maxiter))
+    Hsub = _hdot(V, AV)
+    theta, s = numpy.linalg.eigh(0.5*(Hsub + Hsub.conj().T))
+    return theta[:nroots], V @ s[:, :nroots]
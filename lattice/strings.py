@@ -0,0 +1,93 @@
+import numpy
+import itertools
+from . import utils
+
+
+def make_strings(norb, nelec):
+    """Return the occupation bit strings of `nelec` electrons in `norb`
+    orbitals, in lexical order.
+
+    Args:
+        norb (int): Number of orbitals.
+        nelec (int): Number of electrons.
+    """
+    ncomb = utils.binom(norb, nelec)
+    occ = numpy.fromiter(
+        itertools.chain.from_iterable(
+            itertools.combinations(range(norb), nelec)),
+        dtype=numpy.int64, count=ncomb*nelec).reshape(ncomb, nelec)
+    return utils.occ_to_bits(occ)
+
+
+def make_addressing(norb, nelec):
+    """Return the lexical addressing table of a string space.
+
+    The lexical index of the string with occupied orbitals c_0 < c_1 < ...
+    is binom(norb, nelec) - 1 + sum_i Z[i, c_i]. The last row is padding.
+
+    Args:
+        norb (int): Number of orbitals.
+        nelec (int): Number of electrons.
+    """
+    Z = numpy.zeros((nelec + 1, norb), dtype=numpy.int64)
+    for i in range(nelec):
+        for c in range(norb):
+            Z[i, c] = utils.binom(norb - 1 - c, nelec - 1 - i)
+            Z[i, c] -= utils.binom(norb - c, nelec - i)
+    return Z
+
+
+def address(strings, Z):
+    """Return the lexical index of each bit string.
+
+    Args:
+        strings (array): Bit strings.
+        Z (array): Addressing table from `make_addressing`.
+    """
+    nelec = Z.shape[0] - 1
+    norb = Z.shape[1]
+    strings = numpy.asarray(strings, dtype=numpy.uint64)
+    one = numpy.uint64(1)
+    out = numpy.full(strings.shape, utils.binom(norb, nelec) - 1)
+    count = numpy.zeros(strings.shape, dtype=numpy.int64)
+    for c in range(norb):
+        occ = ((strings >> numpy.uint64(c)) & one).astype(bool)
+        out += numpy.where(occ, Z[numpy.minimum(count, nelec), c], 0)
+        count += occ
+    return out
+
+
+def make_links(strings, norb):
+    """Return the single-replacement lists of a string space.
+
+    Args:
+        strings (array): All bit strings with a fixed number of electrons,
+            in lexical order.
+        norb (int): Number of orbitals.
+
+    Returns:
+        dict: For each orbital pair (p, q) the arrays (I, J, sign) such
+            that a^+_p a_q |J> = sign |I>.
+    """
+    one = numpy.uint64(1)
+    nelec = int(utils.popcount(strings[:1]).sum()) if len(strings) else 0
+    Z = make_addressing(norb, nelec)
+    links = {}
+    for q in range(norb):
+        bq = one << numpy.uint64(q)
+        J = numpy.nonzero(strings & bq)[0]
+        for p in range(norb):
+            bp = one << numpy.uint64(p)
+            if p == q:
+                sign = numpy.ones(J.shape, dtype=numpy.int8)
+                links[p, q] = (J, J, sign)
+                continue
+            Jpq = J[(strings[J] & bp) == 0]
+            new = strings[Jpq] ^ (bp | bq)
+            I = address(new, Z)
+            lo, hi = min(p, q), max(p, q)
+            mask = numpy.uint64(((1 << hi) - 1) ^ ((1 << (lo + 1)) - 1))
+            par = utils.popcount(strings[Jpq] & mask) % 2
+            sign = (1 - 2*par).astype(numpy.int8)
+            links[p, q] = (I, Jpq, sign)
+    return links
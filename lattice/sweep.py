@@ -0,0 +1,169 @@
+import os
+import json
+import logging
+import itertools
+import multiprocessing
+import numpy
+from .fci import FCISimple
+
+# per-process state of the workers, set by _init
+_state = {}
+
+
+def grid(**axes):
+    """Return the Cartesian product of parameter axes as a list of dicts.
+
+    Example: grid(U=[1.0, 2.0], t=[1.0]) gives
+    [{'U': 1.0, 't': 1.0}, {'U': 2.0, 't': 1.0}].
+
+    Args:
+        axes: List of values for each keyword of the model constructor.
+    """
+    names = list(axes)
+    values = itertools.product(*[axes[n] for n in names])
+    return [dict(zip(names, v)) for v in values]
+
+
+def _to_json(x):
+    """Return x with numpy scalars and arrays converted for json."""
+    if isinstance(x, numpy.ndarray):
+        return x.tolist()
+    if isinstance(x, numpy.generic):
+        return x.item()
+    if isinstance(x, dict):
+        return {k: _to_json(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [_to_json(v) for v in x]
+    return x
+
+
+def _normalize(params):
+    """Return the parameters as they read back from a checkpoint."""
+    return json.loads(json.dumps(_to_json(params)))
+
+
+def _load(checkpoint, points):
+    """Return the finished records of a checkpoint file by point index.
+
+    An incomplete last line, left by an interrupted run, is removed.
+    """
+    done = {}
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return done
+    with open(checkpoint, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            logging.warning("Dropping incomplete checkpoint record")
+            f.truncate(end)
+    for line in data[:end].decode().splitlines():
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        i = rec['index']
+        if i >= len(points) or rec['params'] != _normalize(points[i]):
+            raise Exception("Checkpoint does not match the sweep points")
+        done[i] = rec
+    return done
+
+
+def _init(template, make_model, options):
+    _state['template'] = template
+    _state['make_model'] = make_model
+    _state['options'] = options
+
+
+def _solve(item):
+    """Solve one grid point in a worker and return its record."""
+    i, params = item
+    nroots, method, kwargs, measure = _state['options']
+    model = _state['make_model'](**params)
+    fci = _state['template'].with_model(model)
+    e, v = fci.run(nroots=nroots, method=method, **kwargs)
+    rec = {'index': i, 'params': _normalize(params),
+           'energies': [float(x) for x in e[:nroots]]}
+    if measure is not None:
+        rec.update(_to_json(measure(fci, e, v)))
+    return rec
+
+
+def _get_context():
+    # fork lets the workers inherit the template basis without copying it
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def run(make_model, points, nelec, m_s=None, nroots=1, method='dense',
+        checkpoint=None, nproc=None, chunksize=None, measure=None,
+        **kwargs):
+    """Solve FCISimple over a list of model parameters in a process pool.
+
+    The determinant basis and the string tables are built once and shared
+    by all points. With the fork start method the workers inherit them
+    from the parent process. Finished points are appended to the
+    checkpoint file as json lines, and points already in the file are
+    skipped, so an interrupted sweep resumes where it stopped.
+
+    Set OMP_NUM_THREADS=1 (or similar) before starting python so that
+    the workers do not compete for cores in threaded BLAS calls.
+
+    Args:
+        make_model (callable): Return the model for the keyword arguments
+            of a point, e.g. `Hubbard1D` or a lambda. All models must have
+            the same number of orbitals.
+        points (list): Keyword arguments of each point, see `grid`.
+        nelec (int or tuple): Number of electrons or (n_alpha, n_beta).
+        m_s (int): n_alpha - n_beta, or None for all spin sectors.
+        nroots (int): Number of roots.
+        method (str): 'dense', 'davidson' or 'lanczos'.
+        checkpoint (str): Path of the json lines checkpoint file.
+        nproc (int): Number of worker processes, all cores by default.
+            No pool is started for nproc = 1.
+        chunksize (int): Points sent to a worker at a time.
+        measure (callable): Optional measure(fci, e, v) returning a dict
+            of json-serializable values stored with each point.
+        kwargs: Options passed to `FCISimple.run`.
+
+    Returns:
+        list: One record per point, in the order of `points`, with the
+            keys 'index', 'params', 'energies' and those from `measure`.
+    """
+    points = list(points)
+    done = _load(checkpoint, points)
+    todo = [(i, p) for i, p in enumerate(points) if i not in done]
+    if len(todo) > 0:
+        template = FCISimple(make_model(**todo[0][1]), nelec, m_s=m_s)
+        if m_s is not None and method != 'dense':
+            # build the links before forking so that they are shared
+            template._get_links()
+        options = (nroots, method, kwargs, measure)
+        if nproc is None:
+            nproc = os.cpu_count() or 1
+        nproc = max(1, min(nproc, len(todo)))
+        if chunksize is None:
+            chunksize = max(1, len(todo)//(4*nproc))
+
+        out = None if checkpoint is None else open(checkpoint, 'a')
+        pool = None
+        try:
+            if nproc == 1:
+                _init(template, make_model, options)
+                results = map(_solve, todo)
+            else:
+                pool = _get_context().Pool(
+                    nproc, initializer=_init,
+                    initargs=(template, make_model, options))
+                results = pool.imap_unordered(_solve, todo, chunksize)
+            for rec in results:
+                done[rec['index']] = rec
+                if out is not None:
+                    out.write(json.dumps(rec) + '\n')
+                    out.flush()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if out is not None:
+                out.close()
+    return [done[i] for i in range(len(points))]
@@ -0,0 +1,387 @@
+import numpy
+import itertools
+import logging
+from . import utils
+from . import solvers
+from . import interaction
+from .fci import _diagonal
+
+
+def _adjacency(nn):
+    """Return the symmetric bond-count matrix of a neighbor list."""
+    N = len(nn)
+    A = numpy.zeros((N, N), dtype=int)
+    i, x = utils.nn_to_edges(nn).T
+    numpy.add.at(A, (i, x), 1)
+    return A + A.T
+
+
+def _elements(U, perm=None):
+    """Return the sorted flat indices and summed values of the nonzero
+    elements of an Interaction, with the spin-orbitals permuted."""
+    idx = U.idx if perm is None else perm[U.idx]
+    flat = numpy.ravel_multi_index(tuple(idx.T), (U.norb,)*4)
+    keys, inv = numpy.unique(flat, return_inverse=True)
+    val = numpy.zeros(keys.shape, dtype=U.val.dtype)
+    numpy.add.at(val, inv.reshape(-1), U.val)
+    keep = numpy.abs(val) > 1e-12
+    return keys[keep], val[keep]
+
+
+def _invariant_interaction(U, perm):
+    """Return whether an Interaction is invariant under a spin-orbital
+    permutation."""
+    if U.onsite is not None:
+        N = U.norb//2
+        onsite = numpy.asarray(U.onsite)
+        return numpy.abs(onsite[perm[:N] % N] - onsite).max() < 1e-12
+    keys, val = _elements(U)
+    pkeys, pval = _elements(U, perm)
+    if not numpy.array_equal(keys, pkeys):
+        return False
+    return numpy.abs(val - pval).max(initial=0) < 1e-12
+
+
+def automorphisms(nn):
+    """Return all site permutations that leave the lattice invariant.
+
+    Args:
+        nn (list): List of nearest neighbors.
+
+    Returns:
+        list: Permutations as arrays, site i is mapped to perm[i].
+    """
+    A = _adjacency(nn)
+    N = A.shape[0]
+    key = [tuple(sorted(A[i])) for i in range(N)]
+    # assign sites in breadth-first order so that bonds prune early
+    order = []
+    for root in range(N):
+        if root in order:
+            continue
+        queue = [root]
+        order.append(root)
+        while queue:
+            i = queue.pop(0)
+            for j in numpy.nonzero(A[i])[0]:
+                if j not in order:
+                    order.append(j)
+                    queue.append(j)
+    order = numpy.array(order)
+
+    perms = []
+    perm = numpy.full(N, -1)
+    used = numpy.zeros(N, dtype=bool)
+
+    def _extend(pos):
+        if pos == N:
+            perms.append(perm.copy())
+            return
+        i = order[pos]
+        done = order[:pos]
+        for j in range(N):
+            if used[j] or key[j] != key[i] or A[i, i] != A[j, j]:
+                continue
+            if numpy.any(A[i, done] != A[j, perm[done]]):
+                continue
+            perm[i] = j
+            used[j] = True
+            _extend(pos + 1)
+            used[j] = False
+            perm[i] = -1
+
+    _extend(0)
+    return perms
+
+
+def _cycle_order(perm):
+    """Return the common cycle length of a permutation, or None."""
+    lengths = set()
+    seen = numpy.zeros(perm.shape[0], dtype=bool)
+    for i in range(perm.shape[0]):
+        n = 0
+        j = i
+        while not seen[j]:
+            seen[j] = True
+            j = perm[j]
+            n += 1
+        if n > 0:
+            lengths.add(n)
+    return lengths.pop() if len(lengths) == 1 else None
+
+
+def find_translations(nn):
+    """Return generators of the translation group of a lattice.
+
+    The translations are identified as an abelian group of lattice
+    automorphisms that maps any site to any other site in exactly one way.
+    Generators of the largest order are preferred.
+
+    Args:
+        nn (list): List of nearest neighbors.
+
+    Returns:
+        list: (perm, order) for each generator, empty if the lattice has
+            no translation symmetry.
+    """
+    N = len(nn)
+    cands = []
+    for p in automorphisms(nn):
+        n = _cycle_order(p)
+        if n is not None and n > 1 and N % n == 0:
+            cands.append((p, n))
+    cands.sort(key=lambda x: (-x[1], tuple(x[0])))
+    ident = tuple(range(N))
+
+    def _search(gens, group):
+        if len(group) == N:
+            return gens
+        for g, n in cands:
+            if tuple(g) in group:
+                continue
+            if any(not numpy.array_equal(g[h], h[g]) for h, _ in gens):
+                continue
+            new = dict(group)
+            ok = True
+            for e, exps in group.items():
+                x = numpy.array(e)
+                for a in range(1, n):
+                    x = g[x]
+                    tx = tuple(x)
+                    if tx in new or numpy.any(x == numpy.arange(N)):
+                        ok = False
+                        break
+                    new[tx] = exps + (a,)
+                if not ok:
+                    break
+            if not ok:
+                continue
+            for e in group:
+                new[e] = group[e] + (0,)
+            res = _search(gens + [(g, n)], new)
+            if res is not None:
+                return res
+        return None
+
+    gens = _search([], {ident: ()})
+    return [] if gens is None else gens
+
+
+def permute_dets(dets, perm):
+    """Apply a spin-orbital permutation to an array of determinants.
+
+    Args:
+        dets (array): Bit strings of the determinants.
+        perm (array): Orbital p is mapped to perm[p].
+
+    Returns:
+        (array, array): The permuted determinants and the fermionic signs.
+    """
+    norb = len(perm)
+    one = numpy.uint64(1)
+    new = numpy.zeros(dets.shape, dtype=numpy.uint64)
+    par = numpy.zeros(dets.shape, dtype=numpy.int64)
+    for p in range(norb):
+        occ = (dets >> numpy.uint64(p)) & one
+        new |= occ << numpy.uint64(perm[p])
+        # occupied orbitals above p that are mapped below perm[p]
+        mask = 0
+        for q in range(p + 1, norb):
+            if perm[q] < perm[p]:
+                mask |= 1 << q
+        if mask:
+            n = utils.popcount(dets & numpy.uint64(mask))
+            par += occ.astype(numpy.int64)*n
+    return new, 1 - 2*(par % 2)
+
+
+class SymmetrySector(object):
+    """Symmetry-adapted block of an FCISimple determinant space.
+
+    States of the block satisfy g|psi> = chi(g)|psi> for every element g
+    of an abelian group of lattice translations (optionally extended by a
+    reflection and by spin-flip), where for g = prod_j T_j^a_j the
+    character is chi(g) = exp(2 pi i sum_j a_j k_j / n_j).
+
+    Attributes:
+        fci (FCISimple): Parent determinant space with fixed m_s.
+        k (tuple): Momentum label for each translation generator.
+        m (int): Dimension of the block.
+    """
+    def __init__(self, fci, k=0, translations=None, reflection=None,
+                 spin_flip=None):
+        """Initialize the symmetry-adapted basis.
+
+        Args:
+            fci (FCISimple): Determinant space with fixed m_s.
+            k (int or tuple): Momentum label for each translation generator.
+            translations (list): (perm, order) generators of the site
+                translations. Derived from `model.nn` if not given.
+            reflection (tuple): Optional (perm, parity) for a site
+                reflection. It must map the sector k to itself.
+            spin_flip (int): Optional spin-flip parity (+1 or -1), only
+                for m_s = 0.
+        """
+        if fci.m_s is None:
+            raise Exception("Symmetry blocking requires a fixed m_s")
+        self.fci = fci
+        model = fci.model
+        N = model.N
+        if translations is None:
+            translations = find_translations(model.nn)
+        if isinstance(k, (int, numpy.integer)):
+            if not translations and k != 0:
+                raise Exception(
+                    "Momentum k = {} without translations".format(k))
+            k = (k,) + (0,)*(len(translations) - 1) if translations else ()
+        if len(k) != len(translations):
+            raise Exception("Expected {} momentum labels".format(
+                len(translations)))
+        self.k = tuple(k)
+        self.translations = translations
+
+        # elements of the translation group and their characters
+        elements = []
+        lookup = {}
+        orders = [n for _, n in translations]
+        for exps in itertools.product(*[range(n) for n in orders]):
+            perm = numpy.arange(N)
+            for (g, n), a in zip(translations, exps):
+                for _ in range(a):
+                    perm = g[perm]
+            phase = sum(a*kk/n for a, kk, n in zip(exps, self.k, orders))
+            chi = numpy.exp(2.j*numpy.pi*phase)
+            elements.append((perm, chi))
+            lookup[tuple(perm)] = chi
+        if reflection is not None:
+            R, parity = reflection
+            R = numpy.asarray(R)
+            Rinv = numpy.argsort(R)
+            for g, _ in translations:
+                conj = tuple(R[g[Rinv]])
+                if conj not in lookup or abs(lookup[conj] - lookup[
+                        tuple(g)]) > 1e-10:
+                    raise Exception("Reflection does not preserve sector k")
+            elements += [(g[R], chi*parity) for g, chi in elements]
+
+        # extend to spin-orbital permutations
+        ops = [(numpy.concatenate((g, g + N)), chi) for g, chi in elements]
+        if spin_flip is not None:
+            if fci.m_s != 0:
+                raise Exception("Spin-flip symmetry requires m_s = 0")
+            flip = numpy.concatenate((numpy.arange(N) + N, numpy.arange(N)))
+            ops += [(flip[p], chi*spin_flip) for p, chi in ops]
+        self._check_invariance([p for p, _ in ops])
+        self._build(ops)
+
+    def _check_invariance(self, perms):
+        """Check that the one-body Hamiltonian and the interaction commute
+        with the group."""
+        model = self.fci.model
+        T = model.get_hmat()
+        U = interaction.get_interaction(model)
+        for p in perms:
+            Tp = numpy.zeros(T.shape, dtype=T.dtype)
+            Tp[numpy.ix_(p, p)] = T
+            same = numpy.abs(Tp - T).max() < 1e-12
+            if not same or not _invariant_interaction(U, p):
+                raise Exception("Hamiltonian is not invariant under the group")
+
+    def _build(self, ops):
+        """Find orbit representatives and the projected basis vectors."""
+        fci = self.fci
+        dets = fci.dets
+        rep = numpy.arange(fci.k)
+        for perm, _ in ops:
+            new, _ = permute_dets(dets, perm)
+            rep = numpy.minimum(rep, fci.index(new))
+        reps = numpy.nonzero(rep == numpy.arange(fci.k))[0]
+
+        # projected vector of each representative
+        rows = []
+        vals = []
+        stab = numpy.zeros(reps.shape, dtype=complex)
+        nstab = numpy.zeros(reps.shape, dtype=int)
+        for perm, chi in ops:
+            new, sign = permute_dets(dets[reps], perm)
+            idx = fci.index(new)
+            v = numpy.conj(chi)*sign
+            fixed = idx == reps
+            stab[fixed] += v[fixed]
+            nstab += fixed
+            rows.append(idx)
+            vals.append(v)
+        norm = numpy.sqrt(len(ops)/nstab)*numpy.abs(stab)
+        keep = norm > 1e-8
+        self.reps = reps[keep]
+        self.m = self.reps.shape[0]
+        self._rows = [r[keep] for r in rows]
+        self._vals = [v[keep]/norm[keep] for v in vals]
+        real = all(numpy.abs(v.imag).max(initial=0) < 1e-14
+                   for v in self._vals)
+        if real:
+            self._vals = [v.real for v in self._vals]
+        self.dtype = self._vals[0].dtype if self._vals else float
+
+    def project(self, x):
+        """Return the determinant-space vector(s) of block vector(s) x."""
+        x = numpy.asarray(x)
+        shape = (self.fci.k,) + x.shape[1:]
+        out = numpy.zeros(shape, dtype=numpy.result_type(x, self.dtype))
+        for rows, vals in zip(self._rows, self._vals):
+            vals = vals.reshape((-1,) + (1,)*(x.ndim - 1))
+            out[rows] += vals*x
+        return out
+
+    def restrict(self, c):
+        """Return the block components of determinant-space vector(s) c."""
+        c = numpy.asarray(c)
+        shape = (self.m,) + c.shape[1:]
+        out = numpy.zeros(shape, dtype=numpy.result_type(c, self.dtype))
+        for rows, vals in zip(self._rows, self._vals):
+            vals = vals.reshape((-1,) + (1,)*(c.ndim - 1))
+            out += numpy.conj(vals)*c[rows]
+        return out
+
+    def sigma(self, x):
+        """Return the block Hamiltonian applied to block vector(s) x."""
+        return self.restrict(self.fci.sigma(self.project(x)))
+
+    def diagonal(self):
+        """Return the determinant diagonal at the orbit representatives."""
+        T = self.fci.model.get_hmat()
+        U = interaction.get_interaction(self.fci.model)
+        dets = self.fci.dets[self.reps]
+        return _diagonal(dets, T, U, self.fci.norb)
+
+    def getH(self):
+        """Return the dense Hamiltonian of the block."""
+        return self.sigma(numpy.eye(self.m))
+
+    def run(self, nroots=1, method='davidson', **kwargs):
+        """Return the lowest eigenpairs of the block.
+
+        Args:
+            nroots (int): Number of roots.
+            method (str): 'dense', 'davidson' or 'lanczos'.
+            kwargs: Options passed to the iterative solver.
+
+        Returns:
+            (array, array): Energies and block eigenvectors. Use `project`
+                to obtain determinant-space vectors.
+        """
+        if self.m == 0:
+            logging.warning("Empty symmetry sector")
+            return numpy.zeros(0), numpy.zeros((0, 0))
+        if method == 'dense':
+            e, v = numpy.linalg.eigh(self.getH())
+            return e[:nroots], v[:, :nroots]
+        elif method == 'davidson':
+            solver = solvers.davidson
+        elif method == 'lanczos':
+            solver = solvers.lanczos
+        else:
+            raise Exception("Unrecognized method: {}".format(method))
+        dtype = numpy.result_type(self.dtype, self.fci.model.get_hmat())
+        return solver(self.sigma, self.diagonal(), nroots=nroots,
+                      dtype=dtype, **kwargs)
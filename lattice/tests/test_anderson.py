@@ -2,6 +2,7 @@ import numpy
 import unittest
 from lattice.hubbard import Hubbard1D
 from lattice.anderson import Anderson
+from lattice.fci import FCISimple
 
 
 class AndersonTest(unittest.TestCase):
@@ -48,6 +49,25 @@ class AndersonTest(unittest.TestCase):
 
         self.assertTrue(numpy.linalg.norm(tref - tout) < 1e-14)
 
+    def test_fci(self):
+        # U = 0, the energy is the sum of the lowest orbital energies
+        aim = Anderson(2, 2, 1.0, 0.5, 0.0, 0.4, -0.3)
+        hS = aim.get_tmatS() + aim.get_vmatS()
+        eorb = numpy.linalg.eigvalsh(hS)
+        eref = 2*eorb[:2].sum() + eorb[2]
+        myfci = FCISimple(aim, 5, m_s=1)
+        e, v = myfci.run(nroots=1, method='davidson')
+        self.assertTrue(abs(e[0] - eref) < 1e-10)
+
+        # potentials and phase enter sigma
+        aim = Anderson(2, 1, 1.0, 0.5, 2.0, 0.4, -0.3)
+        myfci = FCISimple(aim, 4, m_s=0)
+        c = numpy.random.RandomState(1).rand(myfci.k, 2)
+        for phase in (None, 0.3):
+            H = myfci.getH(phase=phase)
+            diff = numpy.abs(myfci.sigma(c, phase=phase) - H @ c).max()
+            self.assertTrue(diff < 1e-12)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.fci import FCISimple
+from lattice.cache import DiskCache, make_key
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_lru(self):
+        cache = DiskCache(self.path, max_size=0.2)
+        x = numpy.zeros(10000)
+        keys = [make_key('x', i) for i in range(3)]
+        self.assertNotEqual(make_key(x), make_key(x.astype(numpy.float32)))
+        self.assertEqual(make_key('x', 0), keys[0])
+        for i, key in enumerate(keys[:2]):
+            cache.put(key, {'x': x + i})
+            # distinct modification times
+            os.utime(cache._file(key), (i, i))
+        # reading the oldest entry makes the other one the first to go
+        self.assertEqual(cache.get(keys[0])['x'][0], 0.0)
+        cache.put(keys[2], {'x': x + 2})
+        self.assertTrue(cache.get(keys[1]) is None)
+        self.assertEqual(cache.get(keys[2])['x'][0], 2.0)
+        self.assertTrue(cache.size() <= 0.2e6)
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+
+    def test_fci(self):
+        hub = Hubbard1D(5, 1.0, 3.0, boundary='p')
+        for m_s in (None, 1):
+            ref = FCISimple(hub, 5, m_s=m_s)
+            cold = FCISimple(hub, 5, m_s=m_s, cache=self.path)
+            ncold = len(os.listdir(self.path))
+            H = cold.getH(phase=0.2, sparse=True)
+            warm = FCISimple(hub, 5, m_s=m_s, cache=self.path)
+            # everything is read back from the first run
+            H2 = warm.getH(phase=0.2, sparse=True)
+            self.assertTrue(abs(H2 - H).max() < 1e-15)
+            ncached = len(os.listdir(self.path))
+            self.assertEqual(ncached, ncold + 1)
+            Href = ref.getH(phase=0.2, sparse=True)
+            self.assertTrue(abs(H2 - Href).max() < 1e-12)
+            self.assertTrue((warm.dets == ref.dets).all())
+            if m_s is not None:
+                c = numpy.random.RandomState(5).rand(ref.k)
+                out = warm.sigma(c)
+                self.assertTrue(numpy.abs(out - ref.sigma(c)).max() < 1e-12)
+            # a different model gives a new H but reuses the basis, sigma
+            # above stored the alpha and beta replacement lists
+            other = FCISimple(Hubbard1D(5, 1.0, 1.0), 5, m_s=m_s,
+                              cache=DiskCache(self.path))
+            other.getH(sparse=True)
+            nlinks = 2 if m_s is not None else 0
+            self.assertEqual(len(os.listdir(self.path)),
+                             ncached + 1 + nlinks)
+
+
+if __name__ == '__main__':
+    unittest.main()
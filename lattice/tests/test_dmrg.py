@@ -0,0 +1,45 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice.free import FreeFermions
+from lattice.dmrg import DMRG, MPO
+from lattice import rdm
+
+
+class DMRGTest(unittest.TestCase):
+    def test_fci(self):
+        cases = [(Hubbard1D(6, 1.0, 4.0, boundary='p'), (3, 2), 0.3),
+                 (Anderson(3, 2, 1.0, 0.5, 2.0, 0.2, -0.3), (3, 3), None)]
+        for model, nelec, phase in cases:
+            fci = FCISimple(model, nelec)
+            e, c = numpy.linalg.eigh(fci.getH(phase=phase))
+            dmrg = DMRG(model, nelec, phase=phase)
+            self.assertAlmostEqual(dmrg.run(chi=100), e[0], places=8)
+            dma, dmb = rdm.make_rdm1s(fci, c[:, 0])
+            n = dmrg.get_densities()
+            self.assertTrue(numpy.allclose(n[0], numpy.diag(dma).real))
+            self.assertTrue(numpy.allclose(n[1], numpy.diag(dmb).real))
+            self.assertTrue(numpy.allclose(
+                dmrg.double_occupancy(), rdm.double_occupancy(fci, c[:, 0])))
+
+    def test_free(self):
+        # nearest-neighbor chains need two channels per spin, the
+        # periodic bond adds four more on every bond
+        self.assertEqual(
+            MPO(Hubbard1D(8, 1.0, 4.0, boundary='o')).bond_dimension(), 6)
+        self.assertEqual(
+            MPO(Hubbard1D(8, 1.0, 4.0, boundary='p')).bond_dimension(), 10)
+        model = Hubbard1D(8, 1.0, 0.0, boundary='o')
+        dmrg = DMRG(model, 8)
+        e = dmrg.run(chi=[32, 64])
+        self.assertAlmostEqual(e, FreeFermions(model, (4, 4)).e_tot, places=4)
+        self.assertTrue(dmrg.truncation < 1e-5)
+        # reflection symmetry of the entanglement
+        self.assertTrue(numpy.allclose(
+            dmrg.entropy, dmrg.entropy[::-1], atol=1e-3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice import dynamics
+from lattice import rdm
+
+
+def _expm(H, c, t):
+    e, v = numpy.linalg.eigh(H)
+    return v @ (numpy.exp(-1.j*e*t)*(v.conj().T @ c))
+
+
+class DynamicsTest(unittest.TestCase):
+    def test_quench(self):
+        # switch on the bias and gate voltage of an Anderson model
+        aim0 = Anderson(2, 2, 1.0, 0.5, 2.0, 0.0, 0.0)
+        aim1 = Anderson(2, 2, 1.0, 0.5, 2.0, 0.4, -0.3)
+        fci0 = FCISimple(aim0, 4, m_s=0)
+        e, v = fci0.run(nroots=1)
+        fci1 = fci0.with_model(aim1)
+        H = fci1.getH()
+        for method in ('krylov', 'chebyshev', 'rk4'):
+            out = list(dynamics.evolve(
+                fci1, v[:, 0], 2.0, 0.5, method=method, tol=1e-10))
+            self.assertEqual(len(out), 5)
+            for t, c in out:
+                diff = numpy.linalg.norm(c - _expm(H, v[:, 0], t))
+                self.assertTrue(diff < 1e-7)
+        # all spin sectors use the stored Hamiltonian
+        fci = FCISimple(aim1, 4)
+        c0 = numpy.zeros(fci.k)
+        c0[[0, 3]] = numpy.sqrt(0.5)
+        t, c = list(dynamics.evolve(fci, c0, 1.0, 1.0))[-1]
+        ref = _expm(fci.getH(), c0, 1.0)
+        self.assertTrue(numpy.linalg.norm(c - ref) < 1e-8)
+
+    def test_phase(self):
+        hub = Hubbard1D(4, 1.0, 3.0, boundary='p')
+        myfci = FCISimple(hub, 4, m_s=0)
+        e, v = myfci.run(nroots=1)
+
+        def phase(t):
+            return 0.5*numpy.sin(2.0*t)
+
+        def current(t, c):
+            return rdm.bond_currents(myfci, c, phase=phase(t))
+
+        ref = dynamics.propagate(
+            myfci, v[:, 0], 1.0, 0.25, method='rk4', phase=phase,
+            tol=1e-12, callback=current)
+        out = dynamics.propagate(
+            myfci, v[:, 0], 1.0, 0.25, method='krylov', phase=phase,
+            max_step=0.002, callback=current)
+        self.assertTrue(numpy.linalg.norm(out[2] - ref[2]) < 1e-5)
+        diff = numpy.array(out[1]) - numpy.array(ref[1])
+        self.assertTrue(numpy.abs(diff).max() < 1e-5)
+        # the current vanishes in the initial state only
+        self.assertTrue(numpy.abs(ref[1][0]).max() < 1e-10)
+        self.assertTrue(numpy.abs(ref[1][-1]).max() > 1e-2)
+
+
+if __name__ == '__main__':
+    unittest.main()
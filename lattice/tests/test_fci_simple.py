@@ -1,6 +1,7 @@
 import unittest
+import numpy
 from lattice.hubbard import Hubbard1D
-from lattice.fci import FCISimple
+from lattice.fci import FCISimple, excitation_degree
 
 
 class TestFCISimple(unittest.TestCase):
@@ -35,6 +36,30 @@ class TestFCISimple(unittest.TestCase):
         diff = abs(out - ref)
         self.assertTrue(diff < self.thresh, err)
 
+    def test_sigma(self):
+        hub = Hubbard1D(4, 1.0, 2.0, boundary='p')
+        myfci = FCISimple(hub, 3, m_s=-1)
+        c = numpy.random.RandomState(5).rand(myfci.k, 3)
+        for phase in [None, 0.4]:
+            H = myfci.getH(phase=phase)
+            out = myfci.sigma(c, phase=phase)
+            self.assertTrue(numpy.linalg.norm(out - H @ c) < self.thresh)
+            out = myfci.sigma(c[:, 0], phase=phase)
+            ref = H @ c[:, 0]
+            self.assertTrue(numpy.linalg.norm(out - ref) < self.thresh)
+
+    def test_1d_hubbard_iterative(self):
+        # L = 4, U = 1, half-filling
+        hub = Hubbard1D(4, 1.0, 1.0, boundary='o')
+        myfci = FCISimple(hub, 4, m_s=0)
+        for method in ['davidson', 'lanczos']:
+            e, v = myfci.run(nroots=2, method=method)
+            out = e[0]
+            ref = self.ref_4_1
+            err = "Expected: {} Actual: {}".format(ref, out)
+            self.assertTrue(abs(out - ref) < 1e-10, err)
+            self.assertTrue(v.shape == (myfci.k, 2))
+
     def test_basis_2site(self):
         hub = Hubbard1D(2, 1.0, 1.0, boundary='o')
         myfci = FCISimple(hub, 2)
@@ -48,6 +73,72 @@ class TestFCISimple(unittest.TestCase):
         ref += "|2 3> m_s = -2\n"
         self.assertTrue(out == ref)
 
+    def test_sparse_H(self):
+        hub = Hubbard1D(3, 1.0, 2.0, boundary='p')
+        myfci = FCISimple(hub, 3, m_s=1)
+        U = hub.get_umat()
+        T = hub.get_tmat(phase=0.3)
+        ref = numpy.zeros((myfci.k, myfci.k), dtype=complex)
+        for i, idet in enumerate(myfci.dets):
+            for j, jdet in enumerate(myfci.dets):
+                ref[i, j] = myfci._get_matrixel(idet, jdet, U, T)
+
+        out = myfci.getH(phase=0.3)
+        self.assertTrue(numpy.linalg.norm(out - ref) < self.thresh)
+        out = myfci.getH(phase=0.3, sparse=True)
+        if not isinstance(out, numpy.ndarray):
+            out = out.toarray()
+        self.assertTrue(numpy.linalg.norm(out - ref) < self.thresh)
+
+    def test_sectors(self):
+        hub = Hubbard1D(4, 1.0, 1.0, boundary='p')
+        myfci = FCISimple(hub, (3, 2))
+        self.assertTrue(myfci.nelec == 5 and myfci.m_s == 1)
+        self.assertTrue(myfci.k == 4*6)
+        ref = FCISimple(hub, 5)
+        ref = ref.dets[ref._get_m_s_dets(ref.dets) == 1]
+        self.assertTrue(numpy.array_equal(myfci.dets, ref))
+        idx = myfci.index(myfci.dets[::-1])
+        self.assertTrue(numpy.array_equal(idx, numpy.arange(myfci.k)[::-1]))
+        self.assertTrue(myfci.index([0b11111])[0] == -1)
+
+    def test_dets_2site(self):
+        hub = Hubbard1D(2, 1.0, 1.0, boundary='o')
+        myfci = FCISimple(hub, 2, m_s=0)
+        ref = [0b0101, 0b1001, 0b0110, 0b1010]
+        self.assertTrue(list(myfci.dets) == ref)
+        out = excitation_degree(myfci.dets[0], myfci.dets)
+        self.assertTrue(list(out) == [0, 1, 1, 2])
+
+    def test_large(self):
+        # 10 sites, U = 0, sum of the lowest orbital energies
+        hub = Hubbard1D(10, 1.0, 0.0, boundary='o')
+        myfci = FCISimple(hub, 5, m_s=1)
+        self.assertTrue(myfci.norb == 20)
+        self.assertTrue(myfci._dets is None)
+        e, v = myfci.run(nroots=1, method='davidson')
+        eorb = numpy.linalg.eigvalsh(hub.get_tmatS())
+        ref = eorb[:3].sum() + eorb[:2].sum()
+        self.assertTrue(abs(e[0] - ref) < 1e-10)
+
+        # 9 sites, compare with the explicit Hamiltonian
+        hub = Hubbard1D(9, 1.0, 4.0, boundary='p')
+        myfci = FCISimple(hub, 3, m_s=1)
+        ref = numpy.linalg.eigvalsh(myfci.getH())[:2]
+        e, v = myfci.run(nroots=2, method='davidson')
+        self.assertTrue(numpy.abs(e - ref).max() < 1e-10)
+
+    def test_memory(self):
+        hub = Hubbard1D(16, 1.0, 4.0, boundary='p')
+        myfci = FCISimple(hub, 16, m_s=0, max_memory=100)
+        self.assertTrue(myfci.k == 12870**2)
+        mem = myfci.memory_estimate('davidson', nroots=1, max_space=20)
+        self.assertTrue(mem > 40*8*myfci.k)
+        with self.assertRaises(Exception):
+            myfci.run(method='davidson')
+        with self.assertRaises(Exception):
+            myfci.dets
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice.greens import GreensFunction
+from lattice import rdm
+from lattice import free
+
+
+class FreeTest(unittest.TestCase):
+    def test_ground(self):
+        hub = Hubbard1D(6, 1.0, 0.0, boundary='p')
+        for nelec, m_s in (((3, 2), 1), (5, None)):
+            ff = free.FreeFermions(hub, nelec, phase=0.3)
+            e = numpy.linalg.eigvalsh(FCISimple(hub, 5, m_s=m_s).getH(
+                phase=0.3))
+            self.assertAlmostEqual(ff.e_tot, e[0])
+
+        aim = Anderson(3, 2, 1.0, 0.5, 0.0, 0.2, -0.3)
+        ff = free.FreeFermions(aim, (3, 3))
+        fci = FCISimple(aim, 6, m_s=0)
+        e, c = numpy.linalg.eigh(fci.getH())
+        self.assertAlmostEqual(ff.e_tot, e[0])
+        for dm, ref in zip(ff.make_rdm1s(), rdm.make_rdm1s(fci, c[:, 0])):
+            self.assertTrue(numpy.allclose(dm, ref))
+        gf = GreensFunction(fci, c[:, 0], e0=e[0])
+        w = numpy.linspace(-3, 3, 7)
+        G = ff.get_greens(w, orbitals=[3, 9])
+        self.assertTrue(numpy.allclose(G[:, 0, 0], gf(3, w)))
+        self.assertTrue(numpy.allclose(G[:, 1, 1], gf(9, w)))
+        self.assertTrue(numpy.allclose(G[:, 0, 1], 0.0))
+
+    def test_leads(self):
+        z = numpy.linspace(-3, 3, 5) + 0.1j
+        g = free.chain_surface(z, 0.2, 1.0)
+        self.assertTrue(numpy.all(g.imag < 0))
+        self.assertTrue(numpy.allclose(
+            g, free.chain_surface(z, 0.2, 1.0, n=2000)))
+        self.assertTrue(numpy.allclose(
+            g, free.sancho_rubio(z, [[0.2]], [[-1.0]])[:, 0, 0]))
+        # the same chain with two sites per layer
+        h00 = numpy.array([[0.2, -1.0], [-1.0, 0.2]])
+        h01 = numpy.array([[0.0, 0.0], [-1.0, 0.0]])
+        self.assertTrue(numpy.allclose(
+            g, free.sancho_rubio(z, h00, h01)[:, 0, 0]))
+
+        # finite leads reproduce the dot element of the resolvent
+        aim = Anderson(30, 20, 1.0, 0.5, 0.0, 0.2, -0.3)
+        h = aim.get_hmat()[:aim.N, :aim.N]
+        ref = [numpy.linalg.inv(x*numpy.eye(aim.N) - h)[aim.ll, aim.ll]
+               for x in z]
+        sl, sr = free.anderson_self_energy(aim, z, semi_infinite=False)
+        self.assertTrue(numpy.allclose(1.0/(z - aim.vg - sl - sr), ref))
+
+        # a perfect chain transmits inside the band
+        T = free.transmission(Anderson(1, 1, 1.0, 1.0, 0.0, 0.0, 0.0),
+                              numpy.array([-2.5, -1.0, 0.0, 1.9, 2.5]))
+        self.assertTrue(numpy.allclose(T, [0, 1, 1, 1, 0]))
+
+    def test_downfold(self):
+        # exact when the bath fits into the chain
+        aim = Anderson(2, 2, 1.0, 0.5, 2.0, 0.2, -0.3)
+        chain = free.downfold(aim, 4)
+        self.assertEqual(chain.N, 5)
+        ref = numpy.linalg.eigvalsh(FCISimple(aim, 5, m_s=1).getH())
+        e = numpy.linalg.eigvalsh(FCISimple(chain, 5, m_s=1).getH())
+        self.assertTrue(numpy.allclose(e, ref))
+
+        # long leads are represented by a short chain
+        aim = Anderson(400, 400, 1.0, 0.5, 2.0, 0.2, -0.3)
+        chain = free.downfold(aim, 8, phase=0.2)
+        z = numpy.array([0.5 + 1.5j, 2.0j])
+        sl, sr = free.anderson_self_energy(aim, z)
+        h = chain.get_hmat()[:chain.N, :chain.N]
+        g = [numpy.linalg.inv(x*numpy.eye(chain.N - 1) - h[1:, 1:])[0, 0]
+             for x in z]
+        hyb = chain.b[0]**2*numpy.array(g)
+        self.assertTrue(numpy.allclose(hyb, sl + sr, atol=1e-4))
+
+
+if __name__ == '__main__':
+    unittest.main()
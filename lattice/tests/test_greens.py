@@ -0,0 +1,51 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice import greens
+from lattice import rdm
+
+
+class GreensTest(unittest.TestCase):
+    def test_ladder(self):
+        # a^+_p a_q reproduces the single-replacement operator E_pq
+        hub = Hubbard1D(4, 1.0, 2.0)
+        myfci = FCISimple(hub, 4, m_s=0)
+        minus = FCISimple(hub, (1, 2))
+        c = numpy.random.RandomState(3).rand(myfci.k)
+        na, nb, la, lb = myfci._get_links()
+        T = rdm._images(c.reshape(na, nb, 1), la, 4, 0)
+        for p, q in ((0, 0), (0, 2), (3, 1)):
+            x = greens.apply_annihilation(myfci, minus, c, q)
+            x = greens.apply_creation(minus, myfci, x, p)
+            self.assertTrue(numpy.abs(x - T[p, q].reshape(-1)).max() < 1e-12)
+
+    def test_lehmann(self):
+        aim = Anderson(2, 2, 1.0, 0.5, 2.0, 0.3, -0.2)
+        hub = Hubbard1D(4, 1.0, 3.0, boundary='p')
+        omega = numpy.linspace(-4.0, 4.0, 201)
+        eta = 0.1
+        for model, nelec, m_s, p in ((aim, 4, 0, 2), (hub, 4, 0, 5),
+                                     (aim, 5, None, 2)):
+            myfci = FCISimple(model, nelec, m_s=m_s)
+            e, v = numpy.linalg.eigh(myfci.getH())
+            g = greens.GreensFunction(myfci, v[:, 0])
+            self.assertTrue(abs(g.e0 - e[0]) < 1e-10)
+            ref = numpy.zeros(omega.shape, dtype=complex)
+            for dn in (1, -1):
+                target = g._get_space(p, dn)
+                en, vn = numpy.linalg.eigh(target.getH())
+                x = greens._ladder(myfci, target, v[:, 0], p, dn == 1)
+                w = numpy.abs(vn.conj().T @ x)**2
+                pole = dn*(en - e[0])
+                z = omega[:, None] + 1.j*eta
+                ref += (w[None, :]/(z - pole[None, :])).sum(axis=1)
+            self.assertTrue(numpy.abs(g(p, omega, eta) - ref).max() < 1e-8)
+            # the spectral weight is normalized
+            A = g.spectral(p, numpy.linspace(-200, 200, 40001), eta=0.5)
+            self.assertTrue(abs(A.sum()*0.01 - 1.0) < 1e-2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -105,6 +105,22 @@ class HubbardTest(unittest.TestCase):
         diff = numpy.linalg.norm(tout - tref)
         self.assertTrue(diff < 1e-14)
 
+    def testTSparse(self):
+        # neighbors as a padded array, 4 sites open boundary
+        nn = numpy.array([(1, -1), (0, 2), (1, 3), (2, -1)])
+        hub = Hubbard2D(4, 1.0, 0.0, nn)
+        ref = Hubbard1D(4, 1.0, 0.0, boundary='o')
+        for phase in [None, 0.3]:
+            tref = ref.get_tmat(phase=phase)
+            tout = hub.get_tmat(phase=phase)
+            self.assertTrue(numpy.linalg.norm(tout - tref) < 1e-14)
+            try:
+                tout = hub.get_tmat(phase=phase, sparse=True).toarray()
+            except Exception:
+                # scipy is not available
+                continue
+            self.assertTrue(numpy.linalg.norm(tout - tref) < 1e-14)
+
     def testUNorm(self):
         # 2 sites, open boundary
         L = 2
@@ -0,0 +1,57 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice import interaction
+from lattice.model import Model
+
+
+class InteractionTest(unittest.TestCase):
+    def test_onsite(self):
+        N = 3
+        hub = Hubbard1D(N, 1.0, 2.0, boundary='o')
+        U = hub.get_interaction()
+        self.assertTrue(U.nnz == 4*N)
+        ref = numpy.zeros((2*N, 2*N, 2*N, 2*N))
+        for i in range(N):
+            ref[i, N + i, i, N + i] = 2.0
+            ref[N + i, i, N + i, i] = 2.0
+            ref[i, i, i, i] = 2.0
+            ref[N + i, N + i, N + i, N + i] = 2.0
+        self.assertTrue(numpy.linalg.norm(hub.get_umat() - ref) < 1e-14)
+        self.assertTrue(numpy.linalg.norm(U.onsite - 2.0) < 1e-14)
+
+        # only the dot interacts in the Anderson model
+        aim = Anderson(2, 1, 1.0, 1.0, 3.0, 0.0, 0.0)
+        U = aim.get_interaction()
+        self.assertTrue(U.nnz == 4)
+        self.assertTrue(abs(numpy.sum(aim.get_umat()) - 12.0) < 1e-14)
+
+    def test_dense(self):
+        rng = numpy.random.RandomState(1)
+        ref = rng.rand(4, 4, 4, 4)*(rng.rand(4, 4, 4, 4) > 0.8)
+        U = interaction.from_dense(ref)
+        self.assertTrue(numpy.linalg.norm(U.todense() - ref) < 1e-14)
+        jk = numpy.einsum('ijij->ij', ref) - numpy.einsum('ijji->ij', ref)
+        self.assertTrue(numpy.linalg.norm(U.get_jk() - jk) < 1e-14)
+        out = sum(v for p, q, r, s, v in U)
+        self.assertTrue(abs(out - ref.sum()) < 1e-12)
+
+        # a model defines its interaction by either method
+        class Dense(Model):
+            N = 2
+
+            def get_umat(self):
+                return ref
+
+        class Bare(Model):
+            N = 2
+
+        U = Dense().get_interaction()
+        self.assertTrue(numpy.linalg.norm(U.todense() - ref) < 1e-14)
+        self.assertRaises(NotImplementedError, Bare().get_interaction)
+        self.assertRaises(NotImplementedError, Bare().get_umat)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import numpy
+from lattice import lattices
+from lattice.hubbard import Hubbard1D, Hubbard2D, Hubbard3D
+
+
+class LatticesTest(unittest.TestCase):
+    def test_square(self):
+        # 3 x 3 periodic, same bonds as the explicit neighbor list
+        nn = [(1, 3, 2, 6), (0, 7, 2, 4), (1, 8, 0, 5),
+              (5, 0, 4, 6), (3, 1, 5, 7), (4, 2, 3, 8),
+              (8, 3, 7, 0), (6, 4, 8, 1), (7, 5, 6, 2)]
+        tref = Hubbard2D(9, 1.0, 0.0, nn).get_tmatS()
+        tout = Hubbard2D(9, 1.0, 0.0, 'square', shape=(3, 3)).get_tmatS()
+        self.assertTrue(numpy.linalg.norm(tout - tref) < 1e-14)
+
+        # 1 x 5 strip, same as the 1D chain
+        for bc in ('o', 'p'):
+            tref = Hubbard1D(5, 1.0, 0.0, boundary=bc).get_tmatS()
+            hub = Hubbard2D(5, 1.0, 0.0, 'square', shape=(1, 5),
+                            boundary=bc)
+            tout = hub.get_tmatS()
+            self.assertTrue(numpy.linalg.norm(tout - tref) < 1e-14)
+
+        # 2 x 2 x 2 open cube
+        nn = [(1, 2, 4), (0, 3, 5), (0, 6, 3), (1, 2, 7),
+              (0, 6, 5), (4, 7, 1), (2, 4, 7), (3, 5, 6)]
+        tref = Hubbard3D(8, 1.0, 0.0, nn).get_tmatS()
+        hub = Hubbard3D(8, 1.0, 0.0, 'cubic', shape=(2, 2, 2), boundary='o')
+        tout = hub.get_tmatS()
+        self.assertTrue(numpy.linalg.norm(tout - tref) < 1e-14)
+
+    def test_coordination(self):
+        lat = lattices.triangular(4, 4)
+        self.assertTrue(numpy.all((lat.nn >= 0).sum(axis=1) == 6))
+        lat = lattices.honeycomb(3, 3)
+        self.assertTrue(lat.nn.shape == (18, 3))
+        self.assertTrue(numpy.all(lat.nn >= 0))
+        # bipartite: A sites only bond to B sites
+        self.assertTrue(numpy.all(lat.nn[0::2] % 2 == 1))
+        lat = lattices.square(3, 4, boundary='o')
+        z = (lat.nn >= 0).sum(axis=1)
+        self.assertTrue(z.sum() == 2*(2*4 + 3*3))
+        self.assertTrue(lattices.square(3, 4, boundary='o') is lat)
+
+    def test_honeycomb_strip(self):
+        # a periodic axis of one cell wraps the A-B bond of another cell
+        for shape in ((1, 3), (3, 1), (1, 1)):
+            lat = lattices.honeycomb(*shape)
+            self.assertTrue(numpy.all((lat.nn >= 0).sum(axis=1) == 3))
+            self.assertTrue(numpy.all(lat.nn[0::2] % 2 == 1))
+            self.assertTrue(numpy.all(lat.nn[1::2] % 2 == 0))
+            # one wrapping bond per row, seen from both of its ends
+            self.assertTrue(numpy.abs(lat.wind).sum() == 2*sum(shape))
+
+        # the twist of a one-cell axis is the Bloch momentum k1
+        twist = 0.7
+        N = 6
+        hub = Hubbard2D(N, 1.0, 0.0, 'honeycomb', shape=(1, 3),
+                        boundary=('t', 'p'), twist=twist)
+        e = numpy.linalg.eigvalsh(hub.get_tmatS())
+        k2 = 2*numpy.pi*numpy.arange(3)/3
+        f = numpy.abs(1 + numpy.exp(1j*twist) + numpy.exp(1j*k2))
+        eref = numpy.sort(numpy.concatenate((f, -f)))
+        self.assertTrue(numpy.linalg.norm(e - eref) < 1e-12)
+
+    def test_twist(self):
+        # a twisted ring is a uniform Peierls phase of twist/L per bond
+        L = 6
+        twist = 0.7
+        hub = Hubbard2D(L, 1.0, 0.0, 'square', shape=(1, L),
+                        boundary=('o', 't'), twist=twist)
+        T = hub.get_tmatS()
+        self.assertTrue(numpy.linalg.norm(T - T.conj().T) < 1e-14)
+        e = numpy.linalg.eigvalsh(T)
+        k = 2*numpy.pi*numpy.arange(L)/L
+        eref = numpy.sort(-2*numpy.cos(k + twist/L))
+        self.assertTrue(numpy.linalg.norm(e - eref) < 1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
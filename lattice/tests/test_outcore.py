@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice import outcore
+
+
+class OutcoreTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_sigma(self):
+        hub = Hubbard1D(5, 1.0, 3.0, boundary='p')
+        aim = Anderson(2, 2, 1.0, 0.5, 2.0, 0.4, -0.3)
+        for model, nelec, m_s, phase in ((hub, 5, 1, 0.3), (aim, 4, 0, None)):
+            myfci = FCISimple(model, nelec, m_s=m_s)
+            c = numpy.random.RandomState(1).rand(myfci.k, 2)
+            x = numpy.lib.format.open_memmap(
+                os.path.join(self.path, 'x.npy'), mode='w+', dtype=float,
+                shape=c.shape)
+            x[:] = c
+            ref = myfci.sigma(c, phase=phase)
+            for blksize in (1, 3, None):
+                out = outcore.sigma(myfci, x, phase=phase, blksize=blksize)
+                self.assertTrue(numpy.abs(out - ref).max() < 1e-12)
+            # the diagonal is built from string factors, block by block
+            nb = myfci.bstrings.shape[0]
+            terms = myfci._get_sigma_terms(phase)
+            d = myfci.getH(phase=phase).diagonal()
+            dblk = myfci._diagonal(terms, slice(1, 3)).reshape(-1)
+            self.assertTrue(numpy.abs(dblk - d[nb:3*nb]).max() < 1e-12)
+
+    def test_davidson(self):
+        hub = Hubbard1D(6, 1.0, 3.0, boundary='p')
+        myfci = FCISimple(hub, 6, m_s=0)
+        e, v = myfci.run(method='dense')
+        # a small subspace forces restarts
+        eo, vo = myfci.run(nroots=2, method='davidson', outcore=self.path,
+                           max_space=8, tol_residual=1e-7)
+        self.assertTrue(numpy.abs(eo - e[:2]).max() < 1e-10)
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ['root0.npy', 'root1.npy'])
+        self.assertEqual(vo[0].shape, (myfci.k,))
+        x = vo[0].load()
+        self.assertTrue(abs(abs(numpy.vdot(x, v[:, 0])) - 1) < 1e-10)
+        # the handles work as arrays
+        r = myfci.sigma(numpy.asarray(vo[1])) - eo[1]*numpy.asarray(vo[1])
+        self.assertTrue(numpy.linalg.norm(r) < 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice import rdm
+
+
+class RDMTest(unittest.TestCase):
+    def test_energy(self):
+        hub = Hubbard1D(4, 1.0, 3.0, boundary='p')
+        aim = Anderson(2, 1, 1.0, 0.5, 2.0, 0.4, -0.3)
+        for model, nelec, phase in ((hub, 4, 0.3), (aim, 4, None)):
+            myfci = FCISimple(model, nelec, m_s=0)
+            e, v = numpy.linalg.eigh(myfci.getH(phase=phase))
+            v = v[:, :3]
+            h = model.get_hmat(phase=phase)
+            U = model.get_umat()
+            dm1, dm2 = rdm.make_rdm12(myfci, v)
+            out = numpy.einsum('pq,mpq->m', h, dm1)
+            out += 0.5*numpy.einsum('pqrs,mpqrs->m', U, dm2)
+            self.assertTrue(numpy.abs(out - e[:3]).max() < 1e-12)
+            # a single vector gives the same as the first root
+            dm1, dm2 = rdm.make_rdm12(myfci, v[:, 1])
+            out = numpy.einsum('pq,pq', h, dm1)
+            out += 0.5*numpy.einsum('pqrs,pqrs', U, dm2)
+            self.assertTrue(abs(out - e[1]) < 1e-12)
+
+    def test_observables(self):
+        hub = Hubbard1D(4, 1.0, 3.0, boundary='p')
+        myfci = FCISimple(hub, 4, m_s=0)
+        e, v = myfci.run(nroots=2)
+        # singlet ground state and triplet excited state
+        ss = rdm.spin_correlation(myfci, v)
+        self.assertTrue(numpy.abs(ss.sum(axis=(1, 2)) - [0, 2]).max() < 1e-10)
+        nn = rdm.density_correlation(myfci, v)
+        self.assertTrue(numpy.abs(nn.sum(axis=(1, 2)) - 16).max() < 1e-10)
+        d = rdm.double_occupancy(myfci, v)
+        aa, ab, bb = rdm.make_rdm2s(myfci, v)
+        ref = numpy.einsum('miiii->mi', ab)
+        self.assertTrue(numpy.abs(d - ref).max() < 1e-12)
+        # the interaction energy is U sum_i <n_i,a n_i,b>
+        h = hub.get_hmat()
+        dm1 = rdm.make_rdm1s(myfci, v)
+        e1 = numpy.einsum('pq,mpq->m', h[:4, :4], dm1[0] + dm1[1])
+        self.assertTrue(numpy.abs(e1 + 3.0*d.sum(axis=1) - e).max() < 1e-10)
+
+    def test_currents(self):
+        hub = Hubbard1D(4, 1.0, 3.0, boundary='p')
+        myfci = FCISimple(hub, 3, m_s=1)
+
+        def _energy(phase):
+            return numpy.linalg.eigh(myfci.getH(phase=phase))
+
+        e, v = _energy(0.3)
+        J = rdm.bond_currents(myfci, v[:, 0], phase=0.3)
+        self.assertTrue(numpy.abs(J + J.T).max() < 1e-12)
+        # dE/dphase is the sum of the currents i -> j with i < j
+        h = 1e-5
+        de = (_energy(0.3 + h)[0][0] - _energy(0.3 - h)[0][0])/(2*h)
+        self.assertTrue(abs(numpy.triu(J).sum() - de) < 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.fci import FCISimple
+from lattice.scan import PhaseScan
+
+
+class ScanTest(unittest.TestCase):
+    def test_getH(self):
+        hub = Hubbard1D(4, 1.0, 2.0, boundary='p')
+        myfci = FCISimple(hub, 4, m_s=0)
+        scan = PhaseScan(myfci)
+        for phase in (0.0, 0.4, 2.5):
+            Href = myfci.getH(phase=phase)
+            diff = numpy.linalg.norm(scan.getH(phase) - Href)
+            self.assertTrue(diff < 1e-12)
+
+    def test_run(self):
+        hub = Hubbard1D(5, 1.0, 4.0, boundary='p')
+        myfci = FCISimple(hub, 4, m_s=0)
+        scan = PhaseScan(myfci)
+        phases = numpy.linspace(0.0, numpy.pi, 5)
+        eref = numpy.array([
+            numpy.linalg.eigvalsh(myfci.getH(phase=p))[:2] for p in phases])
+        e = scan.run(phases, nroots=2)
+        self.assertTrue(numpy.abs(e - eref).max() < 1e-10)
+        e = scan.run(phases, nroots=2, method='davidson')
+        self.assertTrue(numpy.abs(e - eref).max() < 1e-8)
+
+        # the current is the derivative of the energy
+        e, v = scan.run([0.3], return_vectors=True)
+        h = 1e-4
+        de = (scan.run([0.3 + h]) - scan.run([0.3 - h]))/(2*h)
+        J = scan.get_current(0.3, v[0])
+        self.assertTrue(abs(J[0] - de[0, 0]) < 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
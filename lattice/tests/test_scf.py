@@ -0,0 +1,58 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice.scf import SCF
+
+
+class SCFTest(unittest.TestCase):
+    def test_energy(self):
+        # the SCF energy is the expectation value of H in the determinant
+        models = [Hubbard1D(6, 1.0, 4.0, boundary='o'),
+                  Anderson(3, 2, 1.0, 0.5, 2.0, 0.1, -1.0)]
+        for model in models:
+            for kind in ('rhf', 'uhf', 'ghf'):
+                for phase in (None, 0.3):
+                    if kind == 'ghf':
+                        nelec, m_s = model.N, None
+                    else:
+                        nelec, m_s = (model.N//2, model.N//2), 0
+                    mf = SCF(model, nelec, kind=kind, phase=phase)
+                    e = mf.run()
+                    self.assertTrue(mf.converged)
+                    fci = FCISimple(model, model.N, m_s=m_s)
+                    c = mf.get_ci_vector(fci)
+                    self.assertAlmostEqual(numpy.linalg.norm(c), 1.0)
+                    H = fci.getH(phase=phase)
+                    self.assertAlmostEqual(
+                        (c.conj() @ H @ c).real, e, places=8)
+                    # orbitals of the full spin-orbital space are unitary
+                    C = mf.get_orbitals()
+                    self.assertTrue(numpy.allclose(
+                        C.conj().T @ C, numpy.eye(2*model.N)))
+
+    def test_sparse(self):
+        aim = Anderson(20, 19, 1.0, 0.5, 2.0, 0.1, -1.0)
+        h = aim.get_hmat(phase=0.2)
+        hs = aim.get_hmat(phase=0.2, sparse=True)
+        self.assertTrue(numpy.allclose(hs.toarray(), h))
+        model = Hubbard1D(60, 1.0, 4.0, boundary='o')
+        # low filling, where undamped iterations oscillate
+        for nelec in ((3, 2), (2, 2)):
+            ref = SCF(model, nelec, kind='uhf')
+            e = ref.run()
+            self.assertTrue(ref.converged)
+            mf = SCF(model, nelec, kind='uhf', sparse=True)
+            self.assertAlmostEqual(mf.run(), e, places=7)
+            self.assertTrue(mf.converged)
+            self.assertTrue(numpy.allclose(mf.x, ref.x, atol=1e-6))
+            # the sparse eigensolver only returns the lowest orbitals
+            na = nelec[0]
+            self.assertEqual(mf.mo_energy[0].shape, (na + 1,))
+            self.assertTrue(numpy.allclose(
+                mf.mo_energy[0], ref.mo_energy[0][:na + 1], atol=1e-7))
+
+
+if __name__ == '__main__':
+    unittest.main()
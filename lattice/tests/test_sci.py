@@ -0,0 +1,58 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice.sci import DeterminantSet, SelectedCI
+
+
+class SCITest(unittest.TestCase):
+    def test_set(self):
+        rand = numpy.random.RandomState(3)
+        dets = rand.randint(0, 2**62, size=5000).astype(numpy.uint64)
+        dets = numpy.concatenate((dets, dets[:100]))
+        dset = DeterminantSet(capacity=16)
+        idx = dset.add(dets[:2000])
+        self.assertTrue(numpy.array_equal(dset.add(dets)[:2000], idx))
+        self.assertTrue(len(dset) == len(numpy.unique(dets)))
+        self.assertTrue(numpy.array_equal(dset.dets[dset.lookup(dets)], dets))
+        other = dets + numpy.uint64(2**62)
+        self.assertTrue(numpy.all(dset.lookup(other) == -1))
+
+    def test_hubbard(self):
+        hub = Hubbard1D(6, 1.0, 4.0, boundary='p')
+        myfci = FCISimple(hub, 6, m_s=0)
+        eref = numpy.linalg.eigvalsh(myfci.getH())[0]
+
+        # the full space reproduces FCI
+        sci = SelectedCI(hub, 6)
+        e, etot = sci.run(ndet_max=myfci.k)
+        self.assertTrue(abs(e - eref) < 1e-10)
+        self.assertTrue(abs(etot - eref) < 1e-10)
+
+        # PT2 reduces the error of a truncated space
+        for select in ('pt2', 'heatbath'):
+            sci = SelectedCI(hub, 6)
+            e, etot = sci.run(ndet_max=150, select=select)
+            self.assertTrue(len(sci.dets) == 150)
+            self.assertTrue(e > eref)
+            self.assertTrue(abs(etot - eref) < e - eref)
+
+        # the starting determinant as a bit string, numpy integer or list
+        occ = [0, 1, 2, 6, 7, 8]
+        for det0 in (0b111000111, numpy.uint64(0b111000111), occ):
+            sci = SelectedCI(hub, 6, det0=det0)
+            self.assertTrue(sci.det0 == 0b111000111)
+            self.assertTrue(type(sci.det0) is int)
+
+    def test_anderson(self):
+        aim = Anderson(2, 2, 1.0, 0.5, 4.0, 0.2, -0.5)
+        myfci = FCISimple(aim, 5, m_s=1)
+        eref = numpy.linalg.eigvalsh(myfci.getH())[0]
+        sci = SelectedCI(aim, 5)
+        e, etot = sci.run(ndet_max=myfci.k)
+        self.assertTrue(abs(e - eref) < 1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
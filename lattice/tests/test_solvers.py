@@ -0,0 +1,42 @@
+import unittest
+import numpy
+from lattice import solvers
+
+
+class SolversTest(unittest.TestCase):
+    def setUp(self):
+        n = 60
+        rng = numpy.random.RandomState(3)
+        A = rng.rand(n, n) - 0.5
+        self.A = 0.1*(A + A.T) + numpy.diag(numpy.arange(n, dtype=float))
+        self.eref = numpy.linalg.eigvalsh(self.A)
+
+    def test_davidson(self):
+        A = self.A
+        e, v = solvers.davidson(
+            lambda x: A @ x, A.diagonal(), nroots=3, max_space=10)
+        self.assertTrue(numpy.linalg.norm(e - self.eref[:3]) < 1e-10)
+        res = A @ v - v*e[None, :]
+        self.assertTrue(numpy.linalg.norm(res) < 1e-5)
+
+        # a preconditioner that maps the residual back onto the guess
+        x = numpy.ones(A.shape[0])/numpy.sqrt(A.shape[0])
+        theta = x @ A @ x
+        r = A @ x - theta*x
+        with self.assertLogs(level='WARNING') as log:
+            e, v = solvers.davidson(
+                lambda x: A @ x, theta - r/x, x0=x, nroots=1)
+        self.assertIn('linearly dependent', log.output[0])
+        self.assertAlmostEqual(e[0], theta)
+
+    def test_lanczos(self):
+        A = self.A
+        e, v = solvers.lanczos(
+            lambda x: A @ x, A.diagonal(), nroots=2, max_space=12)
+        self.assertTrue(numpy.linalg.norm(e - self.eref[:2]) < 1e-10)
+        res = A @ v - v*e[None, :]
+        self.assertTrue(numpy.linalg.norm(res) < 1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
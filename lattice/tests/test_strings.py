@@ -0,0 +1,31 @@
+import unittest
+import numpy
+from lattice import strings
+
+
+class StringsTest(unittest.TestCase):
+    def test_address(self):
+        for norb, nelec in [(5, 0), (5, 2), (6, 3), (4, 4)]:
+            s = strings.make_strings(norb, nelec)
+            Z = strings.make_addressing(norb, nelec)
+            out = strings.address(s, Z)
+            ref = numpy.arange(s.shape[0])
+            self.assertTrue(numpy.array_equal(out, ref))
+
+    def test_links(self):
+        # a^+_0 a_2 |1 2> = -|0 1>
+        s = strings.make_strings(4, 2)
+        links = strings.make_links(s, 4)
+        I, J, sign = links[0, 2]
+        j = list(s).index(0b0110)
+        i = list(I[J == j])
+        self.assertTrue(s[i[0]] == 0b0011)
+        self.assertTrue(sign[J == j][0] == -1)
+        # number operators are diagonal
+        I, J, sign = links[1, 1]
+        self.assertTrue(numpy.array_equal(I, J))
+        self.assertTrue(numpy.all(s[J] & 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,24 @@ import test_anderson
 import test_hubbard
 import test_test
 import test_fci_simple
+import test_solvers
+import test_strings
+import test_symmetry
+import test_interaction
+import test_lattices
+import test_scan
+import test_sweep
+import test_sci
+import test_rdm
+import test_dynamics
+import test_greens
+import test_thermo
+import test_cache
+import test_outcore
+import test_scf
+import test_transform
+import test_free
+import test_dmrg
 
 
 def run_suite():
@@ -12,16 +30,87 @@ def run_suite():
 
     suite.addTest(test_anderson.AndersonTest("test_vs_hubbard_simple"))
     suite.addTest(test_anderson.AndersonTest("test_vs_hubbard"))
+    suite.addTest(test_anderson.AndersonTest("test_fci"))
 
     suite.addTest(test_hubbard.HubbardTest("testT1D"))
     suite.addTest(test_hubbard.HubbardTest("testT2D"))
     suite.addTest(test_hubbard.HubbardTest("testT3D"))
+    suite.addTest(test_hubbard.HubbardTest("testTSparse"))
     suite.addTest(test_hubbard.HubbardTest("testUNorm"))
 
     suite.addTest(test_test.TestTest("test_framework"))
 
     suite.addTest(test_fci_simple.TestFCISimple("test_1d_hubbard"))
     suite.addTest(test_fci_simple.TestFCISimple("test_basis_2site"))
+    suite.addTest(test_fci_simple.TestFCISimple("test_dets_2site"))
+    suite.addTest(test_fci_simple.TestFCISimple("test_sparse_H"))
+    suite.addTest(test_fci_simple.TestFCISimple("test_sigma"))
+    suite.addTest(test_fci_simple.TestFCISimple("test_sectors"))
+    suite.addTest(test_fci_simple.TestFCISimple(
+        "test_1d_hubbard_iterative"))
+    suite.addTest(test_fci_simple.TestFCISimple("test_large"))
+    suite.addTest(test_fci_simple.TestFCISimple("test_memory"))
+
+    suite.addTest(test_solvers.SolversTest("test_davidson"))
+    suite.addTest(test_solvers.SolversTest("test_lanczos"))
+
+    suite.addTest(test_strings.StringsTest("test_address"))
+    suite.addTest(test_strings.StringsTest("test_links"))
+
+    suite.addTest(test_symmetry.SymmetryTest("test_translations"))
+    suite.addTest(test_symmetry.SymmetryTest("test_momentum_blocks"))
+    suite.addTest(test_symmetry.SymmetryTest("test_invariance"))
+
+    suite.addTest(test_interaction.InteractionTest("test_onsite"))
+    suite.addTest(test_interaction.InteractionTest("test_dense"))
+
+    suite.addTest(test_lattices.LatticesTest("test_square"))
+    suite.addTest(test_lattices.LatticesTest("test_coordination"))
+    suite.addTest(test_lattices.LatticesTest("test_honeycomb_strip"))
+    suite.addTest(test_lattices.LatticesTest("test_twist"))
+
+    suite.addTest(test_scan.ScanTest("test_getH"))
+    suite.addTest(test_scan.ScanTest("test_run"))
+
+    suite.addTest(test_sweep.SweepTest("test_run"))
+    suite.addTest(test_sweep.SweepTest("test_checkpoint"))
+
+    suite.addTest(test_sci.SCITest("test_set"))
+    suite.addTest(test_sci.SCITest("test_hubbard"))
+    suite.addTest(test_sci.SCITest("test_anderson"))
+
+    suite.addTest(test_rdm.RDMTest("test_energy"))
+    suite.addTest(test_rdm.RDMTest("test_observables"))
+    suite.addTest(test_rdm.RDMTest("test_currents"))
+
+    suite.addTest(test_dynamics.DynamicsTest("test_quench"))
+    suite.addTest(test_dynamics.DynamicsTest("test_phase"))
+
+    suite.addTest(test_greens.GreensTest("test_ladder"))
+    suite.addTest(test_greens.GreensTest("test_lehmann"))
+
+    suite.addTest(test_thermo.ThermoTest("test_dense"))
+    suite.addTest(test_thermo.ThermoTest("test_ftlm"))
+    suite.addTest(test_thermo.ThermoTest("test_spin_flip"))
+
+    suite.addTest(test_cache.CacheTest("test_lru"))
+    suite.addTest(test_cache.CacheTest("test_fci"))
+
+    suite.addTest(test_outcore.OutcoreTest("test_sigma"))
+    suite.addTest(test_outcore.OutcoreTest("test_davidson"))
+
+    suite.addTest(test_scf.SCFTest("test_energy"))
+    suite.addTest(test_scf.SCFTest("test_sparse"))
+
+    suite.addTest(test_transform.TransformTest("test_integrals"))
+    suite.addTest(test_transform.TransformTest("test_fci"))
+
+    suite.addTest(test_free.FreeTest("test_ground"))
+    suite.addTest(test_free.FreeTest("test_leads"))
+    suite.addTest(test_free.FreeTest("test_downfold"))
+
+    suite.addTest(test_dmrg.DMRGTest("test_fci"))
+    suite.addTest(test_dmrg.DMRGTest("test_free"))
 
     return suite
 
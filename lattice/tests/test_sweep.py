@@ -0,0 +1,63 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.fci import FCISimple
+from lattice import sweep
+
+
+def _make_model(U, t):
+    return Hubbard1D(4, t, U, boundary='p')
+
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_run(self):
+        points = sweep.grid(U=[0.0, 2.0, 4.0], t=[1.0, 0.5])
+        self.assertTrue(len(points) == 6)
+        res = sweep.run(_make_model, points, 4, m_s=0, nroots=2, nproc=2)
+        for rec, params in zip(res, points):
+            myfci = FCISimple(_make_model(**params), 4, m_s=0)
+            eref = numpy.linalg.eigvalsh(myfci.getH())[:2]
+            diff = numpy.abs(numpy.array(rec['energies']) - eref).max()
+            self.assertTrue(diff < 1e-10)
+
+    def test_checkpoint(self):
+        path = os.path.join(self.tmp, 'sweep.jsonl')
+        points = sweep.grid(U=[0.0, 1.0, 2.0, 3.0], t=[1.0])
+        ref = sweep.run(_make_model, points[:2], 4, m_s=0, nproc=1,
+                        checkpoint=path)
+        # an interrupted write leaves an incomplete line
+        with open(path, 'a') as f:
+            f.write('{"index": 3, "par')
+        calls = []
+
+        def measure(fci, e, v):
+            calls.append(1)
+            return {'nocc': float(numpy.abs(v[:, 0])**2 @ fci.basis[:, 0])}
+
+        res = sweep.run(_make_model, points, 4, m_s=0, nproc=1,
+                        checkpoint=path, measure=measure)
+        self.assertTrue(len(calls) == 2)
+        self.assertTrue(res[0]['energies'] == ref[0]['energies'])
+        self.assertTrue('nocc' in res[3])
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertTrue(sorted(r['index'] for r in lines) == [0, 1, 2, 3])
+
+        # a different grid does not match the checkpoint
+        points = sweep.grid(U=[5.0], t=[1.0])
+        with self.assertRaises(Exception):
+            sweep.run(_make_model, points, 4, m_s=0, checkpoint=path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D, Hubbard2D
+from lattice.fci import FCISimple
+from lattice import symmetry
+from lattice import interaction
+
+
+class SymmetryTest(unittest.TestCase):
+    def test_translations(self):
+        hub = Hubbard1D(5, 1.0, 1.0, boundary='p')
+        gens = symmetry.find_translations(hub.nn)
+        self.assertTrue(len(gens) == 1)
+        self.assertTrue(list(gens[0][0]) == [1, 2, 3, 4, 0])
+
+        # 3 x 3 periodic lattice
+        nn = [(1, 3, 2, 6), (0, 7, 2, 4), (1, 8, 0, 5),
+              (5, 0, 4, 6), (3, 1, 5, 7), (4, 2, 3, 8),
+              (8, 3, 7, 0), (6, 4, 8, 1), (7, 5, 6, 2)]
+        hub = Hubbard2D(9, 1.0, 1.0, nn)
+        gens = symmetry.find_translations(hub.nn)
+        self.assertTrue([n for _, n in gens] == [3, 3])
+
+        # open chain has no translations
+        hub = Hubbard1D(5, 1.0, 1.0, boundary='o')
+        self.assertTrue(symmetry.find_translations(hub.nn) == [])
+
+    def test_momentum_blocks(self):
+        hub = Hubbard1D(5, 1.0, 3.0, boundary='p')
+        myfci = FCISimple(hub, 4, m_s=0)
+        eref = numpy.linalg.eigvalsh(myfci.getH())
+        out = []
+        for k in range(5):
+            sector = symmetry.SymmetrySector(myfci, k=k)
+            e, v = sector.run(nroots=sector.m, method='dense')
+            out += list(e)
+        self.assertTrue(len(out) == myfci.k)
+        diff = numpy.abs(numpy.sort(out) - eref).max()
+        self.assertTrue(diff < 1e-12)
+
+        # lowest root from the iterative solver, checked in the full space
+        sector = symmetry.SymmetrySector(myfci, k=1, spin_flip=1)
+        e, v = sector.run(nroots=1, method='davidson')
+        c = sector.project(v)
+        res = myfci.sigma(c) - e[0]*c
+        self.assertTrue(numpy.linalg.norm(res) < 1e-5)
+
+    def test_invariance(self):
+        # a site-dependent U or interaction breaks the translations
+        U = numpy.array([3.0, 3.0, 3.0, 3.0, 2.0])
+        hub = Hubbard1D(5, 1.0, U, boundary='p')
+        myfci = FCISimple(hub, 4, m_s=0)
+        self.assertRaises(Exception, symmetry.SymmetrySector, myfci, k=0)
+
+        class Dense(Hubbard1D):
+            def get_interaction(self):
+                return interaction.from_dense(self.umat)
+
+        hub = Dense(5, 1.0, 3.0, boundary='p')
+        hub.umat = Hubbard1D(5, 1.0, 3.0, boundary='p').get_umat()
+        myfci = FCISimple(hub, 4, m_s=0)
+        self.assertTrue(symmetry.SymmetrySector(myfci, k=0).m > 0)
+        hub.umat[0, 6, 0, 6] += 1.0
+        self.assertRaises(Exception, symmetry.SymmetrySector, myfci, k=0)
+
+        # an open chain only has the k = 0 sector
+        hub = Hubbard1D(4, 1.0, 2.0, boundary='o')
+        myfci = FCISimple(hub, 4, m_s=0)
+        self.assertEqual(symmetry.SymmetrySector(myfci).m, myfci.k)
+        self.assertRaises(Exception, symmetry.SymmetrySector, myfci, k=3)
+        self.assertRaises(Exception, symmetry.SymmetrySector, myfci, k=(1,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import numpy
+from lattice.hubbard import Hubbard1D
+from lattice.fci import FCISimple
+from lattice.thermo import Thermodynamics
+from lattice import interaction
+
+
+class ThermoTest(unittest.TestCase):
+    def test_dense(self):
+        hub = Hubbard1D(4, 1.0, 4.0, boundary='p')
+        thermo = Thermodynamics(hub, nproc=2)
+        self.assertEqual(len(thermo.spectra), 25)
+        T = numpy.array([0.3, 1.0, 3.0])
+        mu = 1.5
+        out = thermo.evaluate(T, mu=mu)
+        # reference from the full spectrum of each particle number
+        Z = numpy.zeros(T.shape)
+        for n in range(9):
+            e = numpy.linalg.eigvalsh(FCISimple(hub, n).getH())
+            Z += numpy.exp(-(e[None, :] - mu*n)/T[:, None]).sum(axis=1)
+        self.assertTrue(numpy.abs(out['Z']/Z - 1).max() < 1e-12)
+        # the fluctuations are derivatives of the averages
+        d = 1e-4
+
+        def _k(T, field):
+            x = thermo.evaluate(T, mu=mu, field=field)
+            return x['E'] - mu*x['n'] - field*x['Sz'], x['Sz']
+
+        C = (_k(T + d, 0.0)[0] - _k(T - d, 0.0)[0])/(2*d)
+        self.assertTrue(numpy.abs(C - out['C']).max() < 1e-6)
+        # C is the grand canonical d<K>/dT, not d<E>/dT, as n varies
+        Ep = thermo.evaluate(T + d, mu=mu)['E']
+        Em = thermo.evaluate(T - d, mu=mu)['E']
+        dE = (Ep - Em)/(2*d)
+        self.assertTrue(numpy.abs(dE - out['C']).max() > 1e-3)
+        chi = (_k(T, d)[1] - _k(T, -d)[1])/(2*d)
+        self.assertTrue(numpy.abs(chi - out['chi']).max() < 1e-6)
+        self.assertTrue(numpy.abs(out['Sz']).max() < 1e-12)
+
+    def test_ftlm(self):
+        hub = Hubbard1D(6, 1.0, 4.0, boundary='p')
+        ref = Thermodynamics(hub, nproc=1)
+        ftlm = Thermodynamics(hub, method='ftlm', nproc=1, dense_max=100,
+                              nrand=40, nlanczos=60)
+        T = numpy.array([1.0, 2.0, 4.0])
+        x = ref.evaluate(T, mu=2.0)
+        y = ftlm.evaluate(T, mu=2.0)
+        self.assertTrue(numpy.abs(y['Z']/x['Z'] - 1).max() < 0.03)
+        self.assertTrue(numpy.abs(y['E'] - x['E']).max() < 0.05)
+
+    def test_spin_flip(self):
+        # an interaction between alpha electrons only breaks the symmetry
+        class Polarized(Hubbard1D):
+            def get_interaction(self):
+                U = Hubbard1D(self.N, 1.0, 4.0, boundary='p').get_umat()
+                U[0, 1, 0, 1] += 1.0
+                U[1, 0, 1, 0] += 1.0
+                return interaction.from_dense(U)
+
+        hub = Polarized(3, 1.0, 4.0, boundary='p')
+        thermo = Thermodynamics(hub, nproc=1)
+        for na, nb in ((2, 1), (1, 2)):
+            e = numpy.linalg.eigvalsh(FCISimple(hub, (na, nb)).getH())
+            self.assertTrue(numpy.allclose(thermo.spectra[na, nb][0], e))
+        self.assertFalse(numpy.allclose(
+            thermo.spectra[2, 1][0], thermo.spectra[1, 2][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
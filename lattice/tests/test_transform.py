@@ -0,0 +1,94 @@
+import unittest
+import numpy
+from lattice import utils
+from lattice import interaction
+from lattice import transform
+from lattice.hubbard import Hubbard1D
+from lattice.anderson import Anderson
+from lattice.fci import FCISimple
+from lattice.scf import SCF
+
+
+def _unitary(rng, n, *batch):
+    X = rng.randn(*batch, n, n) + 1.j*rng.randn(*batch, n, n)
+    return numpy.linalg.qr(X)[0]
+
+
+def _antisym(V):
+    # same-spin on-site terms are dropped, they vanish as operators
+    return V - numpy.swapaxes(V, -4, -3)
+
+
+class TransformTest(unittest.TestCase):
+    def test_integrals(self):
+        rng = numpy.random.RandomState(3)
+        models = [Hubbard1D(4, 1.0, 3.0, boundary='o'),
+                  Anderson(2, 1, 1.0, 0.5, 2.0, 0.1, -1.0)]
+        for model in models:
+            N = model.N
+            Ud = model.get_umat()
+            U = model.get_interaction()
+            h = model.get_hmat(phase=0.2)
+            Ca = _unitary(rng, N, 3)
+            Cb = _unitary(rng, N, 3)
+            bases = [_unitary(rng, 2*N), _unitary(rng, 2*N, 3), (Ca, Cb),
+                     utils.block_diag(Ca[0], Cb[0])]
+            for C in bases:
+                if isinstance(C, tuple):
+                    C = numpy.zeros((3, 2*N, 2*N), dtype=complex)
+                    C[:, :N, :N] = Ca
+                    C[:, N:, N:] = Cb
+                    Cin = (Ca, Cb)
+                else:
+                    Cin = C
+                ref = numpy.einsum('...pa,...qb,pqrs,...rc,...sd->...abcd',
+                                   C.conj(), C.conj(), Ud, C, C)
+                out = transform.rotate_interaction(
+                    U, Cin, notation='physicist')
+                self.assertTrue(numpy.allclose(_antisym(out), _antisym(ref)))
+                out = transform.rotate_interaction(U, Cin)
+                out = numpy.swapaxes(out, -3, -2)
+                self.assertTrue(numpy.allclose(_antisym(out), _antisym(ref)))
+                out = transform.rotate_one_body(h, Cin)
+                ref = numpy.swapaxes(C.conj(), -1, -2) @ h @ C
+                self.assertTrue(numpy.allclose(out, ref))
+
+        # the dense path gives the same alpha-beta block
+        Ug = interaction.Interaction(U.norb, U.idx, U.val)
+        C = (Ca[0], Cb[0])
+        ref = transform.rotate_interaction(U, C, spin=True)
+        out = transform.rotate_interaction(Ug, C, spin=True)
+        self.assertEqual(sorted(ref), ['ab'])
+        self.assertTrue(numpy.allclose(out['ab'], ref['ab']))
+        Ut = transform.to_interaction(out)
+        self.assertEqual(Ut.norb, 2*N)
+        t = model.get_tmat(sparse=True)
+        ref = transform.rotate_one_body(t.toarray(), C)
+        self.assertTrue(numpy.allclose(transform.rotate_one_body(t, C), ref))
+
+    def test_fci(self):
+        # the spectrum does not depend on the orbital basis
+        models = [Hubbard1D(6, 1.0, 4.0, boundary='o'),
+                  Anderson(3, 2, 1.0, 0.5, 2.0, 0.1, -1.0)]
+        for model in models:
+            for kind in ('uhf', 'ghf'):
+                m_s = None if kind == 'ghf' else 0
+                nelec = 6 if kind == 'ghf' else (3, 3)
+                mf = SCF(model, nelec, kind=kind, phase=0.3)
+                mf.run()
+                rot = transform.RotatedModel(model, mf.get_orbitals())
+                ref = FCISimple(model, 6, m_s=m_s).getH(phase=0.3)
+                fci = FCISimple(rot, 6, m_s=m_s)
+                H = fci.getH(phase=0.3)
+                self.assertTrue(numpy.allclose(
+                    numpy.linalg.eigvalsh(H), numpy.linalg.eigvalsh(ref)))
+                # the first determinant is the mean-field state
+                self.assertAlmostEqual(H[0, 0].real, mf.e_tot)
+                if m_s is not None:
+                    x = numpy.random.RandomState(1).rand(fci.k)
+                    self.assertTrue(numpy.allclose(
+                        fci.sigma(x, phase=0.3), H @ x))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import numpy
+from . import utils
+from . import interaction
+from .fci import FCISimple
+from .greens import lanczos_coefficients
+from .sweep import _get_context
+from .symmetry import _invariant_interaction
+
+
+def sectors(N):
+    """Return all (n_alpha, n_beta) sectors of N sites."""
+    return [(na, nb) for na in range(N + 1) for nb in range(N + 1)]
+
+
+def _spin_symmetric(model):
+    """Return whether H is invariant under the exchange of alpha and beta,
+    in its one-body terms and its interaction."""
+    N = model.N
+    flip = numpy.concatenate((numpy.arange(N) + N, numpy.arange(N)))
+    h = model.get_hmat()
+    if numpy.abs(h[numpy.ix_(flip, flip)] - h).max() > 1e-12:
+        return False
+    return _invariant_interaction(interaction.get_interaction(model), flip)
+
+
+def _ftlm(fci, nrand, nlanczos, seed):
+    """Return Ritz values and weights of a finite-temperature Lanczos run.
+
+    Tr exp(-beta H) is estimated as k/R sum_r sum_j |s_j0|^2
+    exp(-beta theta_j) over R random vectors r.
+    """
+    rand = numpy.random.RandomState(seed)
+    energies = []
+    weights = []
+    for r in range(nrand):
+        v = rand.choice([-1.0, 1.0], size=fci.k)
+        norm2, a, b = lanczos_coefficients(fci.sigma, v, niter=nlanczos)
+        T = numpy.diag(a) + numpy.diag(b, 1) + numpy.diag(b, -1)
+        theta, s = numpy.linalg.eigh(T)
+        energies.append(theta)
+        weights.append(s[0]**2*fci.k/nrand)
+    return numpy.concatenate(energies), numpy.concatenate(weights)
+
+
+def _spectrum(item):
+    """Return the energies and weights of one sector."""
+    model, na, nb, method, nrand, nlanczos, dense_max, seed = item
+    fci = FCISimple(model, (na, nb))
+    if method == 'dense' or fci.k <= dense_max:
+        e = numpy.linalg.eigvalsh(fci.getH())
+        return na, nb, e, numpy.ones(e.shape)
+    e, w = _ftlm(fci, nrand, nlanczos, seed)
+    return na, nb, e, w
+
+
+class Thermodynamics(object):
+    """Grand canonical thermodynamics from the spectra of all sectors.
+
+    The spectrum of every (n_alpha, n_beta) sector is computed once,
+    after which thermodynamic averages are cheap for any temperature,
+    chemical potential and magnetic field. For models that are invariant
+    under the exchange of alpha and beta, the sector (nb, na) is a copy
+    of (na, nb).
+
+    Attributes:
+        model: Lattice model.
+        spectra (dict): (energies, weights) of each sector. The weights
+            are 1 for exact spectra and the FTLM weights otherwise.
+    """
+    def __init__(self, model, method='dense', nproc=None, nrand=20,
+                 nlanczos=100, dense_max=2000, seed=7, spin_flip=None):
+        """Diagonalize all sectors in a process pool.
+
+        Set OMP_NUM_THREADS=1 (or similar) before starting python so that
+        the workers do not compete for cores in threaded BLAS calls.
+
+        Args:
+            model: Lattice model.
+            method (str): 'dense' or 'ftlm' (finite-temperature Lanczos
+                for sectors larger than dense_max).
+            nproc (int): Number of worker processes, all cores by default.
+            nrand (int): Number of random vectors of FTLM.
+            nlanczos (int): Lanczos steps of FTLM per random vector.
+            dense_max (int): Sectors up to this size are always dense.
+            seed (int): Seed of the FTLM random vectors.
+            spin_flip (bool): Reuse (na, nb) for (nb, na), which is
+                detected from the one-body terms and the interaction if
+                not given.
+        """
+        if method not in ('dense', 'ftlm'):
+            raise Exception("Unrecognized method: {}".format(method))
+        if spin_flip is None:
+            spin_flip = _spin_symmetric(model)
+        self.model = model
+        N = model.N
+        todo = [(na, nb) for na, nb in sectors(N)
+                if not spin_flip or na >= nb]
+        # largest sectors first for a better load balance
+        todo.sort(key=lambda s: -utils.binom(N, s[0])*utils.binom(N, s[1]))
+        items = [(model, na, nb, method, nrand, nlanczos, dense_max,
+                  seed + na*(N + 1) + nb) for na, nb in todo]
+        if nproc is None:
+            nproc = os.cpu_count() or 1
+        nproc = max(1, min(nproc, len(items)))
+        if nproc == 1:
+            results = list(map(_spectrum, items))
+        else:
+            with _get_context().Pool(nproc) as pool:
+                results = pool.map(_spectrum, items, chunksize=1)
+        self.spectra = {}
+        for na, nb, e, w in results:
+            self.spectra[na, nb] = (e, w)
+            if spin_flip:
+                self.spectra[nb, na] = (e, w)
+
+    def evaluate(self, temperatures, mu=0.0, field=0.0):
+        """Return grand canonical averages on a temperature grid.
+
+        The statistical operator is exp(-beta K) with
+        K = H - mu n - field S_z and S_z = (n_alpha - n_beta)/2.
+
+        Args:
+            temperatures (array): Temperatures.
+            mu (float): Chemical potential.
+            field (float): Magnetic field coupling to S_z.
+
+        Returns:
+            dict: Arrays over the temperatures with the keys 'Z'
+                (partition function), 'E' (<H>), 'n' (<n>), 'Sz'
+                (<S_z>), 'C' (beta^2 (<K^2> - <K>^2)), 'chi' (uniform
+                susceptibility beta (<S_z^2> - <S_z>^2)) and 'F' (grand
+                potential -T log Z).
+
+        Note that 'C' is d<K>/dT at fixed mu and field, the grand
+        canonical heat capacity. It is not d<E>/dT at a fixed number of
+        electrons, since <n> and <S_z> change with the temperature too.
+        """
+        T = numpy.asarray(temperatures, dtype=float)
+        beta = 1.0/T
+        keys = sorted(self.spectra)
+        e = numpy.concatenate([self.spectra[s][0] for s in keys])
+        w = numpy.concatenate([self.spectra[s][1] for s in keys])
+        sizes = [self.spectra[s][0].shape[0] for s in keys]
+        n = numpy.repeat([na + nb for na, nb in keys], sizes)
+        sz = numpy.repeat([0.5*(na - nb) for na, nb in keys], sizes)
+        K = e - mu*n - field*sz
+        kmin = K.min()
+        # shifted Boltzmann factors, one row per temperature
+        P = w[None, :]*numpy.exp(-beta[:, None]*(K - kmin)[None, :])
+        Z0 = P.sum(axis=1)
+        P /= Z0[:, None]
+
+        def _avg(x):
+            return P @ x
+
+        out = {}
+        out['Z'] = Z0*numpy.exp(-beta*kmin)
+        out['F'] = kmin - T*numpy.log(Z0)
+        out['E'] = _avg(e)
+        out['n'] = _avg(n)
+        out['Sz'] = _avg(sz)
+        out['C'] = beta**2*(_avg(K**2) - _avg(K)**2)
+        out['chi'] = beta*(_avg(sz**2) - _avg(sz)**2)
+        return out
@@ -0,0 +1,332 @@
+import numpy
+from . import utils
+from . import interaction
+from .model import Model
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+
+def _conj_t(C):
+    return numpy.conj(numpy.swapaxes(C, -1, -2))
+
+
+def spin_blocks(C, N, tol=1e-14):
+    """Return (Ca, Cb) if C does not mix spins, otherwise None.
+
+    Args:
+        C (array): (..., 2N, M) orbitals, alpha rows first.
+        N (int): Number of sites.
+        tol (float): Largest element of the spin-mixing blocks.
+    """
+    if isinstance(C, (tuple, list)):
+        return tuple(C)
+    C = numpy.asarray(C)
+    if C.shape[-1] % 2:
+        return None
+    M = C.shape[-1]//2
+    mix = max(numpy.abs(C[..., :N, M:]).max(initial=0.0),
+              numpy.abs(C[..., N:, :M]).max(initial=0.0))
+    if mix > tol:
+        return None
+    return C[..., :N, :M], C[..., N:, M:]
+
+
+def _rotate(h, Cl, Cr):
+    """Return Cl^+ h Cr for a dense or sparse h and batched Cl, Cr."""
+    if scipy is not None and scipy.sparse.issparse(h):
+        # the batch goes into the columns of a single sparse product
+        shape = Cr.shape
+        n, m = shape[-2:]
+        X = numpy.moveaxis(Cr.reshape((-1, n, m)), 0, 1).reshape(n, -1)
+        hC = numpy.moveaxis((h @ X).reshape(n, -1, m), 1, 0)
+        hC = hC.reshape(shape[:-2] + (h.shape[0], m))
+    else:
+        hC = h @ Cr
+    return _conj_t(Cl) @ hC
+
+
+def rotate_one_body(h, C, N=None):
+    """Return C^+ h C for one or many orbital bases.
+
+    Orbitals that do not mix spins, given as a tuple (Ca, Cb) or
+    detected in C, are rotated one spin block at a time and the zero
+    spin-flip blocks of h are skipped.
+
+    Args:
+        h (array): (2N, 2N) one-body matrix, dense or scipy.sparse.
+        C (array): (..., 2N, M) orbitals in columns, or a tuple (Ca, Cb)
+            of (..., N, Ma) and (..., N, Mb) spin blocks.
+        N (int): Number of sites, h.shape[0]//2 by default.
+    """
+    if N is None:
+        N = h.shape[0]//2
+    blocks = spin_blocks(C, N)
+    if blocks is None:
+        return _rotate(h, numpy.asarray(C), numpy.asarray(C))
+    Ca, Cb = blocks
+    Ma = Ca.shape[-1]
+    M = Ma + Cb.shape[-1]
+    spins = ((slice(0, N), slice(0, Ma), Ca),
+             (slice(N, 2*N), slice(Ma, M), Cb))
+    shape = numpy.broadcast_shapes(Ca.shape[:-2], Cb.shape[:-2])
+    out = None
+    for x, sx, Cx in spins:
+        for y, sy, Cy in spins:
+            hxy = h[x, y]
+            if scipy is not None and scipy.sparse.issparse(hxy):
+                nonzero = hxy.nnz > 0
+            else:
+                nonzero = numpy.any(hxy != 0)
+            if x != y and not nonzero:
+                continue
+            hxy = _rotate(hxy, Cx, Cy)
+            if out is None:
+                out = numpy.zeros(shape + (M, M), dtype=numpy.result_type(
+                    hxy, Ca, Cb))
+            out[..., sx, sy] = hxy
+    return out
+
+
+def onsite_integrals(U, A, B, notation='chemist'):
+    """Return sum_i U_i A*_ip A_ir B*_iq B_is for batched A and B.
+
+    This is the density-density interaction sum_i U_i n_iA n_iB in the
+    basis of the columns of A and B, built as one (M^2, N) x (N, M^2)
+    product over the interacting sites instead of four transformations
+    of a dense tensor.
+
+    Args:
+        U (array): (N,) on-site interaction.
+        A (array): (..., N, Ma) rows of the first spin.
+        B (array): (..., N, Mb) rows of the second spin.
+        notation (str): 'chemist' for the (Ma, Ma, Mb, Mb) layout
+            (pr|qs), 'physicist' for the (Ma, Mb, Ma, Mb) layout
+            <pq|rs>.
+    """
+    U = numpy.asarray(U)
+    sites = numpy.nonzero(U)[0]
+    A = numpy.asarray(A)[..., sites, :]
+    B = numpy.asarray(B)[..., sites, :]
+    Ma = A.shape[-1]
+    Mb = B.shape[-1]
+    XA = (A.conj()[..., :, None]*A[..., None, :])
+    XA = XA.reshape(A.shape[:-1] + (Ma*Ma,))
+    XB = (B.conj()[..., :, None]*B[..., None, :])
+    XB = XB.reshape(B.shape[:-1] + (Mb*Mb,))
+    V = numpy.swapaxes(XA*U[sites, None], -1, -2) @ XB
+    V = V.reshape(V.shape[:-2] + (Ma, Ma, Mb, Mb))
+    if notation == 'chemist':
+        return V
+    elif notation == 'physicist':
+        return numpy.swapaxes(V, -3, -2)
+    raise Exception("Unrecognized notation: {}".format(notation))
+
+
+def _quarter(Ud, C):
+    """Return the dense transformation of a physicist tensor."""
+    Cc = C.conj()
+    X = numpy.tensordot(Ud, C, axes=([3], [0]))
+    X = numpy.tensordot(X, C, axes=([2], [0])).transpose(0, 1, 3, 2)
+    X = numpy.tensordot(Cc, X, axes=([0], [1])).transpose(1, 0, 2, 3)
+    return numpy.tensordot(Cc, X, axes=([0], [0]))
+
+
+def rotate_interaction(U, C, N=None, notation='chemist', spin=False):
+    """Return the two-body integrals in one or many orbital bases.
+
+    An on-site interaction (U.onsite set) is transformed by
+    `onsite_integrals`, which costs O(N M^4) for M orbitals. The terms
+    a+_i,s a+_i,s of the same spin vanish and are left out, so only the
+    alpha-beta part is returned for orbitals that do not mix spins.
+    Other interactions are transformed as a dense tensor, one index at a
+    time.
+
+    Args:
+        U (Interaction): Two-body interaction of the model, or a model.
+        C (array): (..., 2N, M) orbitals, or a tuple (Ca, Cb) of spin
+            blocks, see `rotate_one_body`.
+        N (int): Number of sites, U.norb//2 by default.
+        notation (str): 'chemist' or 'physicist', see
+            `onsite_integrals`.
+        spin (bool): Return a dict of the spin blocks 'aa', 'ab' and
+            'bb' (only 'ab' for an on-site interaction), which requires
+            orbitals that do not mix spins.
+    """
+    if not isinstance(U, interaction.Interaction):
+        U = interaction.get_interaction(U)
+    if N is None:
+        N = U.norb//2
+    blocks = spin_blocks(C, N)
+    if spin and blocks is None:
+        raise Exception("Spin blocks require orbitals that do not mix spins")
+    if U.onsite is not None:
+        if blocks is not None:
+            Ca, Cb = blocks
+            Vab = onsite_integrals(U.onsite, Ca, Cb, notation=notation)
+            if spin:
+                return {'ab': Vab}
+            return _assemble({'ab': Vab}, notation)
+        C = numpy.asarray(C)
+        A = C[..., :N, :]
+        B = C[..., N:, :]
+        return onsite_integrals(U.onsite, A, B, notation=notation) \
+            + onsite_integrals(U.onsite, B, A, notation=notation)
+    if blocks is not None:
+        Ca, Cb = blocks
+        Ma = Ca.shape[-1]
+        shape = numpy.broadcast_shapes(Ca.shape[:-2], Cb.shape[:-2])
+        C = numpy.zeros(shape + (2*N, Ma + Cb.shape[-1]),
+                        dtype=numpy.result_type(Ca, Cb))
+        C[..., :N, :Ma] = Ca
+        C[..., N:, Ma:] = Cb
+    C = numpy.asarray(C)
+    Ud = U.todense()
+    batch = C.shape[:-2]
+    out = numpy.array([_quarter(Ud, c) for c in
+                       C.reshape((-1,) + C.shape[-2:])])
+    out = out.reshape(batch + out.shape[1:])
+    if spin:
+        a = slice(0, Ma)
+        b = slice(Ma, None)
+        out = {'aa': out[..., a, a, a, a], 'ab': out[..., a, b, a, b],
+               'bb': out[..., b, b, b, b]}
+        if notation == 'chemist':
+            out = {k: numpy.swapaxes(v, -3, -2) for k, v in out.items()}
+        return out
+    if notation == 'chemist':
+        return numpy.swapaxes(out, -3, -2)
+    return out
+
+
+def _assemble(blocks, notation):
+    """Return the full tensor of spin blocks from `rotate_interaction`."""
+    Vab = blocks['ab']
+    if notation == 'chemist':
+        Vab = numpy.swapaxes(Vab, -3, -2)
+    Ma, Mb = Vab.shape[-4], Vab.shape[-3]
+    M = Ma + Mb
+    a = slice(0, Ma)
+    b = slice(Ma, M)
+    out = numpy.zeros(Vab.shape[:-4] + (M,)*4, dtype=Vab.dtype)
+    out[..., a, b, a, b] = Vab
+    # U[q, p, s, r] = U[p, q, r, s]
+    out[..., b, a, b, a] = numpy.swapaxes(numpy.swapaxes(Vab, -4, -3), -2, -1)
+    for key, s in (('aa', a), ('bb', b)):
+        if key in blocks:
+            V = blocks[key]
+            if notation == 'chemist':
+                V = numpy.swapaxes(V, -3, -2)
+            out[..., s, s, s, s] = V
+    if notation == 'chemist':
+        return numpy.swapaxes(out, -3, -2)
+    return out
+
+
+def to_interaction(eri, notation='chemist', thresh=1e-14):
+    """Return the Interaction of integrals from `rotate_interaction`.
+
+    Args:
+        eri (array or dict): (M, M, M, M) integrals or a dict of spin
+            blocks, without batch dimensions.
+        notation (str): Layout of eri, 'chemist' or 'physicist'.
+        thresh (float): Elements with magnitude below this are dropped.
+    """
+    if notation not in ('chemist', 'physicist'):
+        raise Exception("Unrecognized notation: {}".format(notation))
+    if isinstance(eri, dict):
+        parts = []
+        Vab = eri['ab']
+        if notation == 'chemist':
+            Vab = Vab.transpose(0, 2, 1, 3)
+        Ma = Vab.shape[0]
+        offsets = {'aa': (0, 0, 0, 0), 'bb': (Ma,)*4,
+                   'ab': (0, Ma, 0, Ma)}
+        for key, V in eri.items():
+            if notation == 'chemist':
+                V = V.transpose(0, 2, 1, 3)
+            idx = numpy.argwhere(numpy.abs(V) > thresh)
+            val = V[tuple(idx.T)]
+            idx = idx + numpy.array(offsets[key])
+            parts.append((idx, val))
+            if key == 'ab':
+                # U[q, p, s, r] = U[p, q, r, s]
+                parts.append((idx[:, [1, 0, 3, 2]], val))
+        norb = Ma + Vab.shape[1]
+        idx = numpy.concatenate([p[0] for p in parts])
+        val = numpy.concatenate([p[1] for p in parts])
+        return interaction.Interaction(norb, idx, val)
+    if notation == 'chemist':
+        eri = eri.transpose(0, 2, 1, 3)
+    return interaction.from_dense(eri, thresh=thresh)
+
+
+class RotatedModel(Model):
+    """A lattice model in a rotated orbital basis.
+
+    The one-body matrices are rotated on request and the two-body
+    interaction once, so the model can be passed to FCISimple and the
+    other solvers. Orbitals that do not mix spins, for example those of
+    RHF or UHF, keep the alpha-beta structure needed by sigma.
+
+    Attributes:
+        model: Model in the site basis.
+        C (array): (2N, 2N) unitary, column p is the orbital p.
+        N (int): Number of sites.
+        thresh (float): Smallest two-body element that is kept.
+    """
+    def __init__(self, model, C, thresh=1e-12):
+        """Initialize the rotated model.
+
+        Args:
+            model: Lattice model.
+            C (array): (2N, 2N) unitary or a tuple (Ca, Cb) of (N, N)
+                unitaries, see `SCF.get_orbitals`.
+            thresh (float): Smallest two-body element that is kept.
+        """
+        N = model.N
+        blocks = spin_blocks(C, N)
+        if blocks is not None:
+            C = utils.block_diag(*blocks)
+        C = numpy.asarray(C)
+        if C.shape != (2*N, 2*N):
+            raise Exception("C must be a ({0}, {0}) unitary".format(2*N))
+        self.model = model
+        self.C = C
+        self.N = N
+        self.thresh = thresh
+        self._blocks = blocks
+        self._interaction = None
+
+    def _basis(self):
+        return self.C if self._blocks is None else self._blocks
+
+    def _output(self, h, sparse):
+        if sparse:
+            if scipy is None:
+                raise Exception("scipy is required for sparse output")
+            return scipy.sparse.csr_matrix(h)
+        return h
+
+    def get_tmat(self, phase=None, sparse=False):
+        """Return the hopping matrix in the rotated basis."""
+        t = self.model.get_tmat(phase=phase, sparse=sparse)
+        return self._output(rotate_one_body(t, self._basis(), self.N),
+                            sparse)
+
+    def get_vmat(self, sparse=False):
+        """Return the one-body potential in the rotated basis."""
+        v = self.model.get_vmat(sparse=sparse)
+        return self._output(rotate_one_body(v, self._basis(), self.N),
+                            sparse)
+
+    def get_interaction(self):
+        """Return the two-body interaction in the rotated basis."""
+        if self._interaction is None:
+            U = interaction.get_interaction(self.model)
+            spin = self._blocks is not None
+            eri = rotate_interaction(U, self._basis(), self.N, spin=spin)
+            self._interaction = to_interaction(eri, thresh=self.thresh)
+        return self._interaction
@@ -1,4 +1,15 @@
+import os
 import numpy
+import itertools
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+# number of set bits in each byte
+_POPCOUNT8 = numpy.array(
+    [bin(i).count('1') for i in range(256)], dtype=numpy.uint8)
 
 
 def block_diag(A, B):
@@ -6,13 +17,108 @@ def block_diag(A, B):
        A 0
        0 B
     """
-    ma = A.shape[0]
-    mb = B.shape[0]
-    na = A.shape[1]
-    nb = B.shape[1]
-
-    z1 = numpy.zeros((ma, nb))
-    z2 = numpy.zeros((mb, na))
-    M1 = numpy.hstack((A, z1))
-    M2 = numpy.hstack((z2, B))
-    return numpy.vstack((M1, M2))
+    if scipy is not None and scipy.sparse.issparse(A):
+        # stack the CSR arrays directly
+        A = scipy.sparse.csr_matrix(A)
+        B = scipy.sparse.csr_matrix(B)
+        data = numpy.concatenate((A.data, B.data))
+        indices = numpy.concatenate((A.indices, B.indices + A.shape[1]))
+        indptr = numpy.concatenate((A.indptr, B.indptr[1:] + A.nnz))
+        shape = (A.shape[0] + B.shape[0], A.shape[1] + B.shape[1])
+        return scipy.sparse.csr_matrix((data, indices, indptr), shape=shape)
+    ma, na = A.shape
+    mb, nb = B.shape
+    M = numpy.zeros((ma + mb, na + nb), dtype=numpy.result_type(A, B))
+    M[:ma, :na] = A
+    M[ma:, na:] = B
+    return M
+
+
+def nn_to_edges(nn):
+    """Return the (E, 2) array of directed bonds (i, x) of a neighbor list.
+
+    Args:
+        nn: List of nearest neighbors of each site, or an (N, z) integer
+            array in which negative entries are padding.
+    """
+    if isinstance(nn, numpy.ndarray):
+        N, z = nn.shape
+        i = numpy.repeat(numpy.arange(N), z)
+        x = nn.reshape(-1)
+        keep = x >= 0
+        return numpy.stack((i[keep], x[keep]), axis=1)
+    lengths = numpy.fromiter((len(x) for x in nn), dtype=numpy.int64,
+                             count=len(nn))
+    E = int(lengths.sum())
+    i = numpy.repeat(numpy.arange(len(nn)), lengths)
+    x = numpy.fromiter(itertools.chain.from_iterable(nn), dtype=numpy.int64,
+                       count=E)
+    return numpy.stack((i, x), axis=1)
+
+
+def popcount(x):
+    """Return the number of set bits in each element of a uint64 array."""
+    x = numpy.ascontiguousarray(x, dtype=numpy.uint64)
+    shape = x.shape
+    b = _POPCOUNT8[x.reshape(-1).view(numpy.uint8)]
+    return b.reshape(shape + (8,)).sum(axis=-1, dtype=numpy.int64)
+
+
+def occ_to_bits(occ):
+    """Pack rows of occupied orbital indices into uint64 bit strings.
+
+    Args:
+        occ (array): (k, nelec) array of occupied orbitals.
+    """
+    occ = numpy.asarray(occ, dtype=numpy.uint64)
+    one = numpy.uint64(1)
+    if occ.shape[1] == 0:
+        return numpy.zeros(occ.shape[0], dtype=numpy.uint64)
+    return numpy.bitwise_or.reduce(numpy.left_shift(one, occ), axis=1)
+
+
+def bits_to_occ(bits, norb, nelec):
+    """Unpack uint64 bit strings into rows of sorted occupied orbitals.
+
+    Args:
+        bits (array): (k,) array of bit strings.
+        norb (int): Number of orbitals.
+        nelec (int): Number of set bits in each string.
+    """
+    bits = numpy.asarray(bits, dtype=numpy.uint64)
+    k = bits.shape[0]
+    occ = bits_to_bool(bits, norb)
+    return numpy.nonzero(occ)[1].reshape(k, nelec)
+
+
+def bits_to_bool(bits, norb):
+    """Return a (k, norb) boolean occupation array of bit strings."""
+    bits = numpy.asarray(bits, dtype=numpy.uint64)
+    shifts = numpy.arange(norb, dtype=numpy.uint64)
+    one = numpy.uint64(1)
+    return ((bits[:, None] >> shifts[None, :]) & one).astype(bool)
+
+
+def binom(n, k):
+    """Return binomial coefficient 'n choose k'."""
+    if k < 0 or k > n:
+        return 0
+    out = 1
+    for i in range(min(k, n - k)):
+        out = out*(n - i)//(i + 1)
+    return out
+
+
+def available_memory():
+    """Return the available system memory in bytes, or None if unknown."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1])*1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES')*os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
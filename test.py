@@ -4,6 +4,24 @@ from lattice.tests.test_test import *
 from lattice.tests.test_anderson import *
 from lattice.tests.test_hubbard import *
 from lattice.tests.test_fci_simple import *
+from lattice.tests.test_solvers import *
+from lattice.tests.test_strings import *
+from lattice.tests.test_symmetry import *
+from lattice.tests.test_interaction import *
+from lattice.tests.test_lattices import *
+from lattice.tests.test_scan import *
+from lattice.tests.test_sweep import *
+from lattice.tests.test_sci import *
+from lattice.tests.test_rdm import *
+from lattice.tests.test_dynamics import *
+from lattice.tests.test_greens import *
+from lattice.tests.test_thermo import *
+from lattice.tests.test_cache import *
+from lattice.tests.test_outcore import *
+from lattice.tests.test_scf import *
+from lattice.tests.test_transform import *
+from lattice.tests.test_free import *
+from lattice.tests.test_dmrg import *
 
 logging.basicConfig(
     format='%(levelname)s:%(message)s',